@@ -0,0 +1,604 @@
+# benchmarks/chat_load_test.py
+"""
+채팅 부하 테스트 (매칭된 두 사람씩 짝지은 가상 클라이언트).
+
+    # 서버를 직접 띄워서 시나리오 실행 (워커 1개 기준 수용량 측정)
+    # 주의: 지정한 DB/Redis 에 테스트 유저/매칭/채팅방을 만들기 때문에 부하 테스트 전용 DB 만 사용할 것
+    PYTHONPATH=src python -m benchmarks.chat_load_test --start-server --scenarios smoke rooms_100
+
+    # 이미 떠 있는 서버 대상 (RSS 는 --server-pid 로 지정한 워커 프로세스 기준)
+    PYTHONPATH=src python -m benchmarks.chat_load_test --base-url http://127.0.0.1:8000 --server-pid 12345
+
+    # 기준 결과 대비 회귀 체크 (왕복 p99 가 20% 이상 느려지면 exit code 1)
+    PYTHONPATH=src python -m benchmarks.chat_load_test --start-server --output new.json \
+        --baseline old.json --max-regression 0.2
+
+시나리오마다
+1) dev 로그인(/api/dev-auth/login)으로 유저 2N 명 생성 → 두 명씩 매칭 행 생성
+2) 두 사람 모두 POST /api/profile/match/accept/chat → 채팅방 활성화
+3) 방마다 WebSocket 2개 접속 → 클라이언트당 초당 R 개씩 메시지 전송
+4) 접속 시간, 메시지 왕복(보낸 사람에게 되돌아오는 시간) / 상대 전달 시간 p50/p99,
+   Redis 명령 수, 서버 워커 RSS 를 JSON 으로 남긴다.
+DB 접속 정보는 서버와 같은 환경 변수(DB_HOST, DB_NAME ...)를, Redis 는 REDIS_URL 을 사용한다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+import httpx
+import msgpack
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+
+@dataclass
+class ChatLoadScenario:
+    name: str
+    rooms: int                      # 방 수 (클라이언트 수 = rooms * 2)
+    messages_per_second: float      # 클라이언트당 초당 전송 메시지 수
+    duration_seconds: float
+    message_bytes: int = 32         # 메시지 본문 길이
+    frame_format: str = "json"      # WebSocket 프레임 형식 (json / msgpack)
+
+
+SCENARIOS = {
+    s.name: s
+    for s in (
+        ChatLoadScenario("smoke", rooms=10, messages_per_second=1, duration_seconds=10),
+        ChatLoadScenario("rooms_100", rooms=100, messages_per_second=0.5, duration_seconds=30),
+        ChatLoadScenario("rooms_500", rooms=500, messages_per_second=0.2, duration_seconds=60),
+        ChatLoadScenario("rooms_1000", rooms=1000, messages_per_second=0.1, duration_seconds=60),
+        ChatLoadScenario("burst_10", rooms=10, messages_per_second=20, duration_seconds=20),
+        ChatLoadScenario("large_messages", rooms=50, messages_per_second=1, duration_seconds=30,
+                         message_bytes=2000),
+        ChatLoadScenario("msgpack_100", rooms=100, messages_per_second=0.5, duration_seconds=30,
+                         frame_format="msgpack"),
+    )
+}
+
+DEFAULT_SCENARIOS = ("smoke", "rooms_100", "burst_10", "msgpack_100")
+
+# 전송이 끝난 뒤 아직 안 돌아온 메시지를 기다리는 시간 (초)
+DRAIN_SECONDS = 5.0
+
+# 서버 RSS 샘플링 간격 (초)
+RSS_SAMPLE_INTERVAL_SECONDS = 0.5
+
+# 메시지 본문: "lt <클라이언트 번호> <순번> <보낸 시각 ns> " + 패딩
+MESSAGE_PREFIX = "lt"
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[k], 3)
+
+
+def _latency_summary(prefix: str, values: list[float]) -> dict:
+    return {
+        f"{prefix}_count": len(values),
+        f"{prefix}_p50_ms": _percentile(values, 50),
+        f"{prefix}_p99_ms": _percentile(values, 99),
+        f"{prefix}_max_ms": round(max(values), 3) if values else None,
+    }
+
+
+def _rss_mb(pid: int) -> tuple[float, float] | None:
+    """
+    /proc/<pid>/status 의 (VmRSS, VmHWM) MB. Linux 외에는 None
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    rss = int(fields["VmRSS"].split()[0]) / 1024
+    hwm = int(fields["VmHWM"].split()[0]) / 1024
+    return rss, hwm
+
+
+class _RssSampler:
+    def __init__(self, pid: int | None):
+        self.pid = pid
+        self.samples: list[float] = []
+        self.peak = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _loop(self) -> None:
+        while True:
+            sample = _rss_mb(self.pid)
+            if sample is not None:
+                self.samples.append(sample[0])
+                self.peak = max(self.peak, sample[1])
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if self.pid is not None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> dict:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if not self.samples:
+            return {"rss_start_mb": None, "rss_end_mb": None, "rss_peak_mb": None}
+        return {
+            "rss_start_mb": round(self.samples[0], 1),
+            "rss_end_mb": round(self.samples[-1], 1),
+            "rss_peak_mb": round(max(self.peak, max(self.samples)), 1),
+        }
+
+
+def _redis_stats(redis_url: str) -> dict | None:
+    """
+    INFO 기준 누적 명령 수 / 메모리 사용량 (INFO 를 막아 두었거나 읽지 못하면 None)
+    """
+    from redis import Redis
+    from redis.exceptions import RedisError
+
+    client = Redis.from_url(redis_url)
+    try:
+        stats = client.info("stats")
+        memory = client.info("memory")
+    except RedisError:
+        return None
+    finally:
+        client.close()
+    return {
+        "total_commands_processed": stats["total_commands_processed"],
+        "used_memory": memory["used_memory"],
+    }
+
+
+@dataclass
+class _ChatClient:
+    index: int
+    user_id: int
+    token: str
+    chat_room_id: str = ""
+    binary: bool = False
+    connect_ms: float | None = None
+    sent: int = 0
+    received_own: int = 0
+    received_partner: int = 0
+    errors: int = 0
+    closed_code: int | None = None
+    rtt_ms: list[float] = field(default_factory=list)
+    delivery_ms: list[float] = field(default_factory=list)
+
+
+def _decode_frame(data: str | bytes) -> dict | None:
+    """
+    서버 프레임 → {"type": ...} / 응답 / {"senderId", "message"} 형태로 통일
+    """
+    payload = msgpack.unpackb(data, raw=False) if isinstance(data, bytes) else json.loads(data)
+    if not isinstance(payload, dict):
+        return None
+    if "s" in payload and "m" in payload:
+        return {"senderId": payload["s"], "message": payload["m"]}
+    return payload
+
+
+async def _receive_loop(ws, client: _ChatClient) -> None:
+    try:
+        await _receive_frames(ws, client)
+    except ConnectionClosed as e:
+        client.closed_code = e.rcvd.code if e.rcvd else None
+
+
+async def _receive_frames(ws, client: _ChatClient) -> None:
+    async for data in ws:
+        frame = _decode_frame(data)
+        if frame is None:
+            continue
+        if frame.get("type") == "ping":
+            await ws.send(json.dumps({"type": "pong"}))
+            continue
+
+        text = frame.get("message")
+        if not isinstance(text, str) or not text.startswith(MESSAGE_PREFIX + " "):
+            continue
+        _, sender_index, _, sent_ns, *_ = text.split(" ")
+        elapsed_ms = (time.perf_counter_ns() - int(sent_ns)) / 1e6
+        if int(sender_index) == client.index:
+            client.received_own += 1
+            client.rtt_ms.append(elapsed_ms)
+        else:
+            client.received_partner += 1
+            client.delivery_ms.append(elapsed_ms)
+
+
+async def _send_loop(ws, client: _ChatClient, scenario: ChatLoadScenario, stop_at: float) -> None:
+    interval = 1 / scenario.messages_per_second
+    # 클라이언트마다 시작 시점을 흩어서 한꺼번에 몰리지 않게
+    await asyncio.sleep(interval * (client.index % 97) / 97)
+    seq = 0
+    while time.monotonic() < stop_at:
+        head = f"{MESSAGE_PREFIX} {client.index} {seq} {time.perf_counter_ns()} "
+        await ws.send(head.ljust(scenario.message_bytes, "x"))
+        client.sent += 1
+        seq += 1
+        await asyncio.sleep(interval)
+
+
+async def _run_client(
+    ws_url: str,
+    client: _ChatClient,
+    scenario: ChatLoadScenario,
+    connected: asyncio.Event,
+    start: asyncio.Event,
+    stop_at: list[float],
+    done: asyncio.Event,
+) -> None:
+    url = f"{ws_url}/ws/chat/{client.chat_room_id}?token={client.token}&format={scenario.frame_format}"
+    started_at = time.perf_counter()
+    try:
+        async with connect(url, max_size=None, ping_interval=None, open_timeout=60) as ws:
+            # 첫 응답(history)까지를 접속 시간으로
+            first = _decode_frame(await ws.recv())
+            client.connect_ms = (time.perf_counter() - started_at) * 1000
+            if not first or first.get("code") != 200:
+                client.errors += 1
+                return
+            connected.set()
+
+            receiver = asyncio.create_task(_receive_loop(ws, client))
+            await start.wait()
+            await _send_loop(ws, client, scenario, stop_at[0])
+            await done.wait()
+            receiver.cancel()
+            client.closed_code = ws.close_code
+    except Exception as e:
+        client.errors += 1
+        print(f"[chat_load] client {client.index} error: {e!r}", file=sys.stderr)
+    finally:
+        connected.set()
+
+
+async def _setup_rooms(
+    http: httpx.AsyncClient,
+    engine,
+    n_rooms: int,
+    concurrency: int,
+) -> list[tuple[_ChatClient, _ChatClient]]:
+    """
+    dev 로그인 → 매칭 행 생성 → 양쪽 accept → 채팅방 id 조회
+    """
+    from jose import jwt
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Session
+
+    from app.models.enums import MatchStatus
+    from app.models.match import MatchResult
+    from app.models.profile import Profile  # noqa: F401 (매퍼 관계 대상 등록)
+    from app.models.user import User  # noqa: F401
+
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(k: int) -> _ChatClient:
+        async with semaphore:
+            res = await http.post(
+                "/api/dev-auth/login", json={"email": f"chatload-{run_id}-{k}@example.com"}
+            )
+            res.raise_for_status()
+            token = res.json()["access_token"]
+        return _ChatClient(index=k, user_id=jwt.get_unverified_claims(token)["user_id"], token=token)
+
+    clients = await asyncio.gather(*(login(k) for k in range(n_rooms * 2)))
+    pairs = [(clients[2 * k], clients[2 * k + 1]) for k in range(n_rooms)]
+
+    with Session(engine) as db:
+        match_ids = [
+            row.id
+            for row in db.execute(
+                insert(MatchResult).returning(MatchResult.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "user_a_id": a.user_id,
+                        "user_b_id": b.user_id,
+                        "status": MatchStatus.MATCHED,
+                        "compatibility_score": 0,
+                    }
+                    for a, b in pairs
+                ],
+            )
+        ]
+        db.commit()
+
+    async def accept(client: _ChatClient, match_id: int) -> None:
+        async with semaphore:
+            res = await http.post(
+                "/api/profile/match/accept/chat",
+                json={"matchId": match_id, "accept": True},
+                headers={"Authorization": f"Bearer {client.token}"},
+            )
+            res.raise_for_status()
+
+    async def activate(pair: tuple[_ChatClient, _ChatClient], match_id: int) -> None:
+        a, b = pair
+        # 동시에 accept 하면 서로의 수락을 덮어쓸 수 있어서 순서대로
+        await accept(a, match_id)
+        await accept(b, match_id)
+        async with semaphore:
+            res = await http.get(
+                "/api/profile/match/chat-room",
+                headers={"Authorization": f"Bearer {a.token}"},
+            )
+            res.raise_for_status()
+        a.chat_room_id = b.chat_room_id = res.json()["result"]["chatRoomId"]
+
+    await asyncio.gather(*(activate(p, m) for p, m in zip(pairs, match_ids)))
+    return pairs
+
+
+async def run_scenario(
+    scenario: ChatLoadScenario,
+    base_url: str,
+    engine,
+    redis_url: str,
+    server_pid: int | None,
+    concurrency: int,
+) -> dict:
+    ws_url = "ws" + base_url[len("http"):]
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        setup_started_at = time.perf_counter()
+        pairs = await _setup_rooms(http, engine, scenario.rooms, concurrency)
+        setup_seconds = time.perf_counter() - setup_started_at
+
+    clients = [c for pair in pairs for c in pair]
+    for c in clients:
+        c.binary = scenario.frame_format == "msgpack"
+
+    rss = _RssSampler(server_pid)
+    rss.start()
+    redis_before = _redis_stats(redis_url)
+
+    start = asyncio.Event()
+    done = asyncio.Event()
+    stop_at = [0.0]
+    connect_semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(client: _ChatClient) -> None:
+        connected = asyncio.Event()
+        async with connect_semaphore:
+            task = asyncio.create_task(
+                _run_client(ws_url, client, scenario, connected, start, stop_at, done)
+            )
+            await connected.wait()
+        await task
+
+    tasks = [asyncio.create_task(run(c)) for c in clients]
+
+    # 전부 접속한 뒤 동시에 전송 시작
+    while sum(1 for c in clients if c.connect_ms is not None or c.errors) < len(clients):
+        await asyncio.sleep(0.1)
+    connected_rss = _rss_mb(server_pid) if server_pid else None
+
+    stop_at[0] = time.monotonic() + scenario.duration_seconds
+    start.set()
+    await asyncio.sleep(scenario.duration_seconds)
+
+    # 아직 안 돌아온 메시지 대기
+    drain_until = time.monotonic() + DRAIN_SECONDS
+    while time.monotonic() < drain_until:
+        if all(c.received_own >= c.sent for c in clients if not c.errors):
+            break
+        await asyncio.sleep(0.1)
+    redis_after = _redis_stats(redis_url)
+    done.set()
+    await asyncio.gather(*tasks)
+    rss_summary = await rss.stop()
+
+    sent = sum(c.sent for c in clients)
+    received_own = sum(c.received_own for c in clients)
+    received_partner = sum(c.received_partner for c in clients)
+    elapsed = scenario.duration_seconds + DRAIN_SECONDS
+
+    redis_summary = {
+        "redis_commands": None,
+        "redis_commands_per_message": None,
+        "redis_ops_per_second": None,
+        "redis_used_memory_delta_mb": None,
+    }
+    if redis_before and redis_after:
+        redis_commands = (
+            redis_after["total_commands_processed"] - redis_before["total_commands_processed"]
+        )
+        redis_summary = {
+            "redis_commands": redis_commands,
+            "redis_commands_per_message": round(redis_commands / sent, 2) if sent else None,
+            "redis_ops_per_second": round(redis_commands / elapsed, 1),
+            "redis_used_memory_delta_mb": round(
+                (redis_after["used_memory"] - redis_before["used_memory"]) / (1024 * 1024), 2
+            ),
+        }
+
+    result = {
+        "clients": len(clients),
+        "setup_seconds": round(setup_seconds, 3),
+        "client_errors": sum(c.errors for c in clients),
+        "messages_sent": sent,
+        "sent_per_second": round(sent / scenario.duration_seconds, 1),
+        # 보낸 메시지가 자신/상대에게 돌아오지 않은 수
+        "lost_own": sent - received_own,
+        "lost_partner": sent - received_partner,
+        **_latency_summary("connect", [c.connect_ms for c in clients if c.connect_ms is not None]),
+        **_latency_summary("rtt", [v for c in clients for v in c.rtt_ms]),
+        **_latency_summary("delivery", [v for c in clients for v in c.delivery_ms]),
+        **redis_summary,
+        "rss_connected_mb": round(connected_rss[0], 1) if connected_rss else None,
+        **rss_summary,
+    }
+    return result
+
+
+def _start_server(port: int, log_path: str | None) -> subprocess.Popen:
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (src, env.get("PYTHONPATH")) if p)
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", "1", "--log-level", "warning",
+        ],
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def _wait_for_server(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/openapi.json", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server did not start: {base_url}")
+
+
+def compare_with_baseline(results: list[dict], baseline: dict, max_regression: float) -> list[str]:
+    """
+    같은 시나리오의 메시지 왕복 p99 가 max_regression 비율 이상 늘어난 목록
+    """
+    base = {r["scenario"]: r for r in baseline.get("results", []) if r.get("rtt_p99_ms")}
+    regressions = []
+    for r in results:
+        old = base.get(r["scenario"])
+        if not old or r.get("rtt_p99_ms") is None:
+            continue
+        if r["rtt_p99_ms"] > old["rtt_p99_ms"] * (1 + max_regression):
+            regressions.append(
+                f"{r['scenario']}: rtt p99 {old['rtt_p99_ms']:.1f}ms -> {r['rtt_p99_ms']:.1f}ms"
+            )
+    return regressions
+
+
+async def _run_all(args: argparse.Namespace, scenarios: list[ChatLoadScenario], server_pid: int | None) -> list[dict]:
+    from sqlalchemy import create_engine
+
+    from app.core.database import DATABASE_URL
+
+    engine = create_engine(args.database_url or DATABASE_URL, future=True)
+    results = []
+    try:
+        for scenario in scenarios:
+            entry = {"scenario": scenario.name, **asdict(scenario)}
+            entry.pop("name")
+            entry.update(
+                await run_scenario(
+                    scenario,
+                    args.base_url,
+                    engine,
+                    args.redis_url,
+                    server_pid,
+                    args.concurrency,
+                )
+            )
+            results.append(entry)
+            print(f"[chat_load] {json.dumps(entry, ensure_ascii=False)}", file=sys.stderr)
+    finally:
+        engine.dispose()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="채팅 부하 테스트")
+    parser.add_argument("--scenarios", nargs="+", default=list(DEFAULT_SCENARIOS),
+                        choices=sorted(SCENARIOS))
+    parser.add_argument("--rooms", type=int, default=None, help="시나리오 방 수 덮어쓰기")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="시나리오 클라이언트당 초당 메시지 수 덮어쓰기")
+    parser.add_argument("--duration", type=float, default=None, help="시나리오 전송 시간(초) 덮어쓰기")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--start-server", action="store_true",
+                        help="uvicorn 워커 1개를 직접 띄워서 측정 (--base-url 포트 사용)")
+    parser.add_argument("--server-log", default=None, help="--start-server 로그 파일 경로")
+    parser.add_argument("--server-pid", type=int, default=None,
+                        help="RSS 를 측정할 서버 워커 pid (--start-server 면 자동)")
+    parser.add_argument("--database-url", default=None,
+                        help="매칭 행을 만들 DB (기본: 서버와 같은 DB_* 환경 변수)")
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    parser.add_argument("--concurrency", type=int, default=100,
+                        help="동시에 진행하는 로그인/accept/접속 수")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (없으면 stdout)")
+    parser.add_argument("--baseline", default=None, help="비교할 기준 결과 JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    scenarios = []
+    for name in args.scenarios:
+        scenario = SCENARIOS[name]
+        scenarios.append(
+            ChatLoadScenario(
+                name=scenario.name,
+                rooms=args.rooms or scenario.rooms,
+                messages_per_second=args.rate or scenario.messages_per_second,
+                duration_seconds=args.duration or scenario.duration_seconds,
+                message_bytes=scenario.message_bytes,
+                frame_format=scenario.frame_format,
+            )
+        )
+
+    server = None
+    server_pid = args.server_pid
+    if args.start_server:
+        server = _start_server(httpx.URL(args.base_url).port or 8000, args.server_log)
+        server_pid = server.pid
+    try:
+        if server is not None:
+            _wait_for_server(args.base_url)
+        results = asyncio.run(_run_all(args, scenarios, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "base_url": args.base_url,
+            "server_started": args.start_server,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"[chat_load] regression: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
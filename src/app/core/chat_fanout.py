@@ -0,0 +1,147 @@
+# app/core/chat_fanout.py
+import asyncio
+import json
+
+from fastapi import WebSocket
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+
+from app.core.connection_manager import ConnectionManager
+from app.core.redis_client import redis_client
+from app.services.chat_codec import chat_frame_to_binary
+
+
+CHANNEL_PREFIX = "chat:room:"
+CHANNEL_SUFFIX = ":channel"
+
+# 방 종료 등 워커 간 제어 메시지 채널 (프로세스마다 1개 구독)
+CONTROL_CHANNEL = "chat:control"
+
+# 채팅 만료로 서버가 연결을 끊을 때 close code (접속 시 만료 응답과 동일)
+CHAT_EXPIRED_CLOSE_CODE = 4402
+
+# 채팅 만료로 연결을 끊기 직전에 보내는 마지막 메시지
+CHAT_EXPIRED_MESSAGE = {"code": 400, "message": "만료된 채팅방입니다.", "result": None}
+
+
+def room_channel(chat_room_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{chat_room_id}{CHANNEL_SUFFIX}"
+
+
+def _room_id_from_channel(channel: str) -> str:
+    return channel[len(CHANNEL_PREFIX):-len(CHANNEL_SUFFIX)]
+
+
+class ChatRoomFanout:
+    """
+    채팅방 메시지를 여러 워커/호스트에 나눠 붙은 WebSocket 들에게 전달하는 레이어.
+
+    - 메시지는 Redis 채널(chat:room:{id}:channel) 로 publish 하고
+    - 각 프로세스는 Redis pub/sub 연결 하나만 열어서, 이 프로세스에 소켓이 붙어 있는
+      방의 채널만 SUBSCRIBE/UNSUBSCRIBE 한다. (소켓마다 연결을 만들지 않음)
+    - 리더 태스크 하나가 받은 메시지를 ConnectionManager 로 해당 방의 로컬 소켓 대기열에 넣는다.
+      (느린 소켓이 리더나 다른 방 전달을 막지 않음)
+    - 제어 채널(chat:control) 로 방 종료 명령을 받으면 해당 방의 로컬 소켓을 닫는다.
+    → 로드밸런서 뒤에 워커를 여러 개 둬도 sticky session 없이 두 사람이 대화 가능
+    """
+
+    def __init__(self, redis: Redis, manager: ConnectionManager | None = None):
+        self.redis = redis
+        self._pubsub: PubSub | None = None
+        self._reader: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+        # chat_room_id → 이 프로세스에 붙어 있는 소켓들
+        self.manager = manager or ConnectionManager()
+
+        # 현재 SUBSCRIBE 중인 방
+        self._subscribed: set[str] = set()
+
+    async def join(self, chat_room_id: str, websocket: WebSocket, binary: bool = False) -> None:
+        async with self._lock:
+            if chat_room_id not in self._subscribed:
+                if self._pubsub is None:
+                    self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                    await self._pubsub.subscribe(CONTROL_CHANNEL)
+                await self._pubsub.subscribe(room_channel(chat_room_id))
+                self._subscribed.add(chat_room_id)
+                if self._reader is None or self._reader.done():
+                    self._reader = asyncio.create_task(self._read_loop())
+            self.manager.register(websocket, chat_room_id, binary)
+
+    async def leave(self, chat_room_id: str, websocket: WebSocket) -> None:
+        async with self._lock:
+            self.manager.disconnect(websocket, chat_room_id)
+            if self.manager.room_size(chat_room_id) == 0 and chat_room_id in self._subscribed:
+                self._subscribed.discard(chat_room_id)
+                await self._pubsub.unsubscribe(room_channel(chat_room_id))
+
+    async def publish(self, chat_room_id: str, data: str) -> None:
+        """
+        방 전체(다른 워커 포함)에 메시지 전달. 보낸 사람 소켓도 같은 경로로 받는다.
+        """
+        await self.redis.publish(room_channel(chat_room_id), data)
+
+    async def close_rooms(self, chat_room_ids: list[str]) -> None:
+        """
+        만료된 방들의 소켓을 모든 워커에서 종료 (제어 채널로 한 번에 전달)
+        """
+        if not chat_room_ids:
+            return
+        await self.redis.publish(
+            CONTROL_CHANNEL,
+            json.dumps({"type": "close_rooms", "chatRoomIds": chat_room_ids}),
+        )
+
+    def _handle_control(self, data: str) -> None:
+        command = json.loads(data)
+        if command.get("type") != "close_rooms":
+            return
+
+        final = json.dumps(CHAT_EXPIRED_MESSAGE, ensure_ascii=False)
+        for chat_room_id in command.get("chatRoomIds", ()):
+            self.manager.close_room(chat_room_id, code=CHAT_EXPIRED_CLOSE_CODE, data=final)
+
+    async def _read_loop(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=1.0,
+                )
+                if message is None or message["type"] != "message":
+                    continue
+                if message["channel"] == CONTROL_CHANNEL:
+                    self._handle_control(message["data"])
+                    continue
+                self.manager.broadcast_text(
+                    message["data"],
+                    _room_id_from_channel(message["channel"]),
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Redis 재연결 시 pubsub 이 구독 채널을 다시 SUBSCRIBE 한다
+                print(f"[chat_fanout] read error: {e}")
+                await asyncio.sleep(1.0)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscribed.clear()
+        self.manager.close_all()
+
+
+# 간단하게 전역 싱글톤처럼 사용 (프로세스당 pub/sub 연결 1개)
+chat_fanout = ChatRoomFanout(
+    redis_client,
+    ConnectionManager(binary_encoder=chat_frame_to_binary),
+)
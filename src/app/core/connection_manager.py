@@ -1,18 +1,206 @@
-from typing import List
+import asyncio
+import json
+import os
+from typing import Any, Callable
+
 from fastapi import WebSocket
 
+
+# 연결별 송신 대기열 최대 크기
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+
+# 대기열이 가득 찬 (느린) 클라이언트 처리 방식
+# - drop : 해당 클라이언트에게 보낼 새 메시지를 버림
+# - close: 해당 클라이언트 연결을 끊음 (재접속해서 history 로 따라잡게)
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop")
+
+SLOW_CONSUMER_POLICIES = ("drop", "close")
+
+# 느린 클라이언트를 끊을 때 close code (1013 = Try Again Later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+DEFAULT_ROOM = "default"
+
+
+class _Connection:
+    """
+    연결 하나 = 송신 대기열 하나 + writer 태스크 하나.
+    broadcast 는 대기열에 넣기만 하고, 실제 전송은 writer 가 순서대로 한다.
+    """
+
+    def __init__(self, websocket: WebSocket, room: str, queue_size: int, binary: bool = False):
+        self.websocket = websocket
+        self.room = room
+        # True 면 텍스트 프레임 대신 binary_encoder 로 변환한 바이너리 프레임을 받음
+        self.binary = binary
+        # None 은 "여기까지 보내고 연결 종료" 표시
+        self.queue: asyncio.Queue[str | bytes | None] = asyncio.Queue(maxsize=queue_size)
+        self.writer: asyncio.Task | None = None
+        self.dropped = 0
+        self.close_code = 1000
+
+
+class _Frames:
+    """
+    broadcast 한 번에 보낼 프레임. 바이너리 프레임은 필요한 연결이 있을 때 한 번만 만든다.
+    """
+
+    def __init__(self, data: str, binary_encoder: Callable[[str], bytes] | None):
+        self.text = data
+        self.binary_encoder = binary_encoder
+        self._binary: bytes | None = None
+
+    def for_connection(self, conn: _Connection) -> str | bytes:
+        if not conn.binary:
+            return self.text
+        if self._binary is None:
+            self._binary = self.binary_encoder(self.text)
+        return self._binary
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections = []  # 연결된 모든 클라이언트를 저장
+    """
+    방(room) 단위 WebSocket 레지스트리.
+
+    - rooms: room → {websocket: _Connection} (등록/해제 O(1))
+    - broadcast 는 payload 를 한 번만 직렬화하고 각 연결의 대기열에 넣는다.
+      느린 클라이언트 하나가 다른 클라이언트 전송을 막지 않는다.
+    - 대기열이 가득 찬 클라이언트는 slow_consumer_policy 에 따라 메시지를 버리거나 연결을 끊는다.
+    - binary 로 등록한 연결에는 binary_encoder 로 변환한 프레임을 보낸다 (변환도 broadcast 당 한 번).
+    """
 
-    async def connect(self, webSocket: WebSocket):
+    def __init__(
+        self,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        slow_consumer_policy: str = WS_SLOW_CONSUMER_POLICY,
+        binary_encoder: Callable[[str], bytes] | None = None,
+    ):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"unknown slow consumer policy: {slow_consumer_policy}")
+
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.binary_encoder = binary_encoder
+        self.rooms: dict[str, dict[WebSocket, _Connection]] = {}
+
+    async def connect(self, webSocket: WebSocket, room: str = DEFAULT_ROOM):
         await webSocket.accept()                        # 클라이언트 연결 수락
-        self.active_connections.append(webSocket)
-
-    def disconnect(self, webSocket: WebSocket):
-        if webSocket in self.active_connections:        
-            self.active_connections.remove(webSocket)   # 연결 제거
-    
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)       # 연결된 모든 클라이언트에게 메시지 전송
\ No newline at end of file
+        self.register(webSocket, room)
+
+    def register(self, webSocket: WebSocket, room: str = DEFAULT_ROOM, binary: bool = False) -> None:
+        """
+        이미 accept 된 소켓을 방에 등록하고 writer 태스크 시작
+        """
+        if binary and self.binary_encoder is None:
+            raise ValueError("binary frames require a binary_encoder")
+
+        connections = self.rooms.setdefault(room, {})
+        if webSocket in connections:
+            return
+        conn = _Connection(webSocket, room, self.queue_size, binary)
+        conn.writer = asyncio.create_task(self._write_loop(conn))
+        connections[webSocket] = conn
+
+    def disconnect(self, webSocket: WebSocket, room: str = DEFAULT_ROOM):
+        connections = self.rooms.get(room)
+        if not connections:
+            return
+        conn = connections.pop(webSocket, None)     # 연결 제거
+        if not connections:
+            del self.rooms[room]
+        if conn is not None and conn.writer is not None:
+            conn.writer.cancel()
+
+    def room_size(self, room: str = DEFAULT_ROOM) -> int:
+        return len(self.rooms.get(room, ()))
+
+    async def broadcast(self, message: Any, room: str = DEFAULT_ROOM):
+        # 연결 수와 상관없이 직렬화는 한 번만
+        self.broadcast_text(json.dumps(message, ensure_ascii=False), room)
+
+    def broadcast_text(self, data: str, room: str = DEFAULT_ROOM) -> None:
+        connections = self.rooms.get(room)
+        if not connections:
+            return
+        frames = _Frames(data, self.binary_encoder)
+        for conn in list(connections.values()):
+            try:
+                conn.queue.put_nowait(frames.for_connection(conn))
+            except asyncio.QueueFull:
+                self._on_slow_consumer(conn)
+
+    def send_text(self, webSocket: WebSocket, data: str, room: str = DEFAULT_ROOM) -> bool:
+        """
+        연결 하나에만 보낼 메시지 (heartbeat 등). writer 를 거쳐서 broadcast 와 순서가 섞이지 않는다.
+        리턴: 대기열에 넣었는지
+        """
+        conn = self.rooms.get(room, {}).get(webSocket)
+        if conn is None:
+            return False
+        try:
+            conn.queue.put_nowait(_Frames(data, self.binary_encoder).for_connection(conn))
+        except asyncio.QueueFull:
+            self._on_slow_consumer(conn)
+            return False
+        return True
+
+    def _on_slow_consumer(self, conn: _Connection) -> None:
+        conn.dropped += 1
+        if self.slow_consumer_policy == "close":
+            self.disconnect(conn.websocket, conn.room)
+            asyncio.create_task(self._close(conn.websocket))
+
+    def close_room(self, room: str, code: int = 1000, data: str | None = None) -> int:
+        """
+        방의 모든 연결에 (있으면) 마지막 메시지를 보낸 뒤 연결 종료.
+        이미 대기 중인 메시지는 순서대로 먼저 전송된다.
+        리턴: 종료한 연결 수
+        """
+        connections = self.rooms.get(room)
+        if not connections:
+            return 0
+
+        frames = _Frames(data, self.binary_encoder) if data is not None else None
+        conns = list(connections.values())
+        for conn in conns:
+            conn.close_code = code
+            try:
+                if frames is not None:
+                    conn.queue.put_nowait(frames.for_connection(conn))
+                conn.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                # 대기열이 가득 찬 연결은 기다리지 않고 바로 종료
+                self.disconnect(conn.websocket, room)
+                asyncio.create_task(self._close(conn.websocket, code))
+        return len(conns)
+
+    async def _close(self, webSocket: WebSocket, code: int = SLOW_CONSUMER_CLOSE_CODE) -> None:
+        try:
+            await webSocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _write_loop(self, conn: _Connection) -> None:
+        try:
+            while True:
+                data = await conn.queue.get()
+                if data is None:
+                    await self._close(conn.websocket, conn.close_code)
+                    self.disconnect(conn.websocket, conn.room)
+                    return
+                if isinstance(data, bytes):
+                    await conn.websocket.send_bytes(data)
+                else:
+                    await conn.websocket.send_text(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # 끊긴 소켓은 수신 쪽에서도 disconnect 하지만, 먼저 알게 되면 여기서 정리
+            connections = self.rooms.get(conn.room)
+            if connections and connections.get(conn.websocket) is conn:
+                self.disconnect(conn.websocket, conn.room)
+
+    def close_all(self) -> None:
+        for room in list(self.rooms):
+            for webSocket in list(self.rooms.get(room, ())):
+                self.disconnect(webSocket, room)
@@ -1,4 +1,5 @@
 import os
+from redis import Redis as SyncRedis
 from redis.asyncio import Redis
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
@@ -6,9 +7,23 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 # 간단하게 전역 싱글톤처럼 사용
 redis_client = Redis.from_url(REDIS_URL, decode_responses=True)
 
+# 동기 코드 경로(sync 라우터/서비스)에서 쓰는 클라이언트
+sync_redis_client = SyncRedis.from_url(REDIS_URL, decode_responses=True)
+
+# 채팅 메시지(msgpack 등 바이너리 값) 읽기용 (응답을 문자열로 디코딩하지 않음)
+redis_binary_client = Redis.from_url(REDIS_URL)
+sync_redis_binary_client = SyncRedis.from_url(REDIS_URL)
+
 
 async def get_redis() -> Redis:
     """
     FastAPI Depends 에서 사용하는 의존성 함수.
     """
     return redis_client
+
+
+async def get_binary_redis() -> Redis:
+    """
+    바이너리 값을 그대로 읽는 클라이언트 (채팅 메시지 조회용)
+    """
+    return redis_binary_client
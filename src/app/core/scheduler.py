@@ -1,11 +1,44 @@
+import asyncio
+import os
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
+from app.core.chat_fanout import chat_fanout
 from app.core.database import SessionLocal
-from app.services.match_service import create_daily_match_results_by_best_score
+from app.core.redis_client import sync_redis_binary_client
+from app.services.chat_service import (
+    ChatExpirySummary,
+    archive_ended_chat_rooms,
+    end_expired_chat_rooms,
+)
+from app.services.match_exclusion_service import ensure_match_exclusions
+from app.services.match_service import create_daily_match_results
+from app.services.online_match_service import online_match_pool
+from app.stores.storage import store as job_store
+
+# 매칭 전략 선택: best_score / cohort / exact / local_search
+MATCH_MODE = os.getenv("MATCH_MODE", "best_score")
+# exact / local_search 전략의 시간 예산 (초)
+MATCH_TIME_BUDGET_SECONDS = float(os.getenv("MATCH_TIME_BUDGET_SECONDS", "60"))
+# 샤드 분할 규칙 (콤마 구분, 예: "region,opposite_gender" / 비우면 전체 1개 샤드)
+MATCH_PARTITION_RULES = tuple(
+    rule.strip()
+    for rule in os.getenv("MATCH_PARTITION_RULES", "").split(",")
+    if rule.strip()
+)
+# 샤드 병렬 매칭 프로세스 수
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", str(os.cpu_count() or 1)))
+# 온라인 매칭 마이크로 배치 주기 (초)
+ONLINE_MATCH_INTERVAL_SECONDS = float(os.getenv("ONLINE_MATCH_INTERVAL_SECONDS", "5"))
+# 만료 채팅방 정리 주기 (초)
+CHAT_EXPIRY_INTERVAL_SECONDS = float(os.getenv("CHAT_EXPIRY_INTERVAL_SECONDS", "60"))
+# 백링크 작업 lease / 디바이스 heartbeat 만료 확인 주기 (초)
+JOB_REAPER_INTERVAL_SECONDS = float(os.getenv("JOB_REAPER_INTERVAL_SECONDS", "10"))
 
 # 한국 시간 기준으로 돌리고 싶으면 timezone 설정
 scheduler = AsyncIOScheduler(timezone=ZoneInfo("Asia/Seoul"))
@@ -23,6 +56,19 @@ def run_match_after_5_seconds():
     print(f"[scheduler] 5초 뒤 매칭 실행 예약됨: {run_at}")
 
 
+def run_match_exclusion_backfill():
+    """
+    과거 매칭 인덱스(match_exclusions) backfill 기록이 없으면 match_results 전체로 재구성.
+    매칭 잡이 인덱스에 쓰기 전에 start_scheduler 에서 먼저 실행한다.
+    """
+    db = SessionLocal()
+    try:
+        if ensure_match_exclusions(db):
+            print(f"[{datetime.now()}] 과거 매칭 인덱스 재구성 완료")
+    finally:
+        db.close()
+
+
 def run_daily_match_job():
     """
     매일 0시에 실행될 실제 작업 함수.
@@ -30,20 +76,108 @@ def run_daily_match_job():
     """
     db = SessionLocal()
     try:
-        created_matches = create_daily_match_results_by_best_score(db)
+        created_matches = create_daily_match_results(
+            db,
+            strategy=MATCH_MODE,
+            time_budget_seconds=MATCH_TIME_BUDGET_SECONDS,
+            partition_rules=MATCH_PARTITION_RULES,
+            max_workers=MATCH_WORKERS,
+        )
+        # 야간 매칭이 전체를 다시 짝지었으므로 온라인 풀은 비움
+        online_match_pool.reset()
         print(
-            f"[{datetime.now()}] daily match job 실행. "
+            f"[{datetime.now()}] daily match job 실행({MATCH_MODE}). "
             f"생성된 매칭 수 = {len(created_matches)}"
         )
     finally:
         db.close()
 
 
+def run_online_match_job():
+    """
+    몇 초마다 실행되는 온라인 매칭 마이크로 배치.
+    새로 eligible 이 된 유저를 대기 풀과 바로 매칭한다.
+    """
+    if not online_match_pool.has_pending():
+        return
+
+    db = SessionLocal()
+    try:
+        created_matches = online_match_pool.process_pending(db)
+        if created_matches:
+            print(
+                f"[{datetime.now()}] online match job 실행. "
+                f"생성된 매칭 수 = {len(created_matches)}, 대기 풀 = {len(online_match_pool)}"
+            )
+    finally:
+        db.close()
+
+
+def _end_expired_chat_rooms() -> ChatExpirySummary:
+    db = SessionLocal()
+    try:
+        return end_expired_chat_rooms(db)
+    finally:
+        db.close()
+
+
+def _archive_ended_chat_rooms() -> int:
+    db = SessionLocal()
+    try:
+        return archive_ended_chat_rooms(db, sync_redis_binary_client)
+    finally:
+        db.close()
+
+
+async def run_chat_expiry_job():
+    """
+    주기적으로 만료된 채팅방을 CHAT_ENDED 처리하고 유저를 채팅 상태에서 해제한 뒤,
+    열려 있는 WebSocket 을 (모든 워커에서) 닫고 대화 기록을 Postgres 로 보관한다.
+    """
+    # DB/Redis 동기 작업은 이벤트 루프를 막지 않도록 스레드에서
+    summary = await asyncio.to_thread(_end_expired_chat_rooms)
+    if summary.rooms:
+        await chat_fanout.close_rooms(
+            [room.chat_room_id for room in summary.rooms if room.chat_room_id]
+        )
+
+    # 소켓을 닫은 뒤 보관 (이전 실행에서 보관하지 못한 방도 같이 처리)
+    archived = await asyncio.to_thread(_archive_ended_chat_rooms)
+
+    if summary.rooms or archived:
+        print(
+            f"[{datetime.now()}] chat expiry job 실행. "
+            f"종료된 채팅방 = {len(summary.rooms)}, 해제된 유저 = {summary.users_freed}, "
+            f"배치 = {summary.batches}, 보관된 채팅방 = {archived}"
+        )
+
+
+async def run_job_reaper_job():
+    """
+    주기적으로 lease 가 끝난 백링크 작업(디바이스가 죽은 작업)을 큐에 되돌리고
+    heartbeat 가 끊긴 디바이스를 OFFLINE 처리한다.
+    (워커마다 돌아도 저장소에서 원자적으로 처리되므로 중복 처리 없음)
+    """
+    summary = await job_store.reap_expired()
+    if summary.requeued or summary.failed or summary.offline_devices:
+        print(
+            f"[{datetime.now()}] job reaper 실행. "
+            f"되돌린 작업 = {len(summary.requeued)}, 실패 처리 = {len(summary.failed)}, "
+            f"OFFLINE 디바이스 = {len(summary.offline_devices)}"
+        )
+
+
 def start_scheduler():
     """
     앱 시작 시 호출할 함수.
     - 매일 0시(한국 시간)에 run_daily_match_job 실행
+    - ONLINE_MATCH_INTERVAL_SECONDS 마다 run_online_match_job 실행
+    - CHAT_EXPIRY_INTERVAL_SECONDS 마다 run_chat_expiry_job 실행
+    - JOB_REAPER_INTERVAL_SECONDS 마다 run_job_reaper_job 실행
+    잡 등록 전에 과거 매칭 인덱스 backfill 부터 확인한다.
     """
+    run_match_exclusion_backfill()
+
     # 이미 등록된 job 있으면 중복 방지
     if not scheduler.get_jobs():
         scheduler.add_job(
@@ -52,6 +186,30 @@ def start_scheduler():
             id="daily_match_job",
             replace_existing=True,
         )
+        scheduler.add_job(
+            run_online_match_job,
+            IntervalTrigger(seconds=ONLINE_MATCH_INTERVAL_SECONDS),
+            id="online_match_job",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+        scheduler.add_job(
+            run_chat_expiry_job,
+            IntervalTrigger(seconds=CHAT_EXPIRY_INTERVAL_SECONDS),
+            id="chat_expiry_job",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+        scheduler.add_job(
+            run_job_reaper_job,
+            IntervalTrigger(seconds=JOB_REAPER_INTERVAL_SECONDS),
+            id="job_reaper_job",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
     scheduler.start()
     print("APScheduler started.")
 
@@ -4,6 +4,9 @@ from .routers import userJob
 from .routers import profile
 from .core.database import Base, engine
 from .core.scheduler import start_scheduler, shutdown_scheduler, run_match_after_5_seconds
+from .core.chat_fanout import chat_fanout
+from .stores.storage import store as job_store
+from .services.chat_write_service import chat_write_buffer
 from .routers import chat_websocket
 from .routers import auth
 from .routers import match
@@ -25,6 +28,7 @@ app.include_router(chat_websocket.router)
 app.include_router(auth.router)
 app.include_router(match.router)
 app.include_router(chat.router)
+app.include_router(chat.ws_router)
 app.include_router(dev_auth.router)
 
 # 개발 단계에서는 자동 테이블 생성
@@ -45,8 +49,13 @@ def on_startup():
 
 
 @app.on_event("shutdown")
-def on_shutdown():
+async def on_shutdown():
     shutdown_scheduler()
+    # 버퍼에 남은 채팅 메시지를 먼저 저장한 뒤 pub/sub 정리
+    await chat_write_buffer.close()
+    await chat_fanout.close()
+    # long-poll heartbeat 알림 리스너 정리
+    await job_store.close()
 
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
@@ -0,0 +1,86 @@
+# app/models/backlink.py
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Float, Index
+from datetime import datetime
+
+from ..core.database import Base
+
+
+class BacklinkJob(Base):
+    """
+    백링크 작업 큐 (JOB_STORE_BACKEND=postgres 일 때 사용).
+    QUEUED 작업을 SELECT ... FOR UPDATE SKIP LOCKED 로 하나씩 claim 한다.
+    """
+    __tablename__ = "backlink_jobs"
+
+    # 도메인 안에서 priority 높은 순 → id 순 (먼저 등록된 작업부터 할당)
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(50), unique=True, nullable=False)
+
+    job_type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+
+    # 대상 사이트 도메인 (도메인별 큐/제한 단위) / 같은 도메인 안에서 높을수록 먼저
+    domain = Column(String(255), nullable=False, default="unknown")
+    priority = Column(Integer, nullable=False, default=0)
+
+    # board.siteType (디바이스가 처리할 수 있는 종류만 할당) / 로그인이 필요하면 세션 키 ("도메인|계정")
+    site_type = Column(String(50), nullable=False, default="Unknown")
+    session_key = Column(String(400), nullable=True)
+
+    # QUEUED / RUNNING / SUCCESS / FAILED
+    status = Column(String(20), index=True, nullable=False, default="QUEUED")
+    # 디바이스가 실행 중인 작업 목록도 이 컬럼으로 조회
+    assigned_device = Column(String(100), index=True, nullable=True)
+
+    # RUNNING 작업의 lease 만료 시각 (reaper 가 이 인덱스 순으로 만료된 작업만 꺼냄)
+    lease_deadline = Column(DateTime, index=True, nullable=True)
+    # lease 만료로 큐에 되돌려진 횟수
+    attempts = Column(Integer, nullable=False, default=0)
+
+    results = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # 도메인별 다음 작업 조회용
+        Index("ix_backlink_jobs_domain_queue", "domain", "status", "priority", "id"),
+    )
+
+
+class BacklinkDomain(Base):
+    """
+    도메인별 스케줄링 상태 (대기/실행 수, 공정 분배용 pass, 토큰 버킷).
+    할당할 때 이 행을 잠가서 같은 도메인의 동시 실행 수 / 게시 속도 한도를 지킨다.
+    """
+    __tablename__ = "backlink_domains"
+
+    domain = Column(String(255), primary_key=True)
+
+    # 대기 중인 작업 수 (0 보다 크면 할당 후보) / 실행 중인 작업 수
+    queued = Column(Integer, nullable=False, default=0)
+    running = Column(Integer, nullable=False, default=0)
+
+    # 작은 도메인부터 할당, 할당마다 1 / weight 증가
+    pass_ = Column("pass", Float, index=True, nullable=False, default=0)
+
+    # 토큰 버킷 (tokens 가 NULL 이면 가득 찬 상태)
+    tokens = Column(Float, nullable=True)
+    tokens_at = Column(DateTime, nullable=True)
+
+
+class BacklinkDevice(Base):
+    """
+    작업 디바이스 상태 (heartbeat 마다 갱신).
+    """
+    __tablename__ = "backlink_devices"
+
+    id = Column(String(100), primary_key=True)
+
+    # IDLE / RUNNING / BUSY / OFFLINE
+    state = Column(String(20), nullable=True)
+    # heartbeat 로 받은 능력 (siteTypes / slots / sessions)
+    capabilities = Column(JSON, nullable=True)
+
+    last_seen = Column(DateTime, index=True, nullable=True)
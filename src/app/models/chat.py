@@ -0,0 +1,30 @@
+# app/models/chat.py
+from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, LargeBinary
+from datetime import datetime
+
+from ..core.database import Base
+
+
+class ChatTranscript(Base):
+    """
+    종료된 채팅방 대화 기록 보관본 (방 1개 = 1행).
+    채팅이 끝나면 Redis 스트림을 한 번에 읽어서 압축 저장하고 Redis 키는 삭제한다.
+    """
+    __tablename__ = "chat_transcripts"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    match_id = Column(Integer, ForeignKey("match_results.id"), unique=True, nullable=False)
+    chat_room_id = Column(String(100), index=True, nullable=False)
+
+    # 메시지 수 / 첫·마지막 메시지 시각 (압축을 풀지 않고 조회용)
+    message_count = Column(Integer, nullable=False, default=0)
+    first_message_at = Column(DateTime, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+
+    # 인코딩 방식 ("<코덱>+zlib": 축약 레코드를 메시지 코덱으로 인코딩 → zlib 압축,
+    # 이전 보관본은 "jsonl+zlib": 메시지 JSON 한 줄씩 → zlib 압축)
+    encoding = Column(String(20), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    archived_at = Column(DateTime, default=datetime.utcnow)
@@ -1,5 +1,5 @@
 # app/models/match.py
-from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, Text, Boolean, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy import Enum as SAEnum
 from .enums import MatchStatus
@@ -31,12 +31,14 @@ class MatchResult(Base):
 
     # 전체 궁합 스코어 (0~100 같은 범위)
     compatibility_score = Column(Integer, nullable=True)
-    # 궁합 리포트 (1~2 단락 정도 텍스트)
+    # 궁합 리포트 (1~2 단락 정도 텍스트, 키가 없는 이전 매칭용)
     compatibility_report = Column(Text, nullable=True)
+    # 궁합 리포트 카탈로그 키 (report_service.COMPATIBILITY_REPORT_CATALOG)
+    compatibility_report_key = Column(String(16), nullable=True)
 
 
     # 채팅방 연동용
-    chat_room_id = Column(String(100), nullable=True)
+    chat_room_id = Column(String(100), nullable=True, index=True)
     chat_expires_at = Column(DateTime, nullable=True)
 
     # match 생성 일시
@@ -45,3 +47,30 @@ class MatchResult(Base):
     # 관계
     user_a = relationship("User", foreign_keys=[user_a_id])
     user_b = relationship("User", foreign_keys=[user_b_id])
+
+
+class MatchExclusion(Base):
+    """
+    과거 매칭 상대 인덱스 (유저별 1행).
+    매칭이 생성될 때마다 갱신되며, 야간 매칭은 eligible 유저 행만 읽는다.
+    """
+    __tablename__ = "match_exclusions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    # 과거 매칭 상대 user_id 들 (정렬된 int32 배열을 bytes 로 저장)
+    partner_ids = Column(LargeBinary, nullable=False, default=b"")
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class MatchExclusionBackfill(Base):
+    """
+    match_exclusions 를 match_results 전체로 재구성한 기록 (id=1 한 행).
+    이 행이 없으면 인덱스가 과거 이력을 다 담고 있다고 볼 수 없으므로 시작할 때 재구성한다.
+    """
+    __tablename__ = "match_exclusion_backfill"
+
+    id = Column(Integer, primary_key=True)
+
+    completed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,6 +1,11 @@
+import asyncio
+import json
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+import msgpack
 from fastapi import (
     APIRouter,
     Depends,
@@ -22,13 +27,29 @@ from app.models.match import MatchResult
 from app.models.user import User
 from app.models.enums import MatchStatus
 
-from app.core.redis_client import get_redis
-from app.schemas.chat import ChatRoomResponse, ChatAcceptRequest
+from app.core.redis_client import get_redis, get_binary_redis
+from app.core.chat_fanout import chat_fanout, CHAT_EXPIRED_CLOSE_CODE, CHAT_EXPIRED_MESSAGE
+from app.services.chat_codec import WS_FRAME_FORMATS, pack_frame, unpack_client_message
+from app.services.chat_connection_service import (
+    CHAT_HEARTBEAT_INTERVAL_SECONDS,
+    CHAT_IDLE_TIMEOUT_SECONDS,
+    CHAT_IDLE_CLOSE_CODE,
+    CHAT_TOO_MANY_CONNECTIONS_CLOSE_CODE,
+    acquire_chat_connection,
+    release_chat_connection,
+)
+from app.services.chat_write_service import chat_write_buffer
+from app.schemas.chat import ChatRoomResponse, ChatAcceptRequest, ChatHistoryResponse
 from app.services.chat_service import (
+    CHAT_HISTORY_MAX_LIMIT,
     get_active_chat_room,
     update_chat_accept,
-    save_chat_message,
+    ChatMessageWrite,
     load_recent_messages,
+    load_messages_after,
+    load_messages_before,
+    is_chat_message_id,
+    get_chat_room_meta,
 )
 
 # HTTP용 라우터 (REST)
@@ -153,7 +174,49 @@ def accept_chat_api(
 
 
 # =========================
-# 3) WebSocket 채팅
+# 3) 채팅 메시지 페이지 조회
+#    GET /api/profile/match/chat-room/{chatRoomId}/messages?before=...&limit=50
+# =========================
+
+@router.get(
+    "/chat-room/{chatRoomId}/messages",
+    response_model=ApiResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_chat_messages_api(
+    chatRoomId: str,
+    before: Optional[str] = Query(None, description="이 메시지 id 이전 페이지 (없으면 최신)"),
+    limit: int = Query(50, ge=1, le=CHAT_HISTORY_MAX_LIMIT),
+    redis: Redis = Depends(get_redis),
+    binary_redis: Redis = Depends(get_binary_redis),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    위로 스크롤 시 이전 메시지를 커서(nextCursor) 기반으로 조회.
+    """
+    room = await get_chat_room_meta(redis, chatRoomId)
+    if not room:
+        raise Exception("유효하지 않은 채팅방입니다.")
+
+    if not room.is_participant(current_user.user_id):
+        raise Exception("이 채팅방에 참여할 수 없습니다.")
+
+    if before is not None and not is_chat_message_id(before):
+        raise Exception("잘못된 커서입니다.")
+
+    messages, next_cursor = await load_messages_before(
+        binary_redis, chatRoomId, before_id=before, limit=limit
+    )
+
+    return ApiResponse(
+        code=200,
+        message="채팅 메시지 조회 성공",
+        result=ChatHistoryResponse(messages=messages, nextCursor=next_cursor),
+    )
+
+
+# =========================
+# 4) WebSocket 채팅
 #    WS /ws/chat/{chatRoomId}
 # =========================
 # WebSocket은 prefix 없이 app 레벨에 붙이는 게 일반적이어서
@@ -163,117 +226,268 @@ def accept_chat_api(
 ws_router = APIRouter(tags=["match-chat-ws"])
 
 
-# ---- JWT 토큰에서 user_id 추출 헬퍼 (프로젝트 구조에 맞게 수정해서 써라) ----
-from jose import jwt, JWTError  # auth에서 이미 쓰고 있다면 중복 제거 가능
-
-# 실제 서비스에선 settings 에서 가져오도록 수정
-JWT_SECRET = "CHANGE_ME_TO_REAL_SECRET"
-JWT_ALGORITHM = "HS256"
+# ---- JWT 토큰에서 user_id 추출 헬퍼 ----
+from app.services.jwt_service import try_decode_access_token, InvalidTokenError
 
 
 def _decode_user_id_from_token(token: str) -> Optional[int]:
     """
-    WebSocket 연결 시 query param 으로 받은 JWT에서 user_id만 추출.
-    실제 JWT 페이로드 구조에 맞게 필드명 수정해서 쓰면 된다.
+    WebSocket 연결 시 query param 으로 받은 AccessToken 에서 user_id만 추출.
+    (HTTP 인증과 같은 키/형식: {"user_id": 123, ...})
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("user_id")  # 예: {"user_id": 123, ...}
+        payload = try_decode_access_token(token)
+        user_id = payload.get("user_id")
         if user_id is None:
             return None
         return int(user_id)
-    except JWTError:
+    except InvalidTokenError:
         return None
     except (TypeError, ValueError):
         return None
 
 
+async def _send_frame(websocket: WebSocket, payload: dict, binary: bool) -> None:
+    if binary:
+        await websocket.send_bytes(pack_frame(payload))
+    else:
+        await websocket.send_json(payload)
+
+
+# heartbeat 프레임 종류 ({"type": "ping"} / {"type": "pong"})
+HEARTBEAT_PING = "ping"
+HEARTBEAT_PONG = "pong"
+_PING_FRAME = json.dumps({"type": HEARTBEAT_PING})
+_PONG_FRAME = json.dumps({"type": HEARTBEAT_PONG})
+
+
+def _heartbeat_type(payload) -> Optional[str]:
+    if isinstance(payload, dict) and payload.get("type") in (HEARTBEAT_PING, HEARTBEAT_PONG):
+        return payload["type"]
+    return None
+
+
+async def _receive_message(websocket: WebSocket) -> tuple[Optional[str], Optional[str]]:
+    """
+    텍스트 프레임은 그대로, 바이너리 프레임은 msgpack 으로 풀어서
+    리턴: (메시지 본문, heartbeat 종류) — heartbeat 프레임이면 본문은 None
+    """
+    frame = await websocket.receive()
+    if frame["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(frame.get("code", 1000))
+
+    text = frame.get("text")
+    if text is not None:
+        if text.startswith("{"):
+            try:
+                heartbeat = _heartbeat_type(json.loads(text))
+            except ValueError:
+                heartbeat = None
+            if heartbeat:
+                return None, heartbeat
+        return text, None
+
+    try:
+        return unpack_client_message(frame["bytes"]), None
+    except ValueError:
+        heartbeat = _heartbeat_type(msgpack.unpackb(frame["bytes"], raw=False))
+        if heartbeat is None:
+            raise
+        return None, heartbeat
+
+
+async def _close_with(websocket: WebSocket, payload: dict, code: int, binary: bool) -> None:
+    # 이미 끊긴 소켓일 수 있어서 전송/종료 실패는 무시
+    try:
+        await _send_frame(websocket, payload, binary)
+        await websocket.close(code=code)
+    except Exception:
+        pass
+
+
 @ws_router.websocket("/ws/chat/{chatRoomId}")
 async def websocket_chat(
     websocket: WebSocket,
     chatRoomId: str,
     token: str = Query(..., description="JWT access token"),
-    db: Session = Depends(get_db),
+    lastMessageId: Optional[str] = Query(None, description="재접속 시 마지막으로 받은 메시지 id"),
+    format: str = Query("json", description="서버 → 클라이언트 프레임 형식 (json / msgpack)"),
     redis: Redis = Depends(get_redis),
+    binary_redis: Redis = Depends(get_binary_redis),
 ):
     """
     - 클라이언트는 ws 연결 시:  ws://.../ws/chat/{chatRoomId}?token=JWT  형태로 접속.
+      재접속이면 &lastMessageId=<마지막으로 받은 메시지 id> 를 붙인다.
     - chatRoomId 유효성, 만료 시간, 참여 권한 검증.
+      (Redis 방 메타데이터 캐시로 확인, miss 일 때만 DB 를 짧게 조회 → 연결 동안 DB 세션을 잡지 않음)
     - 접속 시 최근 메시지(최대 50개) history 내려주고,
-      이후 들어오는 메시지는 Redis에 12시간 TTL로 저장.
+      lastMessageId 가 있으면 그 이후에 놓친 메시지만 내려준다. (hasMore 면 HTTP 페이지 조회로 보충)
+    - 이후 들어오는 메시지는 write-behind 버퍼에 넣고 바로 다음 메시지를 받는다.
+      버퍼가 배치로 Redis Stream 에 저장(TTL = 채팅 만료 시각)하면서 같은 명령에서
+      Redis pub/sub 으로 방 전체에 fan-out
+      (상대가 다른 워커/호스트에 붙어 있어도 전달, 보낸 사람도 같은 메시지를 받음)
+    - &format=msgpack 이면 서버 → 클라이언트 프레임을 msgpack 바이너리로 보낸다.
+      채팅 메시지는 축약 레코드 {i: id, s: senderId, m: message, t: 작성 시각(epoch ms)}.
+      클라이언트 → 서버는 형식과 상관없이 텍스트 프레임 또는 msgpack 바이너리 프레임 모두 가능.
+    - heartbeat: 서버가 주기적으로 {"type": "ping"} 을 보내면 클라이언트는 {"type": "pong"} 으로 응답.
+      (클라이언트가 먼저 ping 을 보내면 서버가 pong 응답) heartbeat 프레임은 저장/전달하지 않는다.
+      idle timeout 동안 아무 프레임도 없으면 4408 로, 채팅 만료 시각이 지나면 4402 로 연결을 끊는다.
+    - 사용자별/방별 동시 접속 수를 넘기면 4429 로 거절한다.
     """
     await websocket.accept()
 
+    binary = format == "msgpack"
+    if format not in WS_FRAME_FORMATS:
+        await websocket.send_json(
+            {"code": 400, "message": "지원하지 않는 형식입니다.", "result": None}
+        )
+        await websocket.close(code=4400)
+        return
+
     # 1) 토큰 검증 및 user_id 추출
     user_id = _decode_user_id_from_token(token)
     if not user_id:
-        await websocket.send_json(
-            {"code": 401, "message": "인증 실패", "result": None}
+        await _send_frame(
+            websocket,
+            {"code": 401, "message": "인증 실패", "result": None},
+            binary,
         )
         await websocket.close(code=4401)
         return
 
-    # 2) chatRoomId → MatchResult 확인
-    match: Optional[MatchResult] = (
-        db.query(MatchResult)
-        .filter(MatchResult.chat_room_id == chatRoomId)
-        .first()
-    )
+    # 2) chatRoomId → 채팅방 메타데이터 확인
+    room = await get_chat_room_meta(redis, chatRoomId)
 
-    if not match:
-        await websocket.send_json(
-            {"code": 400, "message": "유효하지 않은 채팅방입니다.", "result": None}
+    if not room:
+        await _send_frame(
+            websocket,
+            {"code": 400, "message": "유효하지 않은 채팅방입니다.", "result": None},
+            binary,
         )
         await websocket.close(code=4404)
         return
 
     # 참여 권한 체크
-    if user_id not in (match.user_a_id, match.user_b_id):
-        await websocket.send_json(
-            {"code": 403, "message": "이 채팅방에 참여할 수 없습니다.", "result": None}
+    if not room.is_participant(user_id):
+        await _send_frame(
+            websocket,
+            {"code": 403, "message": "이 채팅방에 참여할 수 없습니다.", "result": None},
+            binary,
         )
         await websocket.close(code=4403)
         return
 
     # 3) 채팅 만료 체크
-    now = datetime.now(timezone.utc)
-    if not match.chat_expires_at or match.chat_expires_at <= now:
-        await websocket.send_json(
-            {"code": 400, "message": "만료된 채팅방입니다.", "result": None}
+    if room.is_expired():
+        await _send_frame(
+            websocket,
+            {"code": 400, "message": "만료된 채팅방입니다.", "result": None},
+            binary,
         )
         await websocket.close(code=4402)
         return
 
-    # 4) 최근 메시지 history 로딩 (옵션)
-    recent_messages = await load_recent_messages(redis, chatRoomId, limit=50)
+    # 4) 동시 접속 상한 확인 (사용자별 / 방별, 모든 워커 합산)
+    connection_id = uuid.uuid4().hex
+    denied = await acquire_chat_connection(redis, chatRoomId, user_id, connection_id)
+    if denied:
+        await _send_frame(
+            websocket,
+            {"code": 429, "message": "동시 접속 수를 초과했습니다.", "result": None},
+            binary,
+        )
+        await websocket.close(code=CHAT_TOO_MANY_CONNECTIONS_CLOSE_CODE)
+        return
 
-    await websocket.send_json(
-        {
-            "code": 200,
-            "message": "채팅 활성화 성공",
-            "result": {
-                "history": recent_messages,
+    try:
+        # 5) history 로딩 (재접속이면 놓친 메시지만)
+        # history 조회 전에 방을 구독해서 그 사이 메시지가 빠지지 않게 한다.
+        # (겹치는 메시지는 클라이언트가 id 로 중복 제거)
+        await chat_fanout.join(chatRoomId, websocket, binary)
+
+        resumed = is_chat_message_id(lastMessageId)
+        if resumed:
+            history, has_more = await load_messages_after(binary_redis, chatRoomId, lastMessageId)
+        else:
+            history = await load_recent_messages(binary_redis, chatRoomId, limit=50)
+            has_more = False
+
+        await _send_frame(
+            websocket,
+            {
+                "code": 200,
+                "message": "채팅 활성화 성공",
+                "result": {
+                    "history": history,
+                    "resumed": resumed,
+                    "hasMore": has_more,
+                },
             },
-        }
-    )
+            binary,
+        )
 
-    # 5) 채팅 루프
-    try:
+        # 6) 채팅 루프
+        # - CHAT_HEARTBEAT_INTERVAL_SECONDS 마다 ping 을 보내고 접속 lease 갱신
+        # - CHAT_IDLE_TIMEOUT_SECONDS 동안 아무 프레임도 안 오면 연결 종료
+        # - 채팅 만료 시각이 지나면 만료 메시지를 보내고 연결 종료
+        expire_at = room.expires_at
+        last_seen = time.monotonic()
+        next_ping = last_seen + CHAT_HEARTBEAT_INTERVAL_SECONDS
         while True:
-            text = await websocket.receive_text()
-
-            # Redis 에 메시지 저장 (12시간 TTL)
-            await save_chat_message(
-                redis=redis,
-                chat_room_id=chatRoomId,
-                sender_id=user_id,
-                message=text,
+            now = time.monotonic()
+            if time.time() >= expire_at:
+                await chat_fanout.leave(chatRoomId, websocket)
+                await _close_with(websocket, CHAT_EXPIRED_MESSAGE, CHAT_EXPIRED_CLOSE_CODE, binary)
+                return
+
+            idle_deadline = last_seen + CHAT_IDLE_TIMEOUT_SECONDS
+            if now >= idle_deadline:
+                await chat_fanout.leave(chatRoomId, websocket)
+                await _close_with(
+                    websocket,
+                    {"code": 408, "message": "응답이 없어 연결을 종료합니다.", "result": None},
+                    CHAT_IDLE_CLOSE_CODE,
+                    binary,
+                )
+                return
+
+            if now >= next_ping:
+                chat_fanout.manager.send_text(websocket, _PING_FRAME, chatRoomId)
+                await acquire_chat_connection(redis, chatRoomId, user_id, connection_id)
+                next_ping = now + CHAT_HEARTBEAT_INTERVAL_SECONDS
+
+            timeout = min(next_ping, idle_deadline) - now
+            timeout = min(timeout, expire_at - time.time())
+            try:
+                text, heartbeat = await asyncio.wait_for(
+                    _receive_message(websocket), timeout=max(timeout, 0)
+                )
+            except asyncio.TimeoutError:
+                continue
+            except ValueError:
+                # 잘못된 바이너리 프레임은 무시 (활동으로는 취급)
+                last_seen = time.monotonic()
+                continue
+
+            last_seen = time.monotonic()
+            if heartbeat == HEARTBEAT_PING:
+                chat_fanout.manager.send_text(websocket, _PONG_FRAME, chatRoomId)
+            if heartbeat:
+                continue
+
+            # 저장 + 방 전체 전달은 버퍼가 배치로 처리
+            # (history 와 같은 {id, senderId, message, createdAt} 형식으로 전달됨)
+            await chat_write_buffer.submit(
+                ChatMessageWrite(
+                    chat_room_id=chatRoomId,
+                    sender_id=user_id,
+                    message=text,
+                    expire_at=expire_at,
+                )
             )
 
-            # 지금은 단일 연결 기준 echo 예시.
-            # 추후 여러 클라이언트 브로드캐스트 구조로 확장 가능.
-            await websocket.send_text(text)
-
     except WebSocketDisconnect:
-        # 연결 끊겼을 때 정리 로직이 필요하면 여기에 추가
         pass
+    finally:
+        await chat_fanout.leave(chatRoomId, websocket)
+        await release_chat_connection(redis, chatRoomId, user_id, connection_id)
@@ -1,31 +1,51 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
 from ..schemas.heartbeat import (
     HeartbeatRequest, HeartbeatResponseNone, HeartbeatResponseRun,
     JobEnqueueRequest, JobResultReport, JobPayload
 )
-from ..stores.storage import store
+from ..stores.storage import DeviceCapabilities, Job, JOB_WAIT_MAX_SECONDS, session_key, store
 
 router = APIRouter(prefix="/api/backlink/machine", tags=["Backlink-Machine"])
 
+
+def _capabilities(hb: HeartbeatRequest) -> DeviceCapabilities:
+    return DeviceCapabilities(
+        site_types=tuple(hb.siteTypes) if hb.siteTypes is not None else None,
+        slots=hb.slots,
+        sessions=tuple(session_key(s.siteDomain, s.userName) for s in hb.sessions),
+    )
+
+
+def _run_response(job: Job) -> HeartbeatResponseRun:
+    return HeartbeatResponseRun(
+        action="RUN",
+        job=JobPayload(
+            jobId=job.jobId,
+            jobType=job.jobType,
+            payload=job.payload
+        )
+    )
+
+
 @router.post("/heartbeat", responses={
     200: {"model": HeartbeatResponseNone | HeartbeatResponseRun}
 })
 async def heartbeat(hb: HeartbeatRequest):
-    # 디바이스 상태 갱신
-    await store.update_device(hb.deviceId, hb.state)
+    # 디바이스 상태/능력 갱신
+    capabilities = _capabilities(hb)
+    await store.update_device(hb.deviceId, hb.state, capabilities, hb.runningJobIds)
 
-    # IDLE이면 작업 할당 시도
+    # IDLE(빈 슬롯 있음)이면 작업 할당 시도 (waitSeconds 가 있으면 작업이 들어올 때까지 기다림)
     if hb.state == "IDLE":
-        job = await store.assign_job_if_any(hb.deviceId)
+        if hb.waitSeconds:
+            job = await store.wait_for_job(hb.deviceId, hb.waitSeconds, capabilities, hb.runningJobIds)
+        else:
+            job = await store.assign_job_if_any(hb.deviceId, capabilities, hb.runningJobIds)
         if job:
-            return HeartbeatResponseRun(
-                action="RUN",
-                job=JobPayload(
-                    jobId=job.jobId,
-                    jobType=job.jobType,
-                    payload=job.payload
-                )
-            )
+            return _run_response(job)
     # 작업 없음
     return HeartbeatResponseNone(action="NONE")
 
@@ -36,3 +56,96 @@ async def report_result(report: JobResultReport):
         raise HTTPException(status_code=404, detail="job not found")
     return {"ok": True}
 
+
+# ==============================
+# WebSocket 작업 push
+# ==============================
+async def _push_jobs(websocket: WebSocket, device_id: str, idle: asyncio.Event, latest: dict) -> None:
+    """
+    디바이스가 IDLE 인 동안 작업이 들어오면 바로 RUN 프레임으로 보냄.
+    보낸 뒤에는 디바이스가 다시 IDLE heartbeat 를 보낼 때까지 쉰다.
+    latest 는 마지막 heartbeat 의 디바이스 능력 / 실행 중 jobId 목록.
+    """
+    while True:
+        await idle.wait()
+        job = await store.wait_for_job(
+            device_id,
+            JOB_WAIT_MAX_SECONDS,
+            latest["capabilities"],
+            latest["running_job_ids"],
+        )
+        if job is None:
+            continue
+        idle.clear()
+        await websocket.send_json(_run_response(job).model_dump(mode="json"))
+
+
+def _push_failed(pusher: asyncio.Task) -> bool:
+    return pusher.done() and not pusher.cancelled() and pusher.exception() is not None
+
+
+@router.websocket("/ws")
+async def machine_websocket(
+    websocket: WebSocket,
+    deviceId: str = Query(..., min_length=1),
+):
+    """
+    디바이스 WebSocket 채널 (HTTP long-poll heartbeat 대신 사용 가능).
+    - 클라이언트 → 서버: heartbeat 프레임 {"state": "IDLE" | "RUNNING", "lastJobId": ...,
+      "siteTypes": [...], "slots": 1, "sessions": [...], "runningJobIds": [...]}
+      (HTTP heartbeat 와 같은 주기로 보내야 lease 가 연장되고 OFFLINE 처리되지 않음)
+    - 서버 → 클라이언트: 작업이 할당되면 {"action": "RUN", "job": {...}}
+      (HTTP 와 마찬가지로 할당됐는데 runningJobIds 에 없는 작업이 있으면 그 작업을 다시 보냄)
+    - 결과 보고는 기존대로 POST /result
+    - push 가 실패하면 (store 오류, 전송 실패) 1011 로 연결을 닫는다.
+      할당만 되고 전달되지 못한 작업은 재접속 후 runningJobIds 에 없으면 다시 보낸다.
+    """
+    await websocket.accept()
+
+    idle = asyncio.Event()
+    latest = {"capabilities": DeviceCapabilities(), "running_job_ids": None}
+    pusher = asyncio.create_task(_push_jobs(websocket, deviceId, idle, latest))
+    receiver = asyncio.current_task()
+
+    def _on_push_done(task: asyncio.Task) -> None:
+        # heartbeat 만 받고 작업은 못 받는 연결로 남지 않게 수신 루프도 끝낸다
+        if _push_failed(task):
+            print(f"[machine_ws] push failed device={deviceId}: {task.exception()!r}")
+            receiver.cancel()
+
+    pusher.add_done_callback(_on_push_done)
+    try:
+        while True:
+            frame = await websocket.receive_json()
+            try:
+                hb = HeartbeatRequest(**{**frame, "deviceId": deviceId})
+            except (TypeError, ValidationError):
+                await websocket.send_json({"code": 400, "message": "잘못된 heartbeat 입니다.", "result": None})
+                continue
+
+            latest["capabilities"] = _capabilities(hb)
+            latest["running_job_ids"] = hb.runningJobIds
+            await store.update_device(deviceId, hb.state, latest["capabilities"], hb.runningJobIds)
+            if hb.state == "IDLE":
+                idle.set()
+            else:
+                idle.clear()
+    except WebSocketDisconnect:
+        pass
+    except ValueError:
+        # JSON 이 아닌 프레임
+        await websocket.close(code=4400)
+    except asyncio.CancelledError:
+        if not _push_failed(pusher):
+            raise
+        # 이미 끊긴 소켓일 수 있어서 종료 실패는 무시
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        pusher.cancel()
+        try:
+            await pusher
+        except (asyncio.CancelledError, Exception):
+            pass
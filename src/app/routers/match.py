@@ -10,6 +10,7 @@ from app.schemas.profile import ApiResponse
 from app.models.match import MatchResult
 from app.models.profile import Profile
 from app.models.enums import MatchStatus
+from app.services.report_service import resolve_compatibility_report
 
 router = APIRouter(prefix="/api/profile/match")
 
@@ -128,7 +129,10 @@ def get_match_result(
         "matchId": match.id,
         "status": match.status.value,
         "compatibilityScore": match.compatibility_score,
-        "compatibilityReport": match.compatibility_report,
+        "compatibilityReport": resolve_compatibility_report(
+            match.compatibility_report_key,
+            fallback=match.compatibility_report,
+        ),
         "userA": {
             "userId": match.user_a_id,
             # 프로필에 nickname 필드가 있다고 가정
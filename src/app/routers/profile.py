@@ -3,6 +3,7 @@ from ..schemas.profile import ApiResponse, ProfileCreate, ProfileResponse, Match
 from ..models.profile import Profile
 from ..core.database import get_db
 from ..services.profile_service import create_profile_with_survey
+from ..services.online_match_service import online_match_pool
 from sqlalchemy.orm import Session
 from app.core.security import get_current_user
 from app.schemas.auth import CurrentUser
@@ -24,6 +25,9 @@ def create_profile(
     # service 호출
     profile = create_profile_with_survey(db, payload, user_id)
 
+    # 온라인 매칭 대기열에 추가 (다음 마이크로 배치에서 바로 매칭 시도)
+    online_match_pool.enqueue(user_id)
+
     return ApiResponse(
         code=200,
         message="프로필 작성 성공",
@@ -2,7 +2,6 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from ..stores.storage import store
 from ..schemas.heartbeat import BoardWriteJobRequest
-from dataclasses import asdict
 
 router = APIRouter(prefix="/api/backlink", tags=["Backlink"])
 
@@ -13,7 +12,5 @@ async def create_job(req: BoardWriteJobRequest):
 
 @router.get("/queue/status")
 async def queue_status():
-    jobs = {jid: asdict(job) for jid, job in store.jobs.items()}
-    queue = list(store.job_queue)
-    devices = store.devices
-    return {"queue": queue, "jobs": jobs, "devices": devices}
\ No newline at end of file
+    # 대기 중인 jobId / 최근 작업 / 디바이스 상태 (저장소 종류와 무관하게 같은 형태)
+    return await store.queue_status()
\ No newline at end of file
@@ -14,3 +14,15 @@ class ChatRoomResponse(BaseModel):
 class ChatAcceptRequest(BaseModel):
     matchId: int
     accept: bool
+
+
+class ChatMessage(BaseModel):
+    id: Optional[str] = None   # Redis Stream ID (이어받기/페이지 커서로 사용)
+    senderId: int
+    message: str
+    createdAt: str
+
+
+class ChatHistoryResponse(BaseModel):
+    messages: list[ChatMessage]
+    nextCursor: Optional[str]    # 더 오래된 페이지 조회 시 before 로 전달, 없으면 마지막 페이지
@@ -4,9 +4,10 @@ from urllib.parse import urlparse
 
 
 DeviceState = Literal["IDLE", "RUNNING"]
+SiteType = Literal["GnuBoard", "XE", "Imweb", "Cafe24", "Unknown"]
 
 class BoardModel(BaseModel): # 어디에 쓸지
-    siteType: Literal["GnuBoard", "XE", "Imweb", "Cafe24", "Unknown"] = "Unknown"
+    siteType: SiteType = "Unknown"
     siteDomain: str          # 도메인
     siteBaseUrl: str         # 상대경로 보정
     boardName: Optional[str] = None
@@ -36,7 +37,7 @@ class BoardWriteJobRequest(BaseModel):
     keyword: Optional[str] = None
     backlinkUrl: Optional[AnyHttpUrl] = None
     targetBoardUrl: Optional[AnyHttpUrl] = None
-    siteType: Optional[Literal["GnuBoard", "XE", "Imweb", "Cafe24", "Unknown"]] = None  # 선택
+    siteType: Optional[SiteType] = None  # 선택
 
     # 기존 구조도 그대로 받기
     board: Optional[BoardModel] = None
@@ -44,6 +45,9 @@ class BoardWriteJobRequest(BaseModel):
     post: Optional[PostModel] = None
     options: OptionsModel = OptionsModel()
 
+    # 같은 도메인 작업 중에서 높을수록 먼저 할당 (도메인 간 순서는 공정 분배)
+    priority: int = Field(default=0, ge=0, le=100)
+
     @root_validator(pre=True)
     def _fill_minimum_fields(cls, values):
         # 이미 board/post가 오면 그대로 사용
@@ -97,10 +101,29 @@ class HeartbeatResponseRun(BaseModel):
 class HeartbeatResponseNone(BaseModel):
     action: Literal["NONE"] = "NONE"
 
+class SessionModel(BaseModel): # 디바이스에 로그인돼 있는 세션
+    siteDomain: str
+    userName: str
+
 class HeartbeatRequest(BaseModel):
     deviceId: str = Field(min_length=1)
     state: DeviceState
     lastJobId: Optional[str] = None  # 직전 작업 아이디(있으면 전달)
+    # long-poll: IDLE 이고 큐가 비어 있으면 작업이 들어올 때까지 최대 이 시간(초) 기다렸다가 응답
+    # (없거나 0이면 바로 응답, 서버 상한 JOB_WAIT_MAX_SECONDS)
+    waitSeconds: Optional[float] = Field(default=None, ge=0)
+
+    # 디바이스 능력 (보내지 않으면 모든 siteType, 슬롯 1개)
+    # - siteTypes: 처리할 수 있는 board.siteType
+    # - slots: 동시에 실행할 수 있는 작업 수 (state 는 빈 슬롯이 있으면 IDLE)
+    # - sessions: 이미 로그인해 둔 사이트/계정 → 같은 계정의 작업을 먼저 할당
+    siteTypes: Optional[List[SiteType]] = None
+    slots: int = Field(default=1, ge=1, le=16)
+    sessions: List[SessionModel] = Field(default_factory=list)
+
+    # 지금 실행 중인 jobId 들 (이 작업들만 lease 연장, 할당됐는데 빠진 작업은 다시 RUN 으로 보냄)
+    # 보내지 않으면 할당된 작업을 모두 실행 중으로 본다 (이전 디바이스 호환)
+    runningJobIds: Optional[List[str]] = None
 
 class JobEnqueueRequest(BaseModel):
     keyword: str = Field(min_length=1)
@@ -0,0 +1,172 @@
+# app/services/chat_codec.py
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+import msgpack
+
+
+# 메시지 레코드(저장/바이너리 프레임용 축약 키)
+# - i: 메시지 id (스트림 ID, 저장 시에는 없음)
+# - s: senderId
+# - m: message
+# - t: 작성 시각 (epoch ms)
+
+
+def ms_to_iso(created_at_ms: int) -> str:
+    # 이전 형식(datetime.utcnow().isoformat())과 같은 tz 없는 UTC ISO 문자열
+    return (
+        datetime.fromtimestamp(created_at_ms / 1000, tz=timezone.utc)
+        .replace(tzinfo=None)
+        .isoformat(timespec="milliseconds")
+    )
+
+
+def iso_to_ms(created_at: str) -> int:
+    value = datetime.fromisoformat(created_at)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def message_to_record(message: dict) -> dict:
+    """
+    클라이언트용 메시지 {id, senderId, message, createdAt} → 축약 레코드
+    """
+    record = {
+        "s": int(message["senderId"]),
+        "m": message["message"],
+        "t": iso_to_ms(message["createdAt"]),
+    }
+    if message.get("id"):
+        record["i"] = message["id"]
+    return record
+
+
+def record_to_message(record: dict, message_id: str | None = None) -> dict:
+    """
+    축약 레코드 → 클라이언트용 메시지 {id, senderId, message, createdAt}
+    """
+    return {
+        "id": message_id or record.get("i"),
+        "senderId": record["s"],
+        "message": record["m"],
+        "createdAt": ms_to_iso(record["t"]),
+    }
+
+
+class ChatMessageCodec(ABC):
+    """
+    Redis 스트림 / 보관본에 저장하는 메시지 레코드 인코딩.
+    스트림 entry 의 필드 이름(field)으로 어떤 코덱인지 구분하므로
+    기본 코덱을 바꿔도 이전에 저장된 메시지를 그대로 읽을 수 있다.
+    """
+    name: str
+    field: bytes
+
+    @abstractmethod
+    def encode(self, record: dict) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, data: bytes) -> dict:
+        ...
+
+    @abstractmethod
+    def encode_many(self, records: list[dict]) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode_many(self, data: bytes) -> list[dict]:
+        ...
+
+
+class JsonChatCodec(ChatMessageCodec):
+    name = "json"
+    field = b"j"
+
+    def encode(self, record: dict) -> bytes:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> dict:
+        return json.loads(data)
+
+    def encode_many(self, records: list[dict]) -> bytes:
+        # JSON lines
+        return b"\n".join(self.encode(r) for r in records)
+
+    def decode_many(self, data: bytes) -> list[dict]:
+        return [json.loads(line) for line in data.splitlines() if line]
+
+
+class MsgpackChatCodec(ChatMessageCodec):
+    name = "msgpack"
+    field = b"p"
+
+    def encode(self, record: dict) -> bytes:
+        return msgpack.packb(record, use_bin_type=True)
+
+    def decode(self, data: bytes) -> dict:
+        return msgpack.unpackb(data, raw=False)
+
+    def encode_many(self, records: list[dict]) -> bytes:
+        return msgpack.packb(records, use_bin_type=True)
+
+    def decode_many(self, data: bytes) -> list[dict]:
+        return msgpack.unpackb(data, raw=False)
+
+
+CHAT_MESSAGE_CODECS: dict[str, ChatMessageCodec] = {
+    codec.name: codec for codec in (JsonChatCodec(), MsgpackChatCodec())
+}
+
+# 새로 저장하는 메시지에 쓸 코덱 (json / msgpack)
+CHAT_MESSAGE_CODEC = os.getenv("CHAT_MESSAGE_CODEC", "msgpack")
+
+chat_message_codec = CHAT_MESSAGE_CODECS[CHAT_MESSAGE_CODEC]
+
+
+# WebSocket 프레임 형식 (접속 시 format 쿼리로 선택)
+WS_FRAME_FORMATS = ("json", "msgpack")
+
+
+def _is_chat_message(payload) -> bool:
+    return isinstance(payload, dict) and {"senderId", "message", "createdAt"} <= payload.keys()
+
+
+def pack_frame(payload) -> bytes:
+    """
+    WebSocket 응답(dict) → 바이너리(msgpack) 프레임.
+    채팅 메시지와 history 는 축약 레코드로, 그 외는 구조 그대로 변환한다.
+    """
+    if _is_chat_message(payload):
+        payload = message_to_record(payload)
+    elif isinstance(payload, dict) and isinstance(payload.get("result"), dict):
+        result = payload["result"]
+        if "history" in result:
+            payload = {
+                **payload,
+                "result": {**result, "history": [message_to_record(m) for m in result["history"]]},
+            }
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def chat_frame_to_binary(data: str) -> bytes:
+    """
+    pub/sub 으로 받은 JSON 텍스트 프레임 → 바이너리(msgpack) 프레임
+    """
+    return pack_frame(json.loads(data))
+
+
+def unpack_client_message(data: bytes) -> str:
+    """
+    클라이언트가 보낸 바이너리 프레임 → 메시지 본문.
+    msgpack 문자열 또는 {"m": 본문} 레코드를 받는다.
+    """
+    payload = msgpack.unpackb(data, raw=False)
+    if isinstance(payload, dict):
+        payload = payload.get("m")
+    if not isinstance(payload, str):
+        raise ValueError("invalid chat message frame")
+    return payload
@@ -0,0 +1,98 @@
+# app/services/chat_connection_service.py
+import os
+import time
+
+from redis.asyncio import Redis
+
+
+# 서버 → 클라이언트 heartbeat(ping) 간격 (초)
+CHAT_HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("CHAT_HEARTBEAT_INTERVAL_SECONDS", "25"))
+
+# 이 시간 동안 클라이언트에게서 아무 프레임(pong 포함)도 못 받으면 연결 종료 (초)
+CHAT_IDLE_TIMEOUT_SECONDS = float(os.getenv("CHAT_IDLE_TIMEOUT_SECONDS", "60"))
+
+# 동시 접속 상한 (모든 워커 합산)
+CHAT_MAX_CONNECTIONS_PER_USER = int(os.getenv("CHAT_MAX_CONNECTIONS_PER_USER", "3"))
+CHAT_MAX_CONNECTIONS_PER_ROOM = int(os.getenv("CHAT_MAX_CONNECTIONS_PER_ROOM", "6"))
+
+# 접속 lease 유효 시간 (초).
+# heartbeat 마다 갱신되고, 워커가 죽어서 해제하지 못한 lease 는 이 시간이 지나면 집계에서 빠진다.
+CHAT_CONNECTION_LEASE_SECONDS = CHAT_HEARTBEAT_INTERVAL_SECONDS + CHAT_IDLE_TIMEOUT_SECONDS
+
+# 상한 초과로 접속을 거절할 때 close code
+CHAT_TOO_MANY_CONNECTIONS_CLOSE_CODE = 4429
+
+# idle timeout 으로 연결을 끊을 때 close code
+CHAT_IDLE_CLOSE_CODE = 4408
+
+
+def _user_connections_key(user_id: int) -> str:
+    return f"chat:user:{user_id}:connections"
+
+
+def _room_connections_key(chat_room_id: str) -> str:
+    return f"chat:room:{chat_room_id}:connections"
+
+
+# 사용자/방별 접속 lease 를 sorted set(member = connection_id, score = lease 만료 epoch ms)으로 관리.
+# 만료된 lease 정리 → (새 접속이면) 상한 확인 → lease 등록/갱신을 서버에서 한 번에 실행.
+# KEYS: 사용자 키, 방 키 / ARGV: connection_id, now_ms, lease 만료 ms, 사용자 상한, 방 상한
+# 리턴: 0 = 성공, 1 = 사용자 상한 초과, 2 = 방 상한 초과
+_ACQUIRE_CONNECTION_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) then
+        return 1
+    end
+    if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[5]) then
+        return 2
+    end
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+redis.call('PEXPIREAT', KEYS[1], ARGV[3])
+redis.call('PEXPIREAT', KEYS[2], ARGV[3])
+return 0
+"""
+
+_ACQUIRE_RESULTS = {0: None, 1: "user", 2: "room"}
+
+
+async def acquire_chat_connection(
+    redis: Redis,
+    chat_room_id: str,
+    user_id: int,
+    connection_id: str,
+    max_per_user: int = CHAT_MAX_CONNECTIONS_PER_USER,
+    max_per_room: int = CHAT_MAX_CONNECTIONS_PER_ROOM,
+) -> str | None:
+    """
+    WebSocket 접속 lease 등록 (이미 등록된 connection_id 면 상한 확인 없이 갱신만).
+    리턴: None = 성공 / "user" 또는 "room" = 해당 상한 초과로 거절
+    """
+    now_ms = int(time.time() * 1000)
+    script = redis.register_script(_ACQUIRE_CONNECTION_LUA)
+    result = await script(
+        keys=[_user_connections_key(user_id), _room_connections_key(chat_room_id)],
+        args=[
+            connection_id,
+            now_ms,
+            now_ms + int(CHAT_CONNECTION_LEASE_SECONDS * 1000),
+            max_per_user,
+            max_per_room,
+        ],
+    )
+    return _ACQUIRE_RESULTS[int(result)]
+
+
+async def release_chat_connection(
+    redis: Redis,
+    chat_room_id: str,
+    user_id: int,
+    connection_id: str,
+) -> None:
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.zrem(_user_connections_key(user_id), connection_id)
+        pipe.zrem(_room_connections_key(chat_room_id), connection_id)
+        await pipe.execute()
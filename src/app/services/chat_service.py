@@ -1,11 +1,32 @@
 from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, text
 from sqlalchemy.orm import Session
 from redis.asyncio import Redis
 import json
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
 
+from redis import Redis as SyncRedis
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import SessionLocal
+from app.core.redis_client import sync_redis_client
+from app.models.chat import ChatTranscript
 from app.models.match import MatchResult
 from app.models.user import User
 from app.models.enums import MatchStatus
+from app.services.online_match_service import online_match_pool
+from app.core.chat_fanout import room_channel
+from app.services.chat_codec import (
+    CHAT_MESSAGE_CODECS,
+    ChatMessageCodec,
+    chat_message_codec,
+    message_to_record,
+    ms_to_iso,
+    record_to_message,
+)
 
 
 # --------------------------
@@ -33,6 +54,8 @@ def get_active_chat_room(db: Session, user_id: int):
 def update_chat_accept(db: Session, match: MatchResult, user_id: int, accept: bool):
     now = datetime.now(timezone.utc)
     is_me_a = (user_id == match.user_a_id)
+    previous_room_id = match.chat_room_id
+    previous_status = match.status
 
     # 내 수락 상태 반영
     if is_me_a:
@@ -60,6 +83,10 @@ def update_chat_accept(db: Session, match: MatchResult, user_id: int, accept: bo
         if user_b:
             user_b.is_in_chat = True
 
+        # 채팅 중인 유저는 온라인 매칭 풀에서 제외
+        online_match_pool.discard(match.user_a_id)
+        online_match_pool.discard(match.user_b_id)
+
     else:
         # 한 명만 True → CHAT_PENDING
         if match.is_chat_accepted_by_a or match.is_chat_accepted_by_b:
@@ -81,55 +108,405 @@ def update_chat_accept(db: Session, match: MatchResult, user_id: int, accept: bo
 
     db.commit()
     db.refresh(match)
+
+    # WebSocket 접속 시 DB 를 안 보도록 방 메타데이터 캐시 갱신
+    if match.status == MatchStatus.CHAT_ACTIVE:
+        cache_chat_room_meta(sync_redis_client, match)
+    elif previous_room_id:
+        evict_chat_room_meta(sync_redis_client, previous_room_id)
+
+    # 열려 있던 채팅방이 닫혀서 풀린 유저만 온라인 매칭 대기열로
+    # (아직 방이 없던 매칭을 거절 / 수락 취소한 경우는 기존 매칭이 그대로 MATCHED 라 넣지 않음)
+    room_ended = bool(previous_room_id) or previous_status == MatchStatus.CHAT_ACTIVE
+    if room_ended and not match.is_chat_accepted_by_a and not match.is_chat_accepted_by_b:
+        online_match_pool.enqueue(match.user_a_id)
+        online_match_pool.enqueue(match.user_b_id)
     return match
 
 
 # --------------------------
-# Redis 기반 채팅 메시지 임시 저장
+# 만료된 채팅방 정리 (스케줄러 sweeper)
+# --------------------------
+
+# 한 번의 UPDATE 로 종료 처리할 최대 방 수
+CHAT_EXPIRY_BATCH_SIZE = 1000
+
+# CHAT_ACTIVE 이면서 만료된 방을 CHAT_ENDED 로 바꾸고, 같은 문장에서 두 유저의 is_in_chat 해제.
+# 여러 워커가 동시에 돌아도 SKIP LOCKED 로 같은 방을 두 번 처리하지 않는다. (PostgreSQL)
+_END_EXPIRED_CHAT_ROOMS_SQL = text("""
+WITH expired AS (
+    SELECT id
+    FROM match_results
+    WHERE status = 'CHAT_ACTIVE'
+      AND chat_expires_at <= :now
+    ORDER BY chat_expires_at
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+),
+ended AS (
+    UPDATE match_results AS m
+    SET status = 'CHAT_ENDED'
+    FROM expired
+    WHERE m.id = expired.id
+    RETURNING m.id, m.chat_room_id, m.user_a_id, m.user_b_id
+),
+freed AS (
+    UPDATE users AS u
+    SET is_in_chat = false, updated_at = :now
+    FROM ended
+    WHERE u.id = ended.user_a_id OR u.id = ended.user_b_id
+    RETURNING u.id
+)
+SELECT ended.id, ended.chat_room_id, ended.user_a_id, ended.user_b_id,
+       (SELECT count(*) FROM freed) AS users_freed
+FROM ended
+""")
+
+
+@dataclass
+class EndedChatRoom:
+    match_id: int
+    chat_room_id: str | None
+    user_a_id: int
+    user_b_id: int
+
+
+@dataclass
+class ChatExpirySummary:
+    rooms: list[EndedChatRoom]
+    users_freed: int = 0
+    batches: int = 0
+
+
+def end_expired_chat_rooms(
+    db: Session,
+    batch_size: int = CHAT_EXPIRY_BATCH_SIZE,
+) -> ChatExpirySummary:
+    """
+    만료된 채팅방을 배치 단위로 CHAT_ENDED 처리하고 유저를 채팅 상태에서 해제.
+    - 배치마다 commit
+    - 방 메타데이터 캐시 삭제, 해제된 유저는 온라인 매칭 대기열로
+    리턴: 종료된 방 목록과 처리 건수 (WebSocket 종료는 호출하는 쪽에서)
+    """
+    now = datetime.now(timezone.utc)
+    summary = ChatExpirySummary(rooms=[])
+
+    while True:
+        rows = db.execute(
+            _END_EXPIRED_CHAT_ROOMS_SQL,
+            {"now": now, "batch_size": batch_size},
+        ).all()
+        db.commit()
+
+        if not rows:
+            break
+
+        summary.batches += 1
+        summary.users_freed += int(rows[0].users_freed)
+        rooms = [
+            EndedChatRoom(
+                match_id=row.id,
+                chat_room_id=row.chat_room_id,
+                user_a_id=row.user_a_id,
+                user_b_id=row.user_b_id,
+            )
+            for row in rows
+        ]
+        summary.rooms.extend(rooms)
+
+        evict_chat_room_meta(
+            sync_redis_client,
+            *(room.chat_room_id for room in rooms if room.chat_room_id),
+        )
+        for room in rooms:
+            online_match_pool.enqueue(room.user_a_id)
+            online_match_pool.enqueue(room.user_b_id)
+
+        if len(rows) < batch_size:
+            break
+
+    return summary
+
+
+# --------------------------
+# 채팅방 메타데이터 캐시 (Redis)
+# --------------------------
+
+@dataclass
+class ChatRoomMeta:
+    """
+    WebSocket 접속 인증/만료 체크에 필요한 채팅방 정보 (MatchResult 일부)
+    """
+    chat_room_id: str
+    match_id: int
+    user_a_id: int
+    user_b_id: int
+    status: str
+    expires_at: int  # 채팅 만료 시각 (epoch 초)
+
+    def is_participant(self, user_id: int) -> bool:
+        return user_id in (self.user_a_id, self.user_b_id)
+
+    def is_expired(self, now: datetime | None = None) -> bool:
+        now = now or datetime.now(timezone.utc)
+        return self.expires_at <= now.timestamp()
+
+
+def _room_meta_key(chat_room_id: str) -> str:
+    return f"chat:room:{chat_room_id}:meta"
+
+
+def _room_meta_evicted_key(chat_room_id: str) -> str:
+    return f"chat:room:{chat_room_id}:meta:evicted"
+
+
+# 캐시를 지운 뒤 이 시간(초) 동안은 캐시 miss 에서 DB 로 읽은 값을 다시 캐시하지 않음
+# (지우기 전에 DB 에서 읽은 CHAT_ACTIVE 값이 지운 뒤에 다시 써지는 것 방지, DB 조회 시간보다 충분히 길게)
+CHAT_ROOM_META_EVICT_GUARD_SECONDS = 60
+
+# 캐시 miss 후 DB 에서 읽은 메타데이터를 캐시에 채움.
+# 그 사이 다른 곳에서 캐시를 채웠거나(최신 값) 지웠으면(방 종료) 쓰지 않는다.
+# KEYS: 메타 키, 삭제 표시 키 / ARGV: expireAt, 필드/값 ...
+# 리턴: 1 = 씀, 0 = 건너뜀
+_FILL_CHAT_ROOM_META_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 or redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIREAT', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def _to_epoch(value: datetime) -> int:
+    # DateTime 컬럼이 tz 없이 돌아오면 UTC 로 간주
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _meta_from_match(match: MatchResult) -> ChatRoomMeta:
+    return ChatRoomMeta(
+        chat_room_id=match.chat_room_id,
+        match_id=match.id,
+        user_a_id=match.user_a_id,
+        user_b_id=match.user_b_id,
+        status=match.status.value,
+        expires_at=_to_epoch(match.chat_expires_at),
+    )
+
+
+def _meta_mapping(meta: ChatRoomMeta) -> dict:
+    return {
+        "matchId": meta.match_id,
+        "userAId": meta.user_a_id,
+        "userBId": meta.user_b_id,
+        "status": meta.status,
+        "expiresAt": meta.expires_at,
+    }
+
+
+def cache_chat_room_meta(redis: SyncRedis, match: MatchResult) -> None:
+    """
+    채팅방이 활성화될 때 메타데이터를 캐시 (TTL = 채팅 만료 시각).
+    캐시 저장이 실패해도 WebSocket 쪽에서 DB 로 다시 읽으므로 로그만 남긴다.
+    """
+    if not match.chat_room_id or not match.chat_expires_at:
+        return
+
+    meta = _meta_from_match(match)
+    key = _room_meta_key(meta.chat_room_id)
+    try:
+        with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=_meta_mapping(meta))
+            pipe.expireat(key, meta.expires_at)
+            pipe.delete(_room_meta_evicted_key(meta.chat_room_id))
+            pipe.execute()
+    except Exception as e:
+        print(f"[chat_meta] cache failed room={meta.chat_room_id}: {e}")
+
+
+def evict_chat_room_meta(redis: SyncRedis, *chat_room_ids: str) -> None:
+    if not chat_room_ids:
+        return
+    try:
+        with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*(_room_meta_key(room_id) for room_id in chat_room_ids))
+            # 진행 중인 캐시 miss 가 지우기 전 값을 다시 채우지 못하게 표시
+            for room_id in chat_room_ids:
+                pipe.set(_room_meta_evicted_key(room_id), 1, ex=CHAT_ROOM_META_EVICT_GUARD_SECONDS)
+            pipe.execute()
+    except Exception as e:
+        print(f"[chat_meta] evict failed rooms={len(chat_room_ids)}: {e}")
+
+
+def _load_chat_room_meta_from_db(chat_room_id: str) -> ChatRoomMeta | None:
+    # 캐시 miss 일 때만, 짧게 세션을 열었다가 바로 반납
+    with SessionLocal() as db:
+        match = (
+            db.query(MatchResult)
+            .filter(MatchResult.chat_room_id == chat_room_id)
+            .first()
+        )
+        if not match or not match.chat_expires_at:
+            return None
+        return _meta_from_match(match)
+
+
+async def get_chat_room_meta(redis: Redis, chat_room_id: str) -> ChatRoomMeta | None:
+    """
+    채팅방 메타데이터 조회 (Redis 캐시 → 없으면 DB 조회 후 캐시 채움).
+    WebSocket 핸들러가 DB 세션을 잡고 있지 않도록 DB 조회는 스레드풀에서 짧게 끝낸다.
+    캐시는 그 사이 채워지거나 지워지지 않았을 때만 채운다 (_FILL_CHAT_ROOM_META_LUA).
+    """
+    key = _room_meta_key(chat_room_id)
+    fields = await redis.hgetall(key)
+    if fields:
+        return ChatRoomMeta(
+            chat_room_id=chat_room_id,
+            match_id=int(fields["matchId"]),
+            user_a_id=int(fields["userAId"]),
+            user_b_id=int(fields["userBId"]),
+            status=fields["status"],
+            expires_at=int(fields["expiresAt"]),
+        )
+
+    meta = await run_in_threadpool(_load_chat_room_meta_from_db, chat_room_id)
+    if meta and meta.status == MatchStatus.CHAT_ACTIVE.value and not meta.is_expired():
+        fields = [item for pair in _meta_mapping(meta).items() for item in pair]
+        script = redis.register_script(_FILL_CHAT_ROOM_META_LUA)
+        await script(
+            keys=[key, _room_meta_evicted_key(chat_room_id)],
+            args=[meta.expires_at, *fields],
+        )
+    return meta
+
+
+# --------------------------
+# Redis Streams 기반 채팅 메시지 임시 저장
 # --------------------------
 
+# 방 하나의 스트림 최대 길이 (XADD MAXLEN ~, 대략적인 trim)
+CHAT_STREAM_MAXLEN = 5000
+
+# 재접속/페이지 조회 시 한 번에 내려주는 최대 메시지 수
+CHAT_HISTORY_MAX_LIMIT = 500
+
+# 채팅 만료 후에도 스트림을 유지하는 시간 (만료 sweeper 가 아카이브하기 전에 사라지지 않도록)
+CHAT_ARCHIVE_GRACE_SECONDS = 60 * 60
+
+
+def _room_stream_key(chat_room_id: str) -> str:
+    return f"chat:room:{chat_room_id}:stream"
+
+
 def _room_messages_key(chat_room_id: str) -> str:
+    # 이전 RPUSH 리스트 키 (배포 직후 남아 있는 방 history 읽기용)
     return f"chat:room:{chat_room_id}:messages"
 
 
-async def save_chat_message(
-    redis: Redis,
-    chat_room_id: str,
-    sender_id: int,
-    message: str,
-):
+_STREAM_ID_RE = re.compile(r"^\d+-\d+$")
+
+
+def is_chat_message_id(value: str | None) -> bool:
     """
-    12시간 TTL을 가지는 Redis 리스트에 메시지 저장.
+    클라이언트가 보낸 커서가 Redis Stream ID 형식(ms-seq)인지
     """
-    key = _room_messages_key(chat_room_id)
+    return bool(value) and _STREAM_ID_RE.match(value) is not None
+
 
-    payload = {
-        "senderId": sender_id,
-        "message": message,
-        "createdAt": datetime.utcnow().isoformat(),
+def _decode_str(value: bytes | str) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _entry_to_message(entry_id: bytes | str, fields: dict) -> dict:
+    """
+    스트림 entry → 클라이언트용 메시지 {id, senderId, message, createdAt}.
+    코덱 필드(j/p)로 저장된 메시지와 이전 형식(senderId/message/createdAt 필드)을 모두 읽는다.
+    """
+    entry_id = _decode_str(entry_id)
+    for codec in CHAT_MESSAGE_CODECS.values():
+        data = fields.get(codec.field)
+        if data is None:
+            data = fields.get(codec.field.decode())
+        if data is not None:
+            return record_to_message(codec.decode(data), entry_id)
+
+    fields = {_decode_str(k): _decode_str(v) for k, v in fields.items()}
+    return {
+        "id": entry_id,
+        "senderId": int(fields["senderId"]),
+        "message": fields["message"],
+        "createdAt": fields["createdAt"],
     }
 
-    # 뒤에 append
-    await redis.rpush(key, json.dumps(payload))
 
-    # TTL 12시간
-    await redis.expire(key, 60 * 60 * 12)
+def _now_ms() -> int:
+    return int(time.time() * 1000)
 
 
-async def load_recent_messages(
+@dataclass
+class ChatMessageWrite:
+    """
+    저장 대기 중인 채팅 메시지 하나 (write-behind 버퍼에 쌓였다가 배치로 저장)
+    """
+    chat_room_id: str
+    sender_id: int
+    message: str
+    expire_at: int  # 채팅 만료 시각 (epoch 초) → 스트림 키 TTL
+    created_at_ms: int = field(default_factory=_now_ms)
+
+
+# XADD → (키가 새로 생겼을 때만) EXPIREAT(채팅 만료 + 아카이브 여유 시간) → PUBLISH 를 서버에서 한 번에 실행.
+# 저장과 방 fan-out 이 같은 명령 안에서 일어나서 id 가 붙은 메시지를 바로 전달할 수 있다.
+# 스트림에는 코덱으로 인코딩한 레코드 하나만 저장하고, fan-out 은 클라이언트용 JSON 으로 보낸다.
+# KEYS: 스트림 키, 방 채널 / ARGV: maxlen, expire_at, 코덱 필드, 인코딩된 레코드, senderId, message, createdAt
+_APPEND_CHAT_MESSAGE_LUA = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', ARGV[3], ARGV[4])
+if redis.call('TTL', KEYS[1]) == -1 then
+    redis.call('EXPIREAT', KEYS[1], ARGV[2])
+end
+redis.call('PUBLISH', KEYS[2], cjson.encode({
+    id = id, senderId = tonumber(ARGV[5]), message = ARGV[6], createdAt = ARGV[7]
+}))
+return id
+"""
+
+
+async def append_chat_messages(
     redis: Redis,
-    chat_room_id: str,
-    limit: int = 50,
-):
+    writes: list[ChatMessageWrite],
+    codec: ChatMessageCodec = chat_message_codec,
+) -> list[str]:
     """
-    최근 N개 메시지 로드 (옵션, 필요하면 사용)
+    메시지 여러 개를 MULTI 파이프라인 한 번(round-trip 1회)으로 저장 + 방 채널에 publish.
+    - 스트림에는 codec 으로 인코딩한 축약 레코드 {s, m, t(epoch ms)} 를 저장
+    - 방 스트림 TTL 은 스트림이 처음 만들어질 때 한 번만 채팅 만료 시각(+아카이브 여유 시간)으로 설정
+    - 배치 단위로 원자적이라 실패 시 배치 전체를 재시도해도 중복 저장되지 않는다
+    리턴: 저장된 메시지 id (스트림 ID) 리스트
     """
-    key = _room_messages_key(chat_room_id)
+    script = redis.register_script(_APPEND_CHAT_MESSAGE_LUA)
+
+    async with redis.pipeline(transaction=True) as pipe:
+        for w in writes:
+            record = {"s": w.sender_id, "m": w.message, "t": w.created_at_ms}
+            await script(
+                keys=[_room_stream_key(w.chat_room_id), room_channel(w.chat_room_id)],
+                args=[
+                    CHAT_STREAM_MAXLEN,
+                    w.expire_at + CHAT_ARCHIVE_GRACE_SECONDS,
+                    codec.field,
+                    codec.encode(record),
+                    w.sender_id,
+                    w.message,
+                    ms_to_iso(w.created_at_ms),
+                ],
+                client=pipe,
+            )
+        return [_decode_str(entry_id) for entry_id in await pipe.execute()]
 
-    # 리스트 길이를 모른다고 가정하고, 뒤에서부터 최대 limit개
-    # -limit ~ -1
-    values = await redis.lrange(key, -limit, -1)
 
+def _parse_legacy_messages(values: list[bytes | str]) -> list[dict]:
     messages = []
     for v in values:
         try:
@@ -138,3 +515,200 @@ async def load_recent_messages(
             # 파싱 실패하면 그냥 무시
             continue
     return messages
+
+
+async def _load_legacy_messages(redis: Redis, chat_room_id: str, limit: int) -> list[dict]:
+    values = await redis.lrange(_room_messages_key(chat_room_id), -limit, -1)
+    return _parse_legacy_messages(values)
+
+
+async def load_recent_messages(
+    redis: Redis,
+    chat_room_id: str,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    최근 N개 메시지 로드 (오래된 것 → 최신 순)
+    """
+    entries = await redis.xrevrange(_room_stream_key(chat_room_id), count=limit)
+    if not entries:
+        return await _load_legacy_messages(redis, chat_room_id, limit)
+
+    return [_entry_to_message(entry_id, fields) for entry_id, fields in reversed(entries)]
+
+
+async def load_messages_after(
+    redis: Redis,
+    chat_room_id: str,
+    last_id: str,
+    limit: int = CHAT_HISTORY_MAX_LIMIT,
+) -> tuple[list[dict], bool]:
+    """
+    재접속용: last_id 이후(미포함) 메시지만 오래된 순으로 최대 limit 개.
+    리턴: (메시지 리스트, 더 남아 있는지)
+    """
+    entries = await redis.xrange(
+        _room_stream_key(chat_room_id),
+        min=f"({last_id}",
+        count=limit + 1,
+    )
+    has_more = len(entries) > limit
+    return [_entry_to_message(entry_id, fields) for entry_id, fields in entries[:limit]], has_more
+
+
+async def load_messages_before(
+    redis: Redis,
+    chat_room_id: str,
+    before_id: str | None = None,
+    limit: int = 50,
+) -> tuple[list[dict], str | None]:
+    """
+    위로 스크롤용 페이지 조회: before_id 이전(미포함) 메시지를 오래된 순으로 최대 limit 개.
+    before_id 가 없으면 가장 최근 페이지.
+    리턴: (메시지 리스트, 다음 페이지 커서 = 이번 페이지의 가장 오래된 id / 더 없으면 None)
+    """
+    entries = await redis.xrevrange(
+        _room_stream_key(chat_room_id),
+        max=f"({before_id}" if before_id else "+",
+        count=limit + 1,
+    )
+    has_more = len(entries) > limit
+    messages = [_entry_to_message(entry_id, fields) for entry_id, fields in reversed(entries[:limit])]
+    next_cursor = messages[0]["id"] if has_more and messages else None
+    return messages, next_cursor
+
+
+# --------------------------
+# 종료된 채팅방 대화 기록 보관 (Redis → Postgres)
+# --------------------------
+
+# 이전 형식 보관본 인코딩 (클라이언트용 메시지 JSON lines → zlib)
+CHAT_TRANSCRIPT_LEGACY_ENCODING = "jsonl+zlib"
+
+# 한 번에 Redis 에서 읽어 보관할 방 수
+CHAT_ARCHIVE_BATCH_SIZE = 100
+
+
+def chat_transcript_encoding(codec: ChatMessageCodec = chat_message_codec) -> str:
+    return f"{codec.name}+zlib"
+
+
+def encode_chat_transcript(
+    messages: list[dict],
+    codec: ChatMessageCodec = chat_message_codec,
+) -> bytes:
+    """
+    메시지 리스트 → 코덱으로 인코딩한 축약 레코드 리스트 → zlib 압축
+    """
+    return zlib.compress(codec.encode_many([message_to_record(m) for m in messages]))
+
+
+def decode_chat_transcript(
+    data: bytes,
+    encoding: str = CHAT_TRANSCRIPT_LEGACY_ENCODING,
+) -> list[dict]:
+    raw = zlib.decompress(data)
+    if encoding == CHAT_TRANSCRIPT_LEGACY_ENCODING:
+        return [json.loads(line) for line in raw.decode("utf-8").splitlines() if line]
+
+    codec = CHAT_MESSAGE_CODECS[encoding.removesuffix("+zlib")]
+    return [record_to_message(record) for record in codec.decode_many(raw)]
+
+
+def _parse_created_at(message: dict) -> datetime | None:
+    try:
+        return datetime.fromisoformat(message["createdAt"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def archive_ended_chat_rooms(
+    db: Session,
+    redis: SyncRedis,
+    batch_size: int = CHAT_ARCHIVE_BATCH_SIZE,
+) -> int:
+    """
+    CHAT_ENDED 인데 아직 보관본이 없는 방의 대화 기록을 보관.
+    - 방마다 Redis 스트림(+이전 리스트 키)을 한 번에 읽어 메시지 코덱 + zlib 로 압축해서 1행 저장
+    - redis 는 응답을 디코딩하지 않는 클라이언트 (sync_redis_binary_client)
+    - DB commit 이 끝난 뒤 Redis 키 삭제 (Redis 에는 진행 중인 방만 남는다)
+    - 스트림이 남아 있는 기간(만료 후 CHAT_ARCHIVE_GRACE_SECONDS) 안의 방만 대상
+    - 여러 워커가 동시에 돌아도 SKIP LOCKED 로 같은 방을 두 번 보관하지 않는다
+    리턴: 보관한 방 수
+    """
+    since = datetime.now(timezone.utc) - timedelta(seconds=CHAT_ARCHIVE_GRACE_SECONDS)
+    archived = 0
+
+    while True:
+        rooms = (
+            db.query(MatchResult.id, MatchResult.chat_room_id)
+            .outerjoin(ChatTranscript, ChatTranscript.match_id == MatchResult.id)
+            .filter(
+                MatchResult.status == MatchStatus.CHAT_ENDED,
+                MatchResult.chat_room_id != None,  # noqa
+                MatchResult.chat_expires_at > since,
+                ChatTranscript.id == None,  # noqa
+            )
+            .order_by(MatchResult.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True, of=MatchResult)
+            .all()
+        )
+        if not rooms:
+            db.rollback()
+            break
+
+        # 방별 스트림 + 이전 리스트를 round-trip 한 번에
+        with redis.pipeline(transaction=False) as pipe:
+            for _, chat_room_id in rooms:
+                pipe.xrange(_room_stream_key(chat_room_id))
+                pipe.lrange(_room_messages_key(chat_room_id), 0, -1)
+            results = pipe.execute()
+
+        rows = []
+        for k, (match_id, chat_room_id) in enumerate(rooms):
+            entries = results[2 * k]
+            legacy = results[2 * k + 1]
+            messages = _parse_legacy_messages(legacy) + [
+                _entry_to_message(entry_id, fields) for entry_id, fields in entries
+            ]
+            rows.append(
+                {
+                    "match_id": match_id,
+                    "chat_room_id": chat_room_id,
+                    "message_count": len(messages),
+                    "first_message_at": _parse_created_at(messages[0]) if messages else None,
+                    "last_message_at": _parse_created_at(messages[-1]) if messages else None,
+                    "encoding": chat_transcript_encoding(),
+                    "data": encode_chat_transcript(messages),
+                    "archived_at": datetime.utcnow(),
+                }
+            )
+
+        db.execute(insert(ChatTranscript), rows)
+        db.commit()
+
+        redis.delete(
+            *(_room_stream_key(chat_room_id) for _, chat_room_id in rooms),
+            *(_room_messages_key(chat_room_id) for _, chat_room_id in rooms),
+        )
+        archived += len(rows)
+
+        if len(rooms) < batch_size:
+            break
+
+    return archived
+
+
+def load_chat_transcript(db: Session, match_id: int) -> list[dict] | None:
+    """
+    보관된 대화 기록 조회 (모더레이션/리포트용). 보관본이 없으면 None.
+    """
+    transcript = (
+        db.query(ChatTranscript)
+        .filter(ChatTranscript.match_id == match_id)
+        .first()
+    )
+    if not transcript:
+        return None
+    return decode_chat_transcript(transcript.data, transcript.encoding)
@@ -0,0 +1,123 @@
+# app/services/chat_write_service.py
+import asyncio
+import os
+
+from redis.asyncio import Redis
+
+from app.core.redis_client import redis_client
+from app.services.chat_service import ChatMessageWrite, append_chat_messages
+
+
+# 한 번에 저장할 최대 메시지 수
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "100"))
+
+# 첫 메시지가 들어온 뒤 배치를 모으는 최대 대기 시간 (ms)
+CHAT_WRITE_FLUSH_INTERVAL_MS = float(os.getenv("CHAT_WRITE_FLUSH_INTERVAL_MS", "5"))
+
+# 버퍼 최대 크기 (가득 차면 submit 이 기다림 → 유실 가능한 메시지 수의 상한)
+CHAT_WRITE_QUEUE_SIZE = int(os.getenv("CHAT_WRITE_QUEUE_SIZE", "10000"))
+
+# 배치 저장 실패 시 재시도 횟수 (넘기면 해당 배치는 버리고 로그)
+CHAT_WRITE_MAX_RETRIES = 3
+
+# 종료 시 남은 메시지를 저장하며 기다리는 최대 시간 (초)
+CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS = 5.0
+
+
+class ChatWriteBuffer:
+    """
+    워커 단위 채팅 메시지 write-behind 버퍼.
+
+    - WebSocket 수신 루프는 submit 으로 큐에 넣기만 하고 바로 다음 메시지를 받는다.
+    - 플러시 태스크가 몇 ms 또는 N개 단위로 모아서 append_chat_messages 로
+      MULTI 파이프라인 한 번에 저장 + 방 fan-out(PUBLISH) 한다.
+    - 크래시 시 유실 범위는 큐에 남은 메시지(최대 CHAT_WRITE_QUEUE_SIZE)로 제한되고,
+      정상 종료 시에는 close 에서 남은 메시지를 모두 저장한다.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        batch_size: int = CHAT_WRITE_BATCH_SIZE,
+        flush_interval_ms: float = CHAT_WRITE_FLUSH_INTERVAL_MS,
+        queue_size: int = CHAT_WRITE_QUEUE_SIZE,
+    ):
+        self.redis = redis
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue_size = queue_size
+
+        self._queue: asyncio.Queue[ChatMessageWrite] | None = None
+        self._flusher: asyncio.Task | None = None
+        self._closing = False
+
+        # 재시도 후에도 저장하지 못하고 버린 메시지 수
+        self.dropped = 0
+
+    def _ensure_started(self) -> None:
+        # 이벤트 루프 안에서 처음 사용할 때 큐/태스크 생성
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def submit(self, write: ChatMessageWrite) -> None:
+        self._ensure_started()
+        await self._queue.put(write)
+
+    async def _next_batch(self) -> list[ChatMessageWrite]:
+        batch = [await self._queue.get()]
+
+        # 배치가 덜 찼으면 잠깐 더 모은다 (종료 중이면 바로 저장)
+        if self._queue.qsize() < self.batch_size - 1 and not self._closing:
+            await asyncio.sleep(self.flush_interval)
+
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: list[ChatMessageWrite]) -> None:
+        for attempt in range(CHAT_WRITE_MAX_RETRIES):
+            try:
+                await append_chat_messages(self.redis, batch)
+                return
+            except Exception as e:
+                print(f"[chat_write] flush failed ({attempt + 1}/{CHAT_WRITE_MAX_RETRIES}): {e}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+        self.dropped += len(batch)
+        print(f"[chat_write] dropped {len(batch)} messages (total {self.dropped})")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def close(self, timeout: float = CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """
+        종료 시 큐에 남은 메시지를 저장하고 플러시 태스크 정리
+        """
+        if self._queue is None:
+            return
+
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[chat_write] shutdown timeout, {self._queue.qsize()} messages not saved")
+
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+
+# 간단하게 전역 싱글톤처럼 사용 (워커당 버퍼 1개)
+chat_write_buffer = ChatWriteBuffer(redis_client)
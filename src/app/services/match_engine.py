@@ -0,0 +1,334 @@
+# app/services/match_engine.py
+from dataclasses import dataclass
+from typing import Callable, Iterable, Sequence
+
+import numpy as np
+
+
+# 질문지별 코드 최대값 (q1 헬렌 1~4, q2 성숙도 1~3, q3 본능 1~3, q4 핵심유형 1~9)
+QUESTION_CODE_MAX: tuple[int, int, int, int] = (4, 3, 3, 9)
+
+# 점수 블록 하나가 가질 수 있는 최대 셀 수 (rows × cols)
+# int16 기준 약 8MB → 유저 수와 관계없이 타일 메모리가 일정하게 유지된다.
+DEFAULT_TILE_CELLS = 4_000_000
+
+
+# 설문 응답 조합(유형) 개수: 4 × 3 × 3 × 9 = 324
+N_SURVEY_TYPES = int(np.prod(QUESTION_CODE_MAX))
+
+
+def survey_type_index(codes: np.ndarray) -> np.ndarray:
+    """
+    (4, n) 설문 코드 → (n,) 유형 인덱스 (0 ~ N_SURVEY_TYPES-1, 혼합 진법)
+    """
+    index = np.zeros(codes.shape[1], dtype=np.int64)
+    for q, max_code in enumerate(QUESTION_CODE_MAX):
+        index = index * max_code + (codes[q].astype(np.int64) - 1)
+    return index
+
+
+def survey_codes_from_type_index(index: np.ndarray) -> np.ndarray:
+    """
+    survey_type_index 의 역변환: (n,) 유형 인덱스 → (4, n) 설문 코드
+    """
+    codes = np.zeros((len(QUESTION_CODE_MAX), index.shape[0]), dtype=np.int8)
+    rest = index.astype(np.int64)
+    for q in reversed(range(len(QUESTION_CODE_MAX))):
+        max_code = QUESTION_CODE_MAX[q]
+        codes[q] = rest % max_code + 1
+        rest = rest // max_code
+    return codes
+
+
+@dataclass
+class SurveyCodeArrays:
+    """
+    매칭 점수 계산에 필요한 값만 담은 배열 스냅샷.
+    - user_ids: (n,) int64
+    - codes: (4, n) int8  (q1, q2, q3, q4 순서)
+    - groups: (n,) int16 또는 None
+      설정되어 있으면 서로 다른 group 끼리만 매칭 (예: 이성 매칭)
+    """
+    user_ids: np.ndarray
+    codes: np.ndarray
+    groups: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return int(self.user_ids.shape[0])
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[tuple[int, int, int, int, int]],
+        groups: Sequence[int] | None = None,
+    ) -> "SurveyCodeArrays":
+        """
+        (user_id, q1, q2, q3, q4) 튜플들로부터 배열 생성
+        """
+        data = np.array(list(rows), dtype=np.int64).reshape(-1, 5)
+        return cls(
+            user_ids=data[:, 0].copy(),
+            codes=data[:, 1:].T.astype(np.int8),
+            groups=None if groups is None else np.asarray(groups, dtype=np.int16),
+        )
+
+
+def build_lookup_table(score_fn: Callable[[int, int], int], max_code: int) -> np.ndarray:
+    """
+    (max_code+1) × (max_code+1) 점수 테이블 생성.
+    인덱스 0은 사용하지 않는다. (코드값이 1부터 시작)
+    """
+    table = np.zeros((max_code + 1, max_code + 1), dtype=np.int16)
+    for a in range(1, max_code + 1):
+        for b in range(1, max_code + 1):
+            table[a, b] = score_fn(a, b)
+    return table
+
+
+class PairScorer:
+    """
+    질문지별 lookup table 4개로 점수 블록을 계산한다.
+    """
+
+    def __init__(self, tables: Sequence[np.ndarray]):
+        self.tables = tuple(tables)
+
+        # 가능한 총점 목록 (내림차순) → 정렬 대신 점수 버킷 순회에 사용
+        totals = {0}
+        for table in self.tables:
+            values = {int(v) for v in np.unique(table[1:, 1:])}
+            totals = {t + v for t in totals for v in values}
+        self.levels: list[int] = sorted(totals, reverse=True)
+
+        self._type_table: np.ndarray | None = None
+
+    @property
+    def type_table(self) -> np.ndarray:
+        """
+        설문 유형(type) × 유형 총점 테이블 (324 × 324, 최초 1회만 계산)
+        """
+        if self._type_table is None:
+            all_types = np.arange(N_SURVEY_TYPES)
+            codes = survey_codes_from_type_index(all_types)
+            self._type_table = self.score_block(codes, all_types, all_types)
+        return self._type_table
+
+    def score_block(
+        self,
+        codes: np.ndarray,
+        rows: np.ndarray,
+        cols: np.ndarray,
+    ) -> np.ndarray:
+        """
+        rows × cols 총점 블록 (int16)
+        """
+        block = np.zeros((rows.shape[0], cols.shape[0]), dtype=np.int16)
+        for q, table in enumerate(self.tables):
+            block += table[codes[q, rows][:, None], codes[q, cols][None, :]]
+        return block
+
+
+def greedy_match_by_best_score(
+    arrays: SurveyCodeArrays,
+    scorer: PairScorer,
+    excluded_pairs: set[tuple[int, int]] | None = None,
+    tile_cells: int = DEFAULT_TILE_CELLS,
+    stats: dict[str, int] | None = None,
+) -> list[tuple[int, int, int]]:
+    """
+    "점수 내림차순 정렬 → 둘 다 비어 있으면 매칭" greedy와 동일한 결과를
+    전체 후보쌍을 만들지 않고 계산한다.
+
+    - 기존 방식: (i, j), i < j 순서로 후보를 만든 뒤 점수 내림차순 stable sort
+      → 처리 순서는 (점수 내림차순, i 오름차순, j 오름차순)
+    - 여기서는 점수 버킷(levels)을 높은 점수부터 돌면서,
+      아직 매칭 안 된 행들을 타일 단위로 잘라 점수 블록을 계산하고
+      각 행 i에 대해 조건을 만족하는 가장 작은 j를 고른다.
+
+    stats 를 주면 "pairs_evaluated"(점수 블록 셀 수)를 누적한다. (벤치마크용)
+
+    리턴: [(index_a, index_b, total_score), ...]  (arrays 기준 인덱스, 생성 순서)
+    """
+    n = len(arrays)
+    if n < 2:
+        return []
+
+    user_ids = arrays.user_ids
+    codes = arrays.codes
+    groups = arrays.groups
+    excluded_pairs = excluded_pairs or set()
+
+    free = np.ones(n, dtype=bool)
+    matched: list[tuple[int, int, int]] = []
+
+    for level in scorer.levels:
+        start = 0
+        while start < n:
+            free_cols = np.flatnonzero(free[start + 1:]) + start + 1
+            if free_cols.size == 0:
+                break
+
+            # 열 개수에 맞춰 타일 높이 결정 (메모리 상한 유지)
+            tile_rows = max(1, tile_cells // free_cols.size)
+            stop = min(n, start + tile_rows)
+
+            rows = np.flatnonzero(free[start:stop]) + start
+            start = stop
+            if rows.size == 0:
+                continue
+
+            block = scorer.score_block(codes, rows, free_cols)
+            if stats is not None:
+                stats["pairs_evaluated"] = stats.get("pairs_evaluated", 0) + block.size
+            mask = block == level
+            mask &= free_cols[None, :] > rows[:, None]
+            if groups is not None:
+                mask &= groups[rows][:, None] != groups[free_cols][None, :]
+
+            for k, i in enumerate(rows.tolist()):
+                if not free[i]:
+                    continue
+                for j in np.flatnonzero(mask[k]).tolist():
+                    # 타일 계산 이후 같은 타일 안에서 매칭된 유저는 건너뜀
+                    j = int(free_cols[j])
+                    if not free[j]:
+                        continue
+
+                    a_id = int(user_ids[i])
+                    b_id = int(user_ids[j])
+                    if (min(a_id, b_id), max(a_id, b_id)) in excluded_pairs:
+                        continue
+
+                    free[i] = False
+                    free[j] = False
+                    matched.append((i, j, level))
+                    break
+
+    return matched
+
+
+def cohort_match_by_best_score(
+    arrays: SurveyCodeArrays,
+    scorer: PairScorer,
+    excluded_pairs: set[tuple[int, int]] | None = None,
+    stats: dict[str, int] | None = None,
+) -> list[tuple[int, int, int]]:
+    """
+    설문 유형(코호트) 단위 greedy 매칭.
+
+    - 유저를 설문 유형(최대 324개)별로 묶고
+    - 존재하는 유형 쌍을 (유형 총점 내림차순, 유형 인덱스 오름차순)으로 돌면서
+    - 두 코호트의 아직 매칭 안 된 유저끼리 앞에서부터 짝을 짓는다.
+    - 과거 매칭 조합은 코호트 안에서 다음 후보로 넘어가는 방식으로 제외
+
+    유저 쌍이 아니라 유형 쌍만 정렬하므로 비용은 유저 수에 대략 선형이다.
+    같은 점수 안에서의 우선순위가 유저 순서가 아닌 유형 순서라
+    greedy_match_by_best_score 와 짝 구성은 다를 수 있다.
+
+    stats 를 주면 "pairs_evaluated"(코호트 쌍 수 + 확인한 유저 후보 수)를 누적한다. (벤치마크용)
+
+    리턴: [(index_a, index_b, total_score), ...]  (arrays 기준 인덱스, 생성 순서)
+    """
+    n = len(arrays)
+    if n < 2:
+        return []
+
+    user_ids = arrays.user_ids
+    excluded_pairs = excluded_pairs or set()
+
+    # 1) (유형, group)별 코호트 구성 (코호트 안에서는 입력 순서 유지)
+    #    cohort key = 유형 인덱스 * n_groups + group
+    groups = arrays.groups
+    n_groups = 1 if groups is None else int(groups.max()) + 1
+    keys = survey_type_index(arrays.codes) * n_groups
+    if groups is not None:
+        keys += groups
+
+    order = np.argsort(keys, kind="stable")
+    bounds = np.searchsorted(keys[order], np.arange(N_SURVEY_TYPES * n_groups + 1))
+    present = np.flatnonzero(np.diff(bounds))
+
+    cohorts: dict[int, list[int]] = {
+        int(t): order[bounds[t]:bounds[t + 1]].tolist() for t in present
+    }
+    heads: dict[int, int] = {t: 0 for t in cohorts}
+    dead: dict[int, int] = {t: 0 for t in cohorts}
+
+    # 2) 존재하는 코호트 쌍만 점수 내림차순으로 정렬 (type_a, type_b 는 cohort key)
+    ia, ib = np.triu_indices(present.size)
+    type_a = present[ia]
+    type_b = present[ib]
+    if groups is not None:
+        # 같은 group 끼리는 매칭하지 않음
+        allowed = type_a % n_groups != type_b % n_groups
+        type_a = type_a[allowed]
+        type_b = type_b[allowed]
+    pair_scores = scorer.type_table[type_a // n_groups, type_b // n_groups]
+    pair_order = np.lexsort((type_b, type_a, -pair_scores))
+    evaluated = int(pair_order.shape[0])
+
+    free = np.ones(n, dtype=bool)
+    matched: list[tuple[int, int, int]] = []
+
+    def _compact(t: int) -> None:
+        # 매칭된 유저가 절반을 넘으면 코호트 리스트를 재구성 (스캔 비용 상한 유지)
+        if dead[t] * 2 > len(cohorts[t]):
+            cohorts[t] = [m for m in cohorts[t] if free[m]]
+            heads[t] = 0
+            dead[t] = 0
+
+    def _advance(t: int) -> int:
+        # 코호트 앞쪽의 이미 매칭된 유저는 다시 보지 않도록 head 이동
+        members = cohorts[t]
+        head = heads[t]
+        while head < len(members) and not free[members[head]]:
+            head += 1
+        heads[t] = head
+        return head
+
+    # 3) 코호트 × 코호트 매칭
+    for k in pair_order.tolist():
+        ta = int(type_a[k])
+        tb = int(type_b[k])
+        level = int(pair_scores[k])
+        same = ta == tb
+
+        _compact(ta)
+        _compact(tb)
+        members_a = cohorts[ta]
+        members_b = cohorts[tb]
+
+        pos_a = _advance(ta)
+        if pos_a >= len(members_a) or _advance(tb) >= len(members_b):
+            continue
+
+        while pos_a < len(members_a):
+            i = members_a[pos_a]
+            pos_a += 1
+            if not free[i]:
+                continue
+
+            head_b = pos_a if same else _advance(tb)
+            if head_b >= len(members_b):
+                break
+
+            a_id = int(user_ids[i])
+            for pos_b in range(head_b, len(members_b)):
+                j = members_b[pos_b]
+                evaluated += 1
+                if not free[j]:
+                    continue
+                b_id = int(user_ids[j])
+                if (min(a_id, b_id), max(a_id, b_id)) in excluded_pairs:
+                    continue
+
+                free[i] = False
+                free[j] = False
+                dead[ta] += 1
+                dead[tb] += 1
+                matched.append((i, j, level))
+                break
+
+    if stats is not None:
+        stats["pairs_evaluated"] = stats.get("pairs_evaluated", 0) + evaluated
+    return matched
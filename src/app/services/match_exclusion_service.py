@@ -0,0 +1,190 @@
+# app/services/match_exclusion_service.py
+from datetime import datetime
+from typing import Iterable, Set
+
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.match import MatchResult, MatchExclusion, MatchExclusionBackfill
+
+
+# IN 절 하나에 넣을 user_id 최대 개수
+EXCLUSION_QUERY_CHUNK = 5000
+
+# 재구성(배타) / 매칭 반영(공유) 이 겹치지 않게 하는 트랜잭션 advisory lock 키
+EXCLUSION_REBUILD_LOCK_ID = 0x6D78_6578  # "mxex"
+BACKFILL_MARKER_ID = 1
+
+# 이 프로세스에서 backfill 기록을 이미 확인했는지
+_backfill_done = False
+
+
+def _pack(partner_ids: np.ndarray) -> bytes:
+    return np.asarray(partner_ids, dtype=np.int32).tobytes()
+
+
+def _unpack(data: bytes | None) -> np.ndarray:
+    if not data:
+        return np.empty(0, dtype=np.int32)
+    return np.frombuffer(data, dtype=np.int32)
+
+
+def _chunks(values: list[int], size: int = EXCLUSION_QUERY_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _load_partner_ids(db: Session, user_ids: list[int], for_update: bool = False) -> dict[int, bytes]:
+    rows: dict[int, bytes] = {}
+    for chunk in _chunks(user_ids):
+        query = (
+            db.query(MatchExclusion.user_id, MatchExclusion.partner_ids)
+            .filter(MatchExclusion.user_id.in_(chunk))
+        )
+        if for_update:
+            # user_id 순으로 잠가서 동시에 반영하는 잡끼리 deadlock 나지 않게
+            query = query.order_by(MatchExclusion.user_id).with_for_update()
+        for user_id, data in query:
+            rows[user_id] = data
+    return rows
+
+
+def add_match_exclusions(db: Session, pairs: Iterable[tuple[int, int]]) -> None:
+    """
+    새로 생성된 매칭 (user_a_id, user_b_id) 들을 인덱스에 반영.
+    commit 은 호출하는 쪽에서 MatchResult 와 함께 한 번에 한다.
+    온라인 / 야간 매칭이 같은 유저를 동시에 갱신할 수 있으므로
+    행을 먼저 만들어 두고 (이미 있으면 무시) FOR UPDATE 로 잠근 뒤 병합한다.
+    """
+    new_partners: dict[int, list[int]] = {}
+    for a_id, b_id in pairs:
+        new_partners.setdefault(a_id, []).append(b_id)
+        new_partners.setdefault(b_id, []).append(a_id)
+
+    if not new_partners:
+        return
+
+    now = datetime.utcnow()
+    user_ids = sorted(new_partners)
+
+    # 재구성 중이면 끝날 때까지 기다림 (반영끼리는 서로 막지 않음)
+    db.execute(select(func.pg_advisory_xact_lock_shared(EXCLUSION_REBUILD_LOCK_ID)))
+    for chunk in _chunks(user_ids):
+        db.execute(
+            pg_insert(MatchExclusion)
+            .values([{"user_id": user_id, "partner_ids": b"", "updated_at": now} for user_id in chunk])
+            .on_conflict_do_nothing(index_elements=[MatchExclusion.user_id])
+        )
+    existing = _load_partner_ids(db, user_ids, for_update=True)
+
+    updates = []
+    for user_id in user_ids:
+        merged = np.union1d(
+            _unpack(existing.get(user_id)),
+            np.asarray(new_partners[user_id], dtype=np.int32),
+        )
+        updates.append({"user_id": user_id, "partner_ids": _pack(merged), "updated_at": now})
+
+    # ORM 객체를 만들지 않고 executemany 로 한 번에 반영
+    db.execute(update(MatchExclusion), updates)
+
+
+def _lock_for_rebuild(db: Session) -> None:
+    # 진행 중인 매칭 반영이 commit 될 때까지 기다리고, 재구성하는 동안 새 반영을 막음
+    db.execute(select(func.pg_advisory_xact_lock(EXCLUSION_REBUILD_LOCK_ID)))
+
+
+def rebuild_match_exclusions(db: Session) -> int:
+    """
+    match_results 전체를 한 번 읽어서 인덱스를 다시 만들고 backfill 기록을 남긴다. (최초 도입 / 복구용)
+    리턴: 인덱스 행 수
+    """
+    _lock_for_rebuild(db)
+    return _rebuild_locked(db)
+
+
+def _rebuild_locked(db: Session) -> int:
+    global _backfill_done
+
+    partners: dict[int, list[int]] = {}
+    past_matches = db.query(MatchResult.user_a_id, MatchResult.user_b_id).yield_per(10000)
+    for a_id, b_id in past_matches:
+        partners.setdefault(a_id, []).append(b_id)
+        partners.setdefault(b_id, []).append(a_id)
+
+    db.query(MatchExclusion).delete(synchronize_session=False)
+    for user_id, ids in partners.items():
+        db.add(
+            MatchExclusion(
+                user_id=user_id,
+                partner_ids=_pack(np.unique(np.asarray(ids, dtype=np.int32))),
+            )
+        )
+    db.merge(MatchExclusionBackfill(id=BACKFILL_MARKER_ID, completed_at=datetime.utcnow()))
+    db.commit()
+    _backfill_done = True
+    return len(partners)
+
+
+def ensure_match_exclusions(db: Session) -> bool:
+    """
+    backfill 기록이 없으면 (도입 직후) match_results 전체로 인덱스를 재구성.
+    인덱스 행이 이미 있어도 기록이 없으면 재구성한다. (재구성 전에 반영된 매칭만 있을 수 있음)
+    리턴: 이번에 재구성했는지
+    """
+    global _backfill_done
+
+    if _backfill_done:
+        return False
+    if db.get(MatchExclusionBackfill, BACKFILL_MARKER_ID) is not None:
+        _backfill_done = True
+        return False
+
+    _lock_for_rebuild(db)
+    # 잠금을 기다리는 동안 다른 워커가 재구성했을 수 있음
+    db.expire_all()
+    if db.get(MatchExclusionBackfill, BACKFILL_MARKER_ID) is not None:
+        db.commit()
+        _backfill_done = True
+        return False
+    _rebuild_locked(db)
+    return True
+
+
+def load_partner_ids(db: Session, user_ids: Iterable[int]) -> dict[int, np.ndarray]:
+    """
+    유저별 과거 매칭 상대 user_id 배열 (정렬됨, 이력이 없는 유저는 빈 배열)
+    """
+    ensure_match_exclusions(db)
+
+    user_ids = list(user_ids)
+    packed = _load_partner_ids(db, user_ids)
+    return {user_id: _unpack(packed.get(user_id)) for user_id in user_ids}
+
+
+def load_excluded_pairs(db: Session, user_ids: Iterable[int]) -> Set[tuple[int, int]]:
+    """
+    주어진 유저들끼리의 과거 매칭 조합만 (min, max) 튜플 set 으로 로드.
+    전체 매칭 이력이 아니라 해당 유저들의 인덱스 행만 읽는다.
+    """
+    ensure_match_exclusions(db)
+
+    user_ids = list(user_ids)
+    eligible = np.asarray(sorted(user_ids), dtype=np.int32)
+
+    excluded_pairs: Set[tuple[int, int]] = set()
+    for chunk in _chunks(user_ids):
+        rows = (
+            db.query(MatchExclusion.user_id, MatchExclusion.partner_ids)
+            .filter(MatchExclusion.user_id.in_(chunk))
+        )
+        for user_id, data in rows:
+            partners = _unpack(data)
+            # 상대도 eligible 인 조합만 (양쪽 행에서 같은 조합이 나오므로 작은 쪽에서만 추가)
+            partners = partners[partners > user_id]
+            partners = partners[np.isin(partners, eligible, assume_unique=True)]
+            for partner_id in partners.tolist():
+                excluded_pairs.add((user_id, partner_id))
+    return excluded_pairs
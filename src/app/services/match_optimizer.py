@@ -0,0 +1,300 @@
+# app/services/match_optimizer.py
+import multiprocessing
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.services.match_engine import (
+    PairScorer,
+    SurveyCodeArrays,
+    greedy_match_by_best_score,
+    survey_type_index,
+)
+
+
+# 매칭 전략별 기본 시간 예산 (초)
+DEFAULT_TIME_BUDGET_SECONDS = 60.0
+
+# local search 안쪽 루프에서 시간 예산을 확인하는 간격 (반복 횟수)
+DEADLINE_CHECK_INTERVAL = 4096
+
+
+@dataclass
+class MatchingSummary:
+    """
+    매칭 전략 실행 결과 요약 (greedy 대비 비교용)
+    """
+    strategy: str
+    matched_count: int
+    total_score: int
+    greedy_matched_count: int
+    greedy_total_score: int
+    elapsed_seconds: float
+    timed_out: bool = False
+
+    def describe(self) -> str:
+        return (
+            f"strategy={self.strategy} "
+            f"matched={self.matched_count}(greedy {self.greedy_matched_count}) "
+            f"total_score={self.total_score}(greedy {self.greedy_total_score}) "
+            f"elapsed={self.elapsed_seconds:.2f}s"
+            + (" timed_out" if self.timed_out else "")
+        )
+
+
+def _sorted_pairs(pairs: list[tuple[int, int, int]]) -> list[tuple[int, int, int]]:
+    """
+    (점수 내림차순, index_a, index_b) 순서로 정렬, 쌍 안에서는 작은 인덱스가 A
+    """
+    normalized = [(min(i, j), max(i, j), s) for i, j, s in pairs]
+    normalized.sort(key=lambda p: (-p[2], p[0], p[1]))
+    return normalized
+
+
+def _summarize(
+    strategy: str,
+    pairs: list[tuple[int, int, int]],
+    greedy_pairs: list[tuple[int, int, int]],
+    started_at: float,
+    timed_out: bool,
+) -> MatchingSummary:
+    return MatchingSummary(
+        strategy=strategy,
+        matched_count=len(pairs),
+        total_score=sum(s for _, _, s in pairs),
+        greedy_matched_count=len(greedy_pairs),
+        greedy_total_score=sum(s for _, _, s in greedy_pairs),
+        elapsed_seconds=time.monotonic() - started_at,
+        timed_out=timed_out,
+    )
+
+
+# --------------------------
+# 1) 정확한 최대 가중치 매칭 (blossom)
+# --------------------------
+
+def _exact_worker(
+    user_ids: np.ndarray,
+    types: np.ndarray,
+    groups: np.ndarray | None,
+    type_table: np.ndarray,
+    excluded_pairs: set[tuple[int, int]],
+) -> list[tuple[int, int, int]]:
+    """
+    별도 프로세스에서 실행되는 blossom 매칭.
+    최대 매칭 수를 우선으로 하고, 그 안에서 총점이 최대인 매칭을 구한다.
+    """
+    import networkx as nx
+
+    n = int(user_ids.shape[0])
+    graph = nx.Graph()
+    graph.add_nodes_from(range(n))
+
+    for i in range(n - 1):
+        a_id = int(user_ids[i])
+        row = type_table[types[i], types[i + 1:]].tolist()
+        for offset, score in enumerate(row):
+            j = i + 1 + offset
+            if groups is not None and groups[i] == groups[j]:
+                continue
+            b_id = int(user_ids[j])
+            if (min(a_id, b_id), max(a_id, b_id)) in excluded_pairs:
+                continue
+            graph.add_edge(i, j, weight=score)
+
+    matching = nx.max_weight_matching(graph, maxcardinality=True, weight="weight")
+    return [(i, j, int(graph[i][j]["weight"])) for i, j in matching]
+
+
+def exact_max_weight_match(
+    arrays: SurveyCodeArrays,
+    scorer: PairScorer,
+    excluded_pairs: set[tuple[int, int]] | None = None,
+    time_budget_seconds: float = DEFAULT_TIME_BUDGET_SECONDS,
+) -> tuple[list[tuple[int, int, int]], MatchingSummary]:
+    """
+    blossom 알고리즘(networkx)으로 최대 매칭 수 + 최대 총점 매칭을 구한다.
+
+    - O(n^3) 이라 별도 프로세스에서 돌리고, 시간 예산을 넘기면 프로세스를 종료한 뒤
+      greedy 결과를 그대로 사용한다. (timed_out=True)
+    """
+    started_at = time.monotonic()
+    excluded_pairs = excluded_pairs or set()
+
+    greedy_pairs = greedy_match_by_best_score(arrays, scorer, excluded_pairs)
+    if len(arrays) < 2:
+        return greedy_pairs, _summarize("exact", greedy_pairs, greedy_pairs, started_at, False)
+
+    remaining = time_budget_seconds - (time.monotonic() - started_at)
+    if remaining <= 0:
+        return greedy_pairs, _summarize("exact", greedy_pairs, greedy_pairs, started_at, True)
+
+    ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(processes=1)
+    try:
+        async_result = pool.apply_async(
+            _exact_worker,
+            (
+                arrays.user_ids,
+                survey_type_index(arrays.codes),
+                arrays.groups,
+                scorer.type_table,
+                excluded_pairs,
+            ),
+        )
+        pairs = _sorted_pairs(async_result.get(timeout=remaining))
+        pool.close()
+    except multiprocessing.TimeoutError:
+        pool.terminate()
+        return greedy_pairs, _summarize("exact", greedy_pairs, greedy_pairs, started_at, True)
+    except BaseException:
+        # 워커 예외 등: join 전에 풀을 정리해야 원래 예외가 그대로 올라간다
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return pairs, _summarize("exact", pairs, greedy_pairs, started_at, False)
+
+
+# --------------------------
+# 2) greedy 결과 기반 local search
+# --------------------------
+
+def local_search_match(
+    arrays: SurveyCodeArrays,
+    scorer: PairScorer,
+    excluded_pairs: set[tuple[int, int]] | None = None,
+    time_budget_seconds: float = DEFAULT_TIME_BUDGET_SECONDS,
+) -> tuple[list[tuple[int, int, int]], MatchingSummary]:
+    """
+    greedy 결과에서 출발해 시간 예산 안에서 매칭을 개선한다.
+
+    1) 증가 경로: 매칭 안 된 두 유저 u, v (과거 조합이라 서로는 불가) 와
+       기존 쌍 (a, b) 에 대해 (u, a) + (v, b) 로 바꿀 수 있으면 매칭 수 +1
+    2) 2-swap: 두 쌍 (a, b), (c, d) 를 (a, c)+(b, d) 또는 (a, d)+(b, c) 로
+       바꿨을 때 총점이 오르면 교체 (더 이상 개선이 없을 때까지 반복)
+    """
+    started_at = time.monotonic()
+    deadline = started_at + time_budget_seconds
+    excluded_pairs = excluded_pairs or set()
+
+    greedy_pairs = greedy_match_by_best_score(arrays, scorer, excluded_pairs)
+    if len(greedy_pairs) < 1:
+        return greedy_pairs, _summarize("local_search", greedy_pairs, greedy_pairs, started_at, False)
+
+    user_ids = arrays.user_ids.tolist()
+    groups = arrays.groups
+    types = survey_type_index(arrays.codes)
+    table = scorer.type_table
+
+    def _allowed(i: int, j: int) -> bool:
+        if groups is not None and groups[i] == groups[j]:
+            return False
+        a_id = user_ids[i]
+        b_id = user_ids[j]
+        return (min(a_id, b_id), max(a_id, b_id)) not in excluded_pairs
+
+    def _score(i: int, j: int) -> int:
+        return int(table[types[i], types[j]])
+
+    side_a = np.array([i for i, _, _ in greedy_pairs], dtype=np.int64)
+    side_b = np.array([j for _, j, _ in greedy_pairs], dtype=np.int64)
+    timed_out = False
+
+    # 1) 증가 경로 (매칭 수 늘리기)
+    matched = np.zeros(len(arrays), dtype=bool)
+    matched[side_a] = True
+    matched[side_b] = True
+    unmatched = np.flatnonzero(~matched).tolist()
+
+    new_a: list[int] = []
+    new_b: list[int] = []
+    # u 하나에 (남은 유저 × 기존 쌍) 만큼 돌 수 있으므로 안쪽 루프에서도 시간 예산 확인
+    steps = 0
+    for x, u in enumerate(unmatched):
+        if timed_out or time.monotonic() > deadline:
+            timed_out = True
+            break
+        if matched[u]:
+            continue
+        for v in unmatched[x + 1:]:
+            if timed_out:
+                break
+            if matched[v] or matched[u]:
+                continue
+            for p in range(side_a.shape[0]):
+                steps += 1
+                if steps % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                    timed_out = True
+                    break
+                a = int(side_a[p])
+                b = int(side_b[p])
+                if _allowed(u, a) and _allowed(v, b):
+                    side_a[p], side_b[p] = u, a
+                elif _allowed(u, b) and _allowed(v, a):
+                    side_a[p], side_b[p] = u, b
+                    a, b = b, a
+                else:
+                    continue
+                new_a.append(v)
+                new_b.append(b)
+                matched[u] = True
+                matched[v] = True
+                break
+
+    if new_a:
+        side_a = np.concatenate([side_a, np.array(new_a, dtype=np.int64)])
+        side_b = np.concatenate([side_b, np.array(new_b, dtype=np.int64)])
+
+    # 2) 2-swap (총점 늘리기)
+    improved = True
+    while improved and not timed_out:
+        improved = False
+        for p in range(side_a.shape[0]):
+            if time.monotonic() > deadline:
+                timed_out = True
+                break
+
+            a = int(side_a[p])
+            b = int(side_b[p])
+            ta = types[a]
+            tb = types[b]
+            t_side_a = types[side_a]
+            t_side_b = types[side_b]
+
+            current = table[ta, tb] + table[t_side_a, t_side_b]
+            swap_ac = table[ta, t_side_a] + table[tb, t_side_b]
+            swap_ad = table[ta, t_side_b] + table[tb, t_side_a]
+            gain = np.maximum(swap_ac, swap_ad).astype(np.int32) - current
+            gain[p] = 0
+
+            candidates = np.flatnonzero(gain > 0)
+            if candidates.size == 0:
+                continue
+
+            # 이득이 큰 순서로 과거 조합 제약을 만족하는 첫 교체 적용
+            for q in candidates[np.argsort(-gain[candidates], kind="stable")].tolist():
+                c = int(side_a[q])
+                d = int(side_b[q])
+                before = _score(a, b) + _score(c, d)
+
+                swapped = False
+                for x, y in ((c, d), (d, c)):
+                    if _score(a, x) + _score(b, y) <= before:
+                        continue
+                    if _allowed(a, x) and _allowed(b, y):
+                        side_a[p], side_b[p] = a, x
+                        side_a[q], side_b[q] = b, y
+                        swapped = True
+                        break
+
+                if swapped:
+                    improved = True
+                    break
+
+    pairs = _sorted_pairs(
+        [(int(i), int(j), _score(int(i), int(j))) for i, j in zip(side_a, side_b)]
+    )
+    return pairs, _summarize("local_search", pairs, greedy_pairs, started_at, timed_out)
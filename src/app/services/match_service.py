@@ -1,7 +1,13 @@
 # app/services/match_service.py
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
 from typing import TypedDict, List, Tuple, Set
 from datetime import datetime
 
+import numpy as np
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 
 from app.models.user import User
@@ -9,7 +15,24 @@ from app.models.profile import Profile
 from app.models.match import MatchResult
 from app.models.enums import MatchStatus
 
-from app.services.report_service import build_compatibility_report_from_profiles
+from app.services.report_service import (
+    compatibility_report_key,
+    compatibility_report_key_from_profiles,
+)
+from app.services.match_exclusion_service import add_match_exclusions, load_excluded_pairs
+from app.services.match_engine import (
+    QUESTION_CODE_MAX,
+    PairScorer,
+    SurveyCodeArrays,
+    build_lookup_table,
+    cohort_match_by_best_score,
+    greedy_match_by_best_score,
+)
+from app.services.match_optimizer import (
+    DEFAULT_TIME_BUDGET_SECONDS,
+    exact_max_weight_match,
+    local_search_match,
+)
 
 
 class MatchScoreDetail(TypedDict):
@@ -73,6 +96,18 @@ def _score_q4(n1: int, n2: int) -> int:
     return 20
 
 
+# 질문지별 점수 lookup table (numpy 매칭 엔진용)
+MATCH_PAIR_SCORER = PairScorer(
+    [
+        build_lookup_table(score_fn, max_code)
+        for score_fn, max_code in zip(
+            (_score_q1, _score_q2, _score_q3, _score_q4),
+            QUESTION_CODE_MAX,
+        )
+    ]
+)
+
+
 def compute_match_score_from_codes(
     *,
     q1_a: int,
@@ -126,17 +161,18 @@ def create_match_result(
     profile_b: Profile,
 ) -> MatchResult:
     scores = compute_match_score_from_profiles(profile_a, profile_b)
-    report = build_compatibility_report_from_profiles(profile_a, profile_b)
+    report_key = compatibility_report_key_from_profiles(profile_a, profile_b)
 
     match = MatchResult(
         user_a_id=profile_a.user_id,
         user_b_id=profile_b.user_id,
         compatibility_score=scores["total"],
-        compatibility_report=report,
+        compatibility_report_key=report_key,
         status=MatchStatus.MATCHED,
     )
 
     db.add(match)
+    add_match_exclusions(db, [(profile_a.user_id, profile_b.user_id)])
     db.commit()
     db.refresh(match)
     return match
@@ -148,103 +184,390 @@ def _pair_key(a_id: int, b_id: int) -> tuple[int, int]:
     return (min(a_id, b_id), max(a_id, b_id))
 
 
-def create_daily_match_results_by_best_score(db: Session) -> list[MatchResult]:
+# eligible 유저 스트리밍 로드 시 한 번에 가져올 행 수
+ELIGIBLE_LOAD_BATCH_SIZE = 10000
+
+
+@dataclass
+class EligibleSnapshot:
     """
-    매일 0시에 스케줄러가 호출할 매칭 생성 함수.
+    야간 매칭용 eligible 유저 스냅샷 (ORM 객체 없이 배열/컬럼 값만 보관)
+    - arrays: user_id + 설문 코드 4개
+    - genders / locations: 샤드 분할 규칙이 있을 때만 채움
+    """
+    arrays: SurveyCodeArrays
+    genders: list[str | None] | None = None
+    locations: list[str | None] | None = None
+
+    def __len__(self) -> int:
+        return len(self.arrays)
 
-    - 대상:
-      - 채팅중이 아닌 유저
-    - 과거에 한 번이라도 매칭된 (A,B) 조합은 제외
-    - 점수 내림차순으로 정렬
-    - 한 사람이 하루에 한 번만 매칭되도록 greedy하게 짝을 짓고
-    - status = MATCHED 인 MatchResult를 생성
 
-    리턴: 생성된 MatchResult 리스트
+def load_eligible_snapshot(
+    db: Session,
+    with_partition_fields: bool = False,
+    batch_size: int = ELIGIBLE_LOAD_BATCH_SIZE,
+    user_ids: list[int] | None = None,
+) -> EligibleSnapshot:
+    """
+    매칭 가능한 유저(채팅중이 아니고 설문 코드가 모두 있는 프로필)의
+    user_id + 설문 코드만 서버 사이드 커서로 나눠 읽어서 배열에 채운다. (조회 순서 유지)
+    user_ids 를 주면 그 유저들 중에서만 조회한다.
     """
-    # 매칭 가능한 유저 + 프로필 조회
-    eligible_users: list[User] = (
-        db.query(User)
-        .join(Profile, Profile.user_id == User.id)
-        .filter(
+    columns = [
+        Profile.user_id,
+        Profile.helen_code,
+        Profile.enneagram_maturity,
+        Profile.enneagram_instinct,
+        Profile.enneagram_core_type,
+    ]
+    if with_partition_fields:
+        columns += [Profile.gender, Profile.location]
+
+    stmt = (
+        select(*columns)
+        .join(User, User.id == Profile.user_id)
+        .where(
             User.is_in_chat.is_(False),
+            Profile.helen_code.isnot(None),
+            Profile.enneagram_maturity.isnot(None),
+            Profile.enneagram_instinct.isnot(None),
+            Profile.enneagram_core_type.isnot(None),
         )
-        .all()
+        .execution_options(yield_per=batch_size)
     )
+    if user_ids is not None:
+        stmt = stmt.where(Profile.user_id.in_(user_ids))
 
-    if len(eligible_users) < 2:
-        return []
+    code_chunks: list[np.ndarray] = []
+    genders: list[str | None] | None = [] if with_partition_fields else None
+    locations: list[str | None] | None = [] if with_partition_fields else None
 
-    profiles_by_user_id: dict[int, Profile] = {
-        u.id: u.profile for u in eligible_users
-    }
+    for partition in db.execute(stmt).partitions():
+        code_chunks.append(
+            np.array([row[:5] for row in partition], dtype=np.int64).reshape(-1, 5)
+        )
+        if with_partition_fields:
+            genders.extend(row[5] for row in partition)
+            locations.extend(row[6] for row in partition)
+
+    data = (
+        np.concatenate(code_chunks)
+        if code_chunks
+        else np.empty((0, 5), dtype=np.int64)
+    )
+    arrays = SurveyCodeArrays(
+        user_ids=data[:, 0].copy(),
+        codes=data[:, 1:].T.astype(np.int8),
+    )
+    return EligibleSnapshot(arrays=arrays, genders=genders, locations=locations)
 
-    user_ids = list(profiles_by_user_id.keys())
 
-    # 2) 과거 매칭 조합 수집 (한 번 매칭된 사람끼리는 다시 매칭되면 안 됨)
-    existing_pairs: Set[tuple[int, int]] = set()
+def _with_summary(optimize_fn, time_budget_seconds: float):
+    """
+    (pairs, MatchingSummary) 를 돌려주는 최적화 전략을 match_fn 형태로 감싸고
+    greedy 대비 결과를 로그로 남긴다.
+    """
+    def match_fn(arrays, scorer, excluded_pairs):
+        pairs, summary = optimize_fn(
+            arrays,
+            scorer,
+            excluded_pairs,
+            time_budget_seconds=time_budget_seconds,
+        )
+        print(f"[match] {summary.describe()}")
+        return pairs
 
-    past_matches = db.query(MatchResult.user_a_id, MatchResult.user_b_id).all()
-    for a_id, b_id in past_matches:
-        existing_pairs.add(_pair_key(a_id, b_id))
+    return match_fn
 
-    # 3) 모든 가능한 (A,B) 쌍에 대해 점수 계산 (과거 조합 제외)
-    candidate_pairs: list[tuple[int, Profile, Profile]] = []
 
-    n = len(user_ids)
-    for i in range(n):
-        for j in range(i + 1, n):
-            ua = user_ids[i]
-            ub = user_ids[j]
+# 매칭 전략 이름 → match_fn 생성기
+# match_fn(arrays, scorer, excluded_pairs) -> [(index_a, index_b, total_score), ...]
+MATCH_STRATEGIES = {
+    "best_score": lambda budget: greedy_match_by_best_score,
+    "cohort": lambda budget: cohort_match_by_best_score,
+    "exact": partial(_with_summary, exact_max_weight_match),
+    "local_search": partial(_with_summary, local_search_match),
+}
 
-            if _pair_key(ua, ub) in existing_pairs:
-                continue
 
-            p_a = profiles_by_user_id.get(ua)
-            p_b = profiles_by_user_id.get(ub)
-            if not p_a or not p_b:
-                continue
+# 샤드 분할 규칙
+# - region: 활동지역(location) 첫 단어 기준으로 샤드 분리 (예: "서울 강남구" → "서울")
+# - gender: 같은 성별끼리 샤드 분리
+# - opposite_gender: 샤드 안에서 서로 다른 성별끼리만 매칭 (성별 미입력 유저는 제외)
+MATCH_PARTITION_RULES = ("region", "gender", "opposite_gender")
 
-            scores = compute_match_score_from_profiles(p_a, p_b)
-            total_score = scores["total"]
 
-            candidate_pairs.append((total_score, p_a, p_b))
+def _region_of(location: str | None) -> str:
+    if not location:
+        return ""
+    parts = location.split()
+    return parts[0] if parts else ""
 
-    if not candidate_pairs:
-        return []
 
-    # 4) 점수 내림차순 정렬
-    candidate_pairs.sort(key=lambda x: x[0], reverse=True)
+def _partition_snapshot(
+    snapshot: EligibleSnapshot,
+    partition_rules: tuple[str, ...],
+) -> dict[tuple[str, ...], list[int]]:
+    """
+    분할 규칙에 따라 스냅샷 인덱스들을 샤드별로 나눈다. (샤드 안에서는 조회 순서 유지)
+    """
+    for rule in partition_rules:
+        if rule not in MATCH_PARTITION_RULES:
+            raise ValueError(f"지원하지 않는 샤드 분할 규칙: {rule}")
 
-    # 5) greedy 매칭: 한 번 매칭된 user_id는 더 이상 사용하지 않음
-    matched_user_ids: set[int] = set()
-    created_matches: list[MatchResult] = []
-    now = datetime.utcnow()
+    if not partition_rules:
+        return {(): list(range(len(snapshot)))}
 
-    for total_score, p_a, p_b in candidate_pairs:
-        if p_a.user_id in matched_user_ids or p_b.user_id in matched_user_ids:
+    shards: dict[tuple[str, ...], list[int]] = {}
+    for idx in range(len(snapshot)):
+        gender = snapshot.genders[idx]
+        if "opposite_gender" in partition_rules and not gender:
             continue
 
-        # 궁합 리포트 생성    
-        report = build_compatibility_report_from_profiles(p_a, p_b)
-        # 아직 매칭 안 된 두 명이면 MatchResult 생성
-        match = MatchResult(
-            user_a_id=p_a.user_id,
-            user_b_id=p_b.user_id,
-            compatibility_score=total_score,
-            compatibility_report=report,
-            status=MatchStatus.MATCHED,
-            created_at=now,
-            # 채팅/공개 관련 필드는 아직 False/None
+        key: list[str] = []
+        if "region" in partition_rules:
+            key.append(_region_of(snapshot.locations[idx]))
+        if "gender" in partition_rules:
+            key.append(gender or "")
+        shards.setdefault(tuple(key), []).append(idx)
+    return shards
+
+
+def _match_shard(
+    strategy: str,
+    time_budget_seconds: float,
+    arrays: SurveyCodeArrays,
+    excluded_pairs: Set[tuple[int, int]],
+) -> list[tuple[int, int, int]]:
+    """
+    샤드 하나를 매칭 (ProcessPoolExecutor 워커에서도 실행됨).
+    리턴: [(index_a, index_b, total_score), ...]  (샤드 arrays 기준 인덱스)
+    """
+    match_fn = MATCH_STRATEGIES[strategy](time_budget_seconds)
+    pairs = match_fn(arrays, MATCH_PAIR_SCORER, excluded_pairs)
+    return [(int(i), int(j), int(total_score)) for i, j, total_score in pairs]
+
+
+@dataclass
+class CreatedMatch:
+    """
+    야간 매칭으로 생성된 MatchResult 요약 (ORM 객체 refresh 없이 RETURNING 값만 사용)
+    """
+    id: int
+    user_a_id: int
+    user_b_id: int
+    compatibility_score: int
+
+
+# 야간 매칭 multi-row INSERT 한 번에 넣을 행 수
+MATCH_INSERT_CHUNK_SIZE = 1000
+
+
+def save_match_pairs(
+    db: Session,
+    arrays: SurveyCodeArrays,
+    pairs: list[tuple[int, int, int]],
+    chunk_size: int = MATCH_INSERT_CHUNK_SIZE,
+) -> list[CreatedMatch]:
+    """
+    (index_a, index_b, total_score) 목록(arrays 기준 인덱스)을 chunk_size 단위
+    multi-row INSERT ... RETURNING 으로 저장하고 한 번에 commit
+    """
+    created_matches: list[CreatedMatch] = []
+    now = datetime.utcnow()
+
+    user_ids = arrays.user_ids.tolist()
+    helen_codes = arrays.codes[0].tolist()
+    core_types = arrays.codes[3].tolist()
+
+    rows = []
+    for idx_a, idx_b, total_score in pairs:
+        user_a_id = user_ids[idx_a]
+        user_b_id = user_ids[idx_b]
+        # 궁합 리포트는 카탈로그 키만 저장 (텍스트는 조회 시 카탈로그에서 resolve)
+        report_key = compatibility_report_key(
+            helen_codes[idx_a],
+            helen_codes[idx_b],
+            core_types[idx_a],
+            core_types[idx_b],
+        )
+        rows.append(
+            {
+                "user_a_id": user_a_id,
+                "user_b_id": user_b_id,
+                "compatibility_score": total_score,
+                "compatibility_report_key": report_key,
+                "status": MatchStatus.MATCHED,
+                # 채팅/공개 관련 필드는 아직 False/None
+                "is_chat_accepted_by_a": False,
+                "is_chat_accepted_by_b": False,
+                "is_contact_shared_by_a": False,
+                "is_contact_shared_by_b": False,
+                "created_at": now,
+            }
+        )
+
+    for start in range(0, len(rows), chunk_size):
+        stmt = (
+            insert(MatchResult)
+            .values(rows[start:start + chunk_size])
+            .returning(
+                MatchResult.id,
+                MatchResult.user_a_id,
+                MatchResult.user_b_id,
+                MatchResult.compatibility_score,
+            )
         )
-        db.add(match)
-        created_matches.append(match)
+        created_matches.extend(CreatedMatch(*row) for row in db.execute(stmt))
 
-        matched_user_ids.add(p_a.user_id)
-        matched_user_ids.add(p_b.user_id)
+    # 과거 매칭 인덱스 갱신 (MatchResult 와 같은 트랜잭션)
+    add_match_exclusions(db, ((user_ids[i], user_ids[j]) for i, j, _ in pairs))
 
     db.commit()
 
-    for m in created_matches:
-        db.refresh(m)
+    return created_matches
+
+
+def create_daily_match_results(
+    db: Session,
+    strategy: str = "best_score",
+    time_budget_seconds: float = DEFAULT_TIME_BUDGET_SECONDS,
+    partition_rules: tuple[str, ...] = (),
+    max_workers: int = 1,
+    insert_chunk_size: int = MATCH_INSERT_CHUNK_SIZE,
+) -> list[CreatedMatch]:
+    """
+    매칭 전략을 골라서 매칭 생성.
+
+    - strategy
+      - best_score: 점수 내림차순 greedy (기본값)
+      - cohort: 설문 유형 코호트 greedy
+      - exact: blossom 최대 가중치 매칭 (시간 예산 초과 시 greedy 결과 사용)
+      - local_search: greedy 결과를 시간 예산 안에서 증가 경로 / 2-swap 으로 개선
+      exact / local_search 는 greedy 대비 매칭 수, 총점을 로그로 남긴다.
+    - partition_rules: MATCH_PARTITION_RULES 조합. 샤드끼리는 서로 매칭되지 않는다.
+    - max_workers: 2 이상이면 샤드를 ProcessPoolExecutor 에서 병렬 매칭
+      (시간 예산은 샤드별로 적용)
+
+    모든 샤드 결과는 insert_chunk_size 단위 multi-row INSERT 로 넣고 한 번의 commit 으로 저장한다.
+    리턴: 생성된 매칭 요약(CreatedMatch) 리스트
+    """
+    if strategy not in MATCH_STRATEGIES:
+        raise ValueError(f"지원하지 않는 매칭 전략: {strategy}")
+
+    # 1) 매칭 가능한 유저의 user_id + 설문 코드 스냅샷 (ORM 객체 없이 스트리밍 로드)
+    snapshot = load_eligible_snapshot(db, with_partition_fields=bool(partition_rules))
+
+    if len(snapshot) < 2:
+        return []
+
+    all_arrays = snapshot.arrays
+
+    # 2) 샤드 분할 (스냅샷 인덱스 기준)
+    shards = _partition_snapshot(snapshot, tuple(partition_rules))
+    shard_keys = [key for key in sorted(shards) if len(shards[key]) >= 2]
+
+    shard_no = np.full(len(snapshot), -1, dtype=np.int32)
+    for no, key in enumerate(shard_keys):
+        shard_no[shards[key]] = no
+
+    # 3) eligible 유저끼리의 과거 매칭 조합만 인덱스에서 읽어 샤드별로 분배
+    #    (샤드 밖 조합은 어차피 후보가 아님)
+    excluded_by_shard: list[Set[tuple[int, int]]] = [set() for _ in shard_keys]
+    excluded = list(load_excluded_pairs(db, all_arrays.user_ids.tolist()))
+    if excluded:
+        order = np.argsort(all_arrays.user_ids, kind="stable")
+        sorted_ids = all_arrays.user_ids[order]
+        pair_ids = np.array(excluded, dtype=np.int64)
+        shard_a = shard_no[order[np.searchsorted(sorted_ids, pair_ids[:, 0])]]
+        shard_b = shard_no[order[np.searchsorted(sorted_ids, pair_ids[:, 1])]]
+        for k in np.flatnonzero((shard_a == shard_b) & (shard_a >= 0)).tolist():
+            excluded_by_shard[shard_a[k]].add(excluded[k])
+
+    # 4) 샤드별 설문 코드 배열
+    opposite_gender = "opposite_gender" in partition_rules
+    shard_inputs: list[tuple[np.ndarray, SurveyCodeArrays, Set[tuple[int, int]]]] = []
+    for no, key in enumerate(shard_keys):
+        index = np.asarray(shards[key], dtype=np.int64)
+
+        groups = None
+        if opposite_gender:
+            gender_codes: dict[str, int] = {}
+            groups = np.asarray(
+                [
+                    gender_codes.setdefault(snapshot.genders[idx], len(gender_codes))
+                    for idx in shards[key]
+                ],
+                dtype=np.int16,
+            )
+
+        arrays = SurveyCodeArrays(
+            user_ids=all_arrays.user_ids[index],
+            codes=all_arrays.codes[:, index],
+            groups=groups,
+        )
+        shard_inputs.append((index, arrays, excluded_by_shard[no]))
+
+    # 5) 샤드별 매칭 (워커가 2개 이상이고 샤드가 여러 개면 프로세스 병렬)
+    if max_workers > 1 and len(shard_inputs) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(shard_inputs)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(_match_shard, strategy, time_budget_seconds, arrays, excluded)
+                for _, arrays, excluded in shard_inputs
+            ]
+            shard_pairs = [future.result() for future in futures]
+    else:
+        shard_pairs = [
+            _match_shard(strategy, time_budget_seconds, arrays, excluded)
+            for _, arrays, excluded in shard_inputs
+        ]
+
+    # 샤드 인덱스 → 스냅샷 인덱스
+    pairs: list[tuple[int, int, int]] = []
+    for (index, _, _), local_pairs in zip(shard_inputs, shard_pairs):
+        pairs.extend(
+            (int(index[i]), int(index[j]), total_score)
+            for i, j, total_score in local_pairs
+        )
+
+    if not pairs:
+        return []
 
-    return created_matches
\ No newline at end of file
+    # 6) MatchResult 생성 (전체 샤드 결과를 한 번에 commit)
+    return save_match_pairs(db, all_arrays, pairs, insert_chunk_size)
+
+
+def create_daily_match_results_by_best_score(db: Session) -> list[CreatedMatch]:
+    """
+    매일 0시에 스케줄러가 호출할 매칭 생성 함수.
+
+    - 대상:
+      - 채팅중이 아닌 유저
+    - 과거에 한 번이라도 매칭된 (A,B) 조합은 제외
+    - 점수 버킷(내림차순) 순서로 numpy 타일 단위 점수 계산
+    - 한 사람이 하루에 한 번만 매칭되도록 greedy하게 짝을 짓고
+    - status = MATCHED 인 MatchResult를 생성
+
+    리턴: 생성된 매칭 요약(CreatedMatch) 리스트
+    """
+    # 점수 버킷(내림차순) × 타일 단위 greedy 매칭
+    # (기존 "전체 후보 정렬 후 greedy"와 동일한 결과)
+    return create_daily_match_results(db, strategy="best_score")
+
+
+def create_daily_match_results_by_cohort(db: Session) -> list[CreatedMatch]:
+    """
+    설문 유형(코호트) 단위 매칭 생성 함수.
+
+    - 대상/과거 조합 제외 규칙은 create_daily_match_results_by_best_score 와 동일
+    - 유저를 설문 유형(324가지)별로 묶고, 유형 × 유형 점수표(324×324)를
+      한 번만 계산해 점수 높은 코호트 쌍부터 짝을 짓는다.
+    - 유저 쌍 전체를 보지 않으므로 유저 수에 대략 선형으로 늘어난다.
+
+    리턴: 생성된 매칭 요약(CreatedMatch) 리스트
+    """
+    return create_daily_match_results(db, strategy="cohort")
@@ -0,0 +1,202 @@
+# app/services/online_match_service.py
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.models.match import MatchResult
+from app.services.match_engine import PairScorer, SurveyCodeArrays, survey_type_index
+from app.services.match_exclusion_service import load_partner_ids
+from app.services.match_service import (
+    MATCH_PAIR_SCORER,
+    CreatedMatch,
+    load_eligible_snapshot,
+    save_match_pairs,
+)
+
+
+class OnlineMatchPool:
+    """
+    낮 시간 온라인 매칭용 대기 풀 (프로세스 단위 메모리).
+
+    - 새로 eligible 이 된 유저(프로필 등록, 채팅 종료)는 enqueue 로 대기열에 넣고
+    - 스케줄러가 몇 초마다 process_pending 으로 마이크로 배치 처리한다.
+    - 처리 시 풀에 있는 상대 중 설문 유형 점수가 가장 높은 유형부터 보고,
+      과거 매칭 상대가 아닌 첫 유저와 바로 매칭한다. (야간 매칭과 같은 점수/제외 규칙)
+    - 상대가 없으면 유형별 풀에 들어가서 다음 유저를 기다린다.
+    - 풀은 프로세스마다 따로 있으므로 저장 직전에 고른 상대가 아직 매칭 가능한지 DB 에서 다시 확인한다.
+      (다른 워커에서 채팅을 시작했거나 매칭된 상대, 프로필이 지워진 상대는 풀에서 빼고
+       새 유저는 대기열에 다시 넣는다)
+    """
+
+    def __init__(self, scorer: PairScorer):
+        self.scorer = scorer
+        self._lock = threading.Lock()
+
+        # 처리 대기 중인 user_id (마이크로 배치)
+        self._pending: deque[int] = deque()
+        self._pending_set: set[int] = set()
+
+        # 설문 유형 → {user_id: ((q1, q2, q3, q4), 풀에 들어간 시각)} (삽입 순서 = 대기 순서)
+        self._pool: dict[int, dict[int, tuple[tuple[int, int, int, int], datetime]]] = {}
+        self._type_of: dict[int, int] = {}
+
+        # 설문 유형별 상대 유형 우선순위 (점수 내림차순, 최초 사용 시 계산)
+        self._partner_order: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._type_of)
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def enqueue(self, user_id: int) -> None:
+        with self._lock:
+            if user_id in self._pending_set:
+                return
+            self._pending.append(user_id)
+            self._pending_set.add(user_id)
+
+    def discard(self, user_id: int) -> None:
+        """
+        채팅 시작 등으로 더 이상 매칭 대상이 아닌 유저를 풀에서 제거
+        """
+        with self._lock:
+            self._remove(user_id)
+
+    def reset(self) -> None:
+        """
+        야간 매칭이 전체를 다시 짝지은 뒤 풀 비우기 (대기열은 유지)
+        """
+        with self._lock:
+            self._pool.clear()
+            self._type_of.clear()
+
+    def _remove(self, user_id: int) -> None:
+        t = self._type_of.pop(user_id, None)
+        if t is not None:
+            self._pool[t].pop(user_id, None)
+
+    def _partner_types(self, t: int) -> list[int]:
+        order = self._partner_order.get(t)
+        if order is None:
+            order = np.argsort(-self.scorer.type_table[t], kind="stable").tolist()
+            self._partner_order[t] = order
+        return order
+
+    def _find_partner(self, user_id: int, t: int, excluded: np.ndarray) -> int | None:
+        for partner_type in self._partner_types(t):
+            members = self._pool.get(partner_type)
+            if not members:
+                continue
+            for partner_id in members:
+                if partner_id == user_id:
+                    continue
+                pos = np.searchsorted(excluded, partner_id)
+                if pos < excluded.shape[0] and excluded[pos] == partner_id:
+                    continue
+                return partner_id
+        return None
+
+    def _stale_partner_ids(self, db: Session, joined_at: dict[int, datetime]) -> set[int]:
+        """
+        고른 상대 중 더 이상 매칭하면 안 되는 user_id
+        - 지금 eligible 이 아님 (채팅중, 프로필 삭제 등)
+        - 풀에 들어간 뒤 다른 곳(다른 워커의 온라인 매칭, 야간 매칭)에서 매칭이 생성됨
+        """
+        partner_ids = list(joined_at)
+        eligible = set(load_eligible_snapshot(db, user_ids=partner_ids).arrays.user_ids.tolist())
+        stale = {partner_id for partner_id in partner_ids if partner_id not in eligible}
+
+        stmt = select(MatchResult.user_a_id, MatchResult.user_b_id, MatchResult.created_at).where(
+            or_(MatchResult.user_a_id.in_(partner_ids), MatchResult.user_b_id.in_(partner_ids)),
+            MatchResult.created_at >= min(joined_at.values()),
+        )
+        for user_a_id, user_b_id, created_at in db.execute(stmt):
+            for user_id in (user_a_id, user_b_id):
+                if user_id in joined_at and created_at >= joined_at[user_id]:
+                    stale.add(user_id)
+        return stale
+
+    def process_pending(self, db: Session) -> list[CreatedMatch]:
+        """
+        대기열의 유저들을 풀과 매칭하고 MatchResult 를 저장한다.
+        리턴: 생성된 매칭 요약(CreatedMatch) 리스트
+        """
+        with self._lock:
+            user_ids = list(self._pending)
+            self._pending.clear()
+            self._pending_set.clear()
+
+        if not user_ids:
+            return []
+
+        # 현재도 eligible 인 유저만 (채팅중이 아니고 설문 코드가 모두 있는 프로필)
+        snapshot = load_eligible_snapshot(db, user_ids=user_ids)
+        arrays = snapshot.arrays
+        if len(arrays) == 0:
+            return []
+
+        types = survey_type_index(arrays.codes).tolist()
+        codes = arrays.codes.T.tolist()
+        partners_by_user = load_partner_ids(db, arrays.user_ids.tolist())
+
+        # (partner_id, partner_type, partner_codes, user_id, t, user_codes)
+        candidates: list[tuple[int, int, tuple[int, ...], int, int, tuple[int, ...]]] = []
+        joined_at: dict[int, datetime] = {}
+
+        with self._lock:
+            now = datetime.utcnow()
+            for k, user_id in enumerate(arrays.user_ids.tolist()):
+                if user_id in self._type_of:
+                    continue
+
+                t = types[k]
+                partner_id = self._find_partner(user_id, t, partners_by_user[user_id])
+                if partner_id is None:
+                    self._pool.setdefault(t, {})[user_id] = (tuple(codes[k]), now)
+                    self._type_of[user_id] = t
+                    continue
+
+                partner_type = self._type_of[partner_id]
+                partner_codes, joined_at[partner_id] = self._pool[partner_type][partner_id]
+                self._remove(partner_id)
+                candidates.append((partner_id, partner_type, partner_codes, user_id, t, tuple(codes[k])))
+
+        if not candidates:
+            return []
+
+        # 다른 워커에서 상태가 바뀐 상대는 버리고, 새 유저는 다음 배치에서 다시 상대를 찾는다
+        stale = self._stale_partner_ids(db, joined_at)
+
+        rows: list[tuple[int, int, int, int, int]] = []
+        pairs: list[tuple[int, int, int]] = []
+        for partner_id, partner_type, partner_codes, user_id, t, user_codes in candidates:
+            if partner_id in stale:
+                self.enqueue(user_id)
+                continue
+
+            # 먼저 기다리던 유저를 A 로 저장
+            rows.append((partner_id, *partner_codes))
+            rows.append((user_id, *user_codes))
+            pairs.append(
+                (
+                    len(rows) - 2,
+                    len(rows) - 1,
+                    int(self.scorer.type_table[partner_type, t]),
+                )
+            )
+
+        if not pairs:
+            return []
+
+        return save_match_pairs(db, SurveyCodeArrays.from_rows(rows), pairs)
+
+
+# 간단하게 전역 싱글톤처럼 사용
+online_match_pool = OnlineMatchPool(MATCH_PAIR_SCORER)
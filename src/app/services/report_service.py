@@ -829,17 +829,91 @@ def build_compatibility_report(
     enneagram_part = build_enneagram_compatibility(enneagram_a, enneagram_b)
     return f"{helen_part}\n\n{enneagram_part}"
 
+
+# 5) 궁합 리포트 카탈로그
+#    (helen_a, helen_b, enneagram_a, enneagram_b) 4×4×9×9 = 1296개 조합을
+#    한 번만 렌더링해 두고, MatchResult 에는 짧은 키만 저장한다.
+def compatibility_report_key(
+    helen_a: int,
+    helen_b: int,
+    enneagram_a: int,
+    enneagram_b: int,
+) -> str:
+    """
+    궁합 리포트 카탈로그 키 (예: "1-2-3-7")
+    """
+    return f"{helen_a}-{helen_b}-{enneagram_a}-{enneagram_b}"
+
+
+def _build_compatibility_report_catalog() -> Dict[str, str]:
+    catalog: Dict[str, str] = {}
+    for helen_a in HelenFisherType:
+        for helen_b in HelenFisherType:
+            for enneagram_a in EnneagramCoreType:
+                for enneagram_b in EnneagramCoreType:
+                    key = compatibility_report_key(
+                        int(helen_a), int(helen_b), int(enneagram_a), int(enneagram_b)
+                    )
+                    catalog[key] = build_compatibility_report(
+                        helen_a=int(helen_a),
+                        helen_b=int(helen_b),
+                        enneagram_a=int(enneagram_a),
+                        enneagram_b=int(enneagram_b),
+                    )
+    return catalog
+
+
+# 앱 시작(모듈 import) 시 1회 생성
+COMPATIBILITY_REPORT_CATALOG: Dict[str, str] = _build_compatibility_report_catalog()
+
+
+def compatibility_report_key_from_profiles(
+    profile_a: Profile,
+    profile_b: Profile,
+) -> str:
+    """
+    Profile 엔티티 두 개로부터 궁합 리포트 카탈로그 키 생성.
+    """
+    return compatibility_report_key(
+        helen_a=profile_a.helen_code,
+        helen_b=profile_b.helen_code,
+        enneagram_a=profile_a.enneagram_core_type,
+        enneagram_b=profile_b.enneagram_core_type,
+    )
+
+
+def resolve_compatibility_report(
+    report_key: str | None,
+    fallback: str | None = None,
+) -> str | None:
+    """
+    카탈로그 키 → 궁합 리포트 텍스트.
+    키가 없는(이전에 텍스트를 그대로 저장한) 매칭은 fallback 을 그대로 반환.
+    """
+    if report_key:
+        text = COMPATIBILITY_REPORT_CATALOG.get(report_key)
+        if text is not None:
+            return text
+    return fallback
+
+
 def build_compatibility_report_from_profiles(
     profile_a: Profile,
     profile_b: Profile,
 ) -> str:
     """
     Profile 엔티티 두 개로부터 compatibility_report 생성.
-    (helen_code, enneagram_core_type 사용)
+    (helen_code, enneagram_core_type 사용, 카탈로그에 있으면 미리 만든 문자열 재사용)
     """
+    text = COMPATIBILITY_REPORT_CATALOG.get(
+        compatibility_report_key_from_profiles(profile_a, profile_b)
+    )
+    if text is not None:
+        return text
+
     return build_compatibility_report(
         helen_a=profile_a.helen_code,
         helen_b=profile_b.helen_code,
         enneagram_a=profile_a.enneagram_core_type,
         enneagram_b=profile_b.enneagram_core_type,
-    )    
\ No newline at end of file
+    )
\ No newline at end of file
@@ -0,0 +1,341 @@
+import asyncio
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable
+from dataclasses import dataclass, asdict, field
+from urllib.parse import urlparse
+
+
+# 작업 상태
+JOB_QUEUED = "QUEUED"
+JOB_RUNNING = "RUNNING"
+JOB_FAILED = "FAILED"
+JOB_FINISHED_STATUSES = ("SUCCESS", "FAILED")
+
+# 디바이스 상태 (heartbeat 가 끊긴 디바이스)
+DEVICE_OFFLINE = "OFFLINE"
+
+# 작업 lease 시간 (초).
+# 할당 시점부터 시작하고, 그 작업을 가진 디바이스의 heartbeat 마다 다시 이 시간만큼 연장된다.
+# 연장되지 못하고 지나면 reaper 가 작업을 큐에 되돌린다.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+
+# 이 시간 동안 heartbeat 가 없으면 디바이스를 OFFLINE 으로 표시 (초)
+DEVICE_OFFLINE_SECONDS = float(os.getenv("DEVICE_OFFLINE_SECONDS", "60"))
+
+# lease 만료로 이 횟수만큼 되돌려진 작업은 더 돌리지 않고 FAILED 처리
+# (디바이스를 죽이는 작업이 계속 다른 디바이스로 넘어가는 것 방지)
+JOB_MAX_LEASE_EXPIRIES = int(os.getenv("JOB_MAX_LEASE_EXPIRIES", "3"))
+
+# reaper 1회에 처리할 최대 작업/디바이스 수
+JOB_REAP_BATCH_SIZE = int(os.getenv("JOB_REAP_BATCH_SIZE", "500"))
+
+JOB_LEASE_EXPIRED_ERROR = "lease expired"
+
+# long-poll heartbeat 최대 대기 시간 (초, 요청의 waitSeconds 상한)
+# DEVICE_OFFLINE_SECONDS 보다 짧아야 기다리는 동안 OFFLINE 처리되지 않는다
+JOB_WAIT_MAX_SECONDS = float(os.getenv("JOB_WAIT_MAX_SECONDS", "30"))
+
+# 대기 중에도 이 간격마다 큐를 다시 확인 (다른 워커의 알림을 놓쳤을 때 대비, 초)
+JOB_WAIT_RECHECK_SECONDS = float(os.getenv("JOB_WAIT_RECHECK_SECONDS", "5"))
+
+# 도메인(board.siteDomain)별 기본 제한. 0 = 제한 없음 (기본값은 모두 0, 필요한 경우에만 설정)
+# - 동시에 실행 중인 작업 수
+JOB_DOMAIN_MAX_CONCURRENCY = int(os.getenv("JOB_DOMAIN_MAX_CONCURRENCY", "0"))
+# - 분당 게시 수 (토큰 버킷 충전 속도, 할당할 때 토큰 1개 사용)
+JOB_DOMAIN_POSTS_PER_MINUTE = float(os.getenv("JOB_DOMAIN_POSTS_PER_MINUTE", "0"))
+# - 토큰 버킷 크기 (한 번에 몰아서 할당할 수 있는 수, 분당 게시 수를 설정했으면 최소 1)
+JOB_DOMAIN_BURST = float(os.getenv("JOB_DOMAIN_BURST", "0"))
+
+# 도메인별로 다르게 줄 설정 (JSON, 없는 항목은 기본값)
+# 예: {"example.com": {"concurrency": 1, "postsPerMinute": 2, "burst": 1, "weight": 3}}
+# weight 는 도메인 간 공정 분배 가중치 (2 면 같은 시간에 2배 많이 할당)
+JOB_DOMAIN_POLICIES = json.loads(os.getenv("JOB_DOMAIN_POLICIES", "{}"))
+
+UNKNOWN_DOMAIN = "unknown"
+UNKNOWN_SITE_TYPE = "Unknown"
+
+# 디바이스 조건(사이트 종류/세션)에 맞는 작업을 찾을 때 도메인 큐 앞에서부터 확인할 최대 작업 수
+JOB_MATCH_SCAN_LIMIT = int(os.getenv("JOB_MATCH_SCAN_LIMIT", "50"))
+
+# queue/status 조회 시 돌려줄 최근 작업 수
+QUEUE_STATUS_JOB_LIMIT = 1000
+
+
+@dataclass
+class Job:
+    jobId: str
+    jobType: str
+    payload: Dict[str, Any]
+    status: str = JOB_QUEUED
+    assigned_device: str | None = None
+    results: list[dict] | None = None
+    error: str | None = None
+    # lease 만료 시각 (epoch 초, RUNNING 일 때만) / lease 만료로 되돌려진 횟수
+    lease_deadline: float | None = None
+    attempts: int = 0
+    # 대상 사이트 도메인 (도메인별 큐/제한 단위) / 같은 도메인 안에서 높을수록 먼저
+    domain: str = UNKNOWN_DOMAIN
+    priority: int = 0
+    # board.siteType / 로그인이 필요한 작업이면 세션 키 ("도메인|계정")
+    site_type: str = UNKNOWN_SITE_TYPE
+    session: str | None = None
+
+
+@dataclass
+class DeviceCapabilities:
+    """
+    heartbeat 로 받은 디바이스 능력.
+    - site_types: 처리할 수 있는 board.siteType (None = 전부)
+    - slots     : 동시에 실행할 수 있는 작업 수
+    - sessions  : 이미 로그인해 둔 세션 키 ("도메인|계정") → 이 세션의 작업을 먼저 할당
+    """
+    site_types: tuple[str, ...] | None = None
+    slots: int = 1
+    sessions: tuple[str, ...] = ()
+
+    def supports(self, site_type: str) -> bool:
+        return self.site_types is None or site_type in self.site_types
+
+    def session_domains(self) -> set[str]:
+        return {session.split("|", 1)[0] for session in self.sessions}
+
+    def to_dict(self) -> dict:
+        return {
+            "siteTypes": list(self.site_types) if self.site_types is not None else None,
+            "slots": self.slots,
+            "sessions": list(self.sessions),
+        }
+
+
+# capabilities 를 보내지 않는 (이전) 디바이스: 모든 사이트, 슬롯 1개
+DEFAULT_CAPABILITIES = DeviceCapabilities()
+
+
+@dataclass
+class DomainPolicy:
+    concurrency: int = JOB_DOMAIN_MAX_CONCURRENCY
+    posts_per_minute: float = JOB_DOMAIN_POSTS_PER_MINUTE
+    burst: float = JOB_DOMAIN_BURST
+    weight: float = 1.0
+
+    def capacity(self) -> float:
+        """
+        토큰 버킷 크기 (속도 제한이 없으면 burst 그대로, 있으면 최소 1)
+        """
+        if not self.posts_per_minute:
+            return self.burst
+        return max(self.burst, 1.0)
+
+    def refill(self, tokens: float | None, elapsed_seconds: float) -> float:
+        """
+        토큰 버킷 충전 (tokens 가 None 이면 처음 → 가득 찬 상태, 속도 제한이 없으면 항상 가득 참)
+        """
+        if tokens is None or not self.posts_per_minute:
+            return self.capacity()
+        return min(self.capacity(), tokens + max(elapsed_seconds, 0) * self.posts_per_minute / 60)
+
+    def consume(self, tokens: float) -> float:
+        """
+        할당 1건 후 남는 토큰 (속도 제한이 없으면 차감하지 않음, 0 아래로 내려가지 않음)
+        """
+        if not self.posts_per_minute:
+            return self.capacity()
+        return max(tokens - 1, 0.0)
+
+    def allows(self, running: int, tokens: float) -> bool:
+        # concurrency / posts_per_minute 가 0 이면 해당 제한은 확인하지 않음 (burst 는 토큰 버킷에서만 의미 있음)
+        if self.concurrency and running >= self.concurrency:
+            return False
+        if self.posts_per_minute and tokens < 1:
+            return False
+        return True
+
+
+def domain_policy(domain: str) -> DomainPolicy:
+    override = JOB_DOMAIN_POLICIES.get(domain, {})
+    return DomainPolicy(
+        concurrency=int(override.get("concurrency", JOB_DOMAIN_MAX_CONCURRENCY)),
+        posts_per_minute=float(override.get("postsPerMinute", JOB_DOMAIN_POSTS_PER_MINUTE)),
+        burst=max(0.0, float(override.get("burst", JOB_DOMAIN_BURST))),
+        weight=max(0.01, float(override.get("weight", 1.0))),
+    )
+
+
+def normalize_domain(site: str | None) -> str:
+    """
+    "https://example.com" 또는 "example.com" → "example.com"
+    """
+    site = (site or "").strip().lower()
+    if not site:
+        return UNKNOWN_DOMAIN
+    host = urlparse(site if "://" in site else f"//{site}").hostname
+    return host or UNKNOWN_DOMAIN
+
+
+def job_domain(payload: Dict[str, Any]) -> str:
+    return normalize_domain((payload.get("board") or {}).get("siteDomain"))
+
+
+def session_key(domain: str, user_name: str) -> str:
+    return f"{normalize_domain(domain)}|{user_name}"
+
+
+def job_session(payload: Dict[str, Any]) -> str | None:
+    """
+    로그인이 필요한 작업이면 세션 키, 아니면 None
+    """
+    account = payload.get("account") or {}
+    if not account.get("loginRequired") or not account.get("userName"):
+        return None
+    return session_key(job_domain(payload), account["userName"])
+
+
+def job_site_type(payload: Dict[str, Any]) -> str:
+    board = payload.get("board") or {}
+    return board.get("siteType") or payload.get("siteType") or UNKNOWN_SITE_TYPE
+
+
+@dataclass
+class ReapSummary:
+    requeued: list[str] = field(default_factory=list)        # 큐에 되돌린 jobId
+    failed: list[str] = field(default_factory=list)          # 재시도 횟수 초과로 FAILED 처리한 jobId
+    offline_devices: list[str] = field(default_factory=list)  # OFFLINE 으로 표시한 deviceId
+
+
+def new_job(req) -> Job:
+    # payload 는 어느 저장소에든 그대로 저장할 수 있게 JSON 호환 값으로
+    payload = req.model_dump(mode="json")
+    return Job(
+        jobId=f"job-{uuid.uuid4().hex[:8]}",
+        jobType=req.jobType,
+        payload=payload,
+        domain=job_domain(payload),
+        priority=payload.get("priority") or 0,
+        site_type=job_site_type(payload),
+        session=job_session(payload),
+    )
+
+
+class Store(ABC):
+    """
+    백링크 작업 큐 + 디바이스 상태 저장소 인터페이스.
+
+    - enqueue_job      : 작업 등록 → jobId
+    - assign_job_if_any: 디바이스에 할당됐는데 디바이스가 실행 중이라고 보고하지 않은 작업이 있으면 그 작업을 다시,
+                         아니면 빈 슬롯이 있을 때 큐에서 디바이스가 처리할 수 있는 작업 하나를 claim
+                         (아래 도메인 스케줄링 / 디바이스 조건 참고)
+    - complete_job     : 결과 기록 (이미 끝난 작업이면 그대로 True, 없는 작업이면 False)
+    - update_device    : heartbeat 로 디바이스 상태/능력/마지막 접속 시각 갱신 + 실행 중이라고 보고한 작업 lease 연장
+    - reap_expired     : lease 가 끝난 작업을 큐에 되돌리고, heartbeat 가 끊긴 디바이스를 OFFLINE 처리
+    - wait_for_job     : 큐가 비어 있으면 새 작업이 들어올 때까지 최대 timeout 초 기다렸다가 할당
+    - queue_status     : 대기 중인 작업 id / 최근 작업 / 디바이스 조회
+    저장소마다 같은 작업이 두 디바이스에 동시에 할당되지 않도록 claim 을 원자적으로 처리한다.
+    reaper 는 만료 시각 순으로 정렬된 구조(heap / sorted set / 인덱스)에서 만료된 것만 꺼내고
+    전체 작업/디바이스를 훑지 않는다.
+
+    도메인 스케줄링 (모든 저장소 공통):
+    - 작업은 도메인별 큐에 들어가고, 도메인 큐 안에서는 priority 높은 순 → 먼저 들어온 순
+    - 도메인마다 pass 값을 두고 대기 작업이 있는 도메인 중 pass 가 가장 작은 도메인부터 할당,
+      할당할 때마다 pass += 1 / weight (stride scheduling → 가중치 비율대로 돌아가며 할당)
+    - 동시 실행 수 / 토큰 버킷이 한도에 걸린 도메인은 건너뛰고 다음 도메인에서 할당
+      → 한 캠페인이 수천 개를 넣어도 다른 도메인 작업이 계속 나가고, 한 사이트에 걸리는 부하는 제한됨
+    - 쉬다가 다시 작업이 들어온 도메인은 pass 를 현재 대기 도메인들의 최솟값까지 올려서
+      밀린 몫을 한꺼번에 가져가지 않게 한다
+
+    디바이스 조건:
+    - 디바이스가 처리할 수 없는 siteType 의 작업은 건너뜀 (도메인 큐 앞 JOB_MATCH_SCAN_LIMIT 개 안에서 찾음)
+    - 디바이스가 세션을 가진 도메인들을 먼저 보고, 그 세션("도메인|계정")의 작업이 있으면 pass 순서보다 우선
+      (도메인 동시 실행 수 / 토큰 버킷 한도는 그대로 지킴) → 로그인 횟수 감소
+
+    실행 중인 작업 보고 (running_job_ids):
+    - heartbeat 가 보고한 작업만 lease 를 연장하고, 할당됐는데 보고되지 않은 작업(RUN 응답 유실 등)은
+      다음 할당 때 다시 보낸다 (다시 보낼 때 lease 도 새로 시작). 끝내 가져가지 않으면 reaper 가 큐에 되돌림
+    - None (보고하지 않는 이전 디바이스): 할당된 작업을 모두 실행 중으로 보고 lease 연장,
+      슬롯이 다 차 있으면 그중 하나를 다시 보낸다
+    """
+
+    def __init__(self):
+        # 새 작업 알림. 알릴 때마다 set 후 새 Event 로 교체 →
+        # 대기자는 할당 시도 전에 현재 Event 를 잡아 두므로 그 사이의 알림도 놓치지 않는다.
+        self._work_event = asyncio.Event()
+
+    def _notify_work(self) -> None:
+        """
+        이 프로세스에서 기다리는 heartbeat 들을 깨움 (enqueue / 작업 되돌림 / 도메인 슬롯 반환 시 호출)
+        """
+        event, self._work_event = self._work_event, asyncio.Event()
+        event.set()
+
+    async def _start_work_listener(self) -> None:
+        """
+        다른 워커의 작업 등록 알림을 받아 _notify_work 를 호출하는 리스너 시작 (저장소별로 구현)
+        """
+
+    async def wait_for_job(
+        self,
+        device_id: str,
+        timeout: float,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ) -> Job | None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(timeout, JOB_WAIT_MAX_SECONDS)
+        await self._start_work_listener()
+
+        while True:
+            event = self._work_event
+            job = await self.assign_job_if_any(device_id, capabilities, running_job_ids)
+            remaining = deadline - loop.time()
+            if job is not None or remaining <= 0:
+                return job
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, JOB_WAIT_RECHECK_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self) -> None:
+        """
+        앱 종료 시 리스너 등 정리
+        """
+
+    @abstractmethod
+    async def enqueue_job(self, req) -> str:
+        ...
+
+    @abstractmethod
+    async def assign_job_if_any(
+        self,
+        device_id: str,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ) -> Job | None:
+        ...
+
+    @abstractmethod
+    async def update_device(
+        self,
+        device_id: str,
+        state: str | None,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ) -> None:
+        ...
+
+    @abstractmethod
+    async def complete_job(self, report) -> bool:
+        ...
+
+    @abstractmethod
+    async def reap_expired(self, batch_size: int = JOB_REAP_BATCH_SIZE) -> ReapSummary:
+        ...
+
+    @abstractmethod
+    async def queue_status(self, limit: int = QUEUE_STATUS_JOB_LIMIT) -> dict:
+        ...
+
+
+def job_to_dict(job: Job) -> dict:
+    return asdict(job)
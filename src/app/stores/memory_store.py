@@ -0,0 +1,304 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, Iterable
+from dataclasses import dataclass, field
+
+from .base import (
+    DEFAULT_CAPABILITIES,
+    DeviceCapabilities,
+    Job,
+    ReapSummary,
+    Store,
+    DEVICE_OFFLINE,
+    DEVICE_OFFLINE_SECONDS,
+    JOB_FAILED,
+    JOB_LEASE_EXPIRED_ERROR,
+    JOB_LEASE_SECONDS,
+    JOB_MATCH_SCAN_LIMIT,
+    JOB_MAX_LEASE_EXPIRIES,
+    JOB_QUEUED,
+    JOB_REAP_BATCH_SIZE,
+    JOB_RUNNING,
+    JOB_FINISHED_STATUSES,
+    QUEUE_STATUS_JOB_LIMIT,
+    domain_policy,
+    job_to_dict,
+    new_job,
+)
+
+
+@dataclass
+class _DomainQueue:
+    # (-priority, 등록 순번, jobId) heap → priority 높은 순, 먼저 들어온 순
+    jobs: list[tuple[int, int, str]] = field(default_factory=list)
+    pass_: float = 0.0
+    running: int = 0
+    tokens: float | None = None
+    tokens_at: float = 0.0
+
+
+class MemoryStore(Store):
+    """
+    프로세스 메모리 저장소 (dict + 도메인별 heap + asyncio.Lock).
+    재시작하면 큐가 사라지고 워커마다 큐가 따로라서 개발/테스트용으로만 사용.
+
+    lease / 디바이스 만료 시각은 min-heap 에 (만료 시각, id) 로 넣어 두고,
+    연장되면 새 항목을 넣기만 한다 (꺼낼 때 현재 값과 다르면 버림).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.jobs: Dict[str, Job] = {}
+        self.domains: Dict[str, _DomainQueue] = {}
+        self._job_order: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self.devices: Dict[str, dict] = {}
+        self._lease_heap: list[tuple[float, str]] = []
+        self._device_heap: list[tuple[float, str]] = []
+        self._lock = asyncio.Lock()
+
+    def _extend_lease(self, job: Job, now: float) -> None:
+        job.lease_deadline = now + JOB_LEASE_SECONDS
+        heapq.heappush(self._lease_heap, (job.lease_deadline, job.jobId))
+
+    def _push_queued(self, job: Job) -> None:
+        dq = self.domains.get(job.domain)
+        if dq is None:
+            dq = self.domains[job.domain] = _DomainQueue()
+        if not dq.jobs:
+            # 다시 대기 작업이 생긴 도메인 → 현재 대기 도메인들의 최소 pass 까지 올림
+            active = [other.pass_ for other in self.domains.values() if other.jobs]
+            if active:
+                dq.pass_ = max(dq.pass_, min(active))
+        order = self._job_order.setdefault(job.jobId, next(self._seq))
+        heapq.heappush(dq.jobs, (-job.priority, order, job.jobId))
+
+    def _pop_queued(self, dq: _DomainQueue, match) -> Job | None:
+        """
+        도메인 큐 앞 JOB_MATCH_SCAN_LIMIT 개 중 match(job) 를 만족하는 첫 작업을 꺼냄
+        """
+        if not dq.jobs:
+            return None
+        chosen = None
+        drop = set()
+        for entry in heapq.nsmallest(JOB_MATCH_SCAN_LIMIT, dq.jobs):
+            job = self.jobs.get(entry[2])
+            # 되돌려진 뒤 결과가 먼저 들어온 작업 등은 버림
+            if not job or job.status != JOB_QUEUED:
+                drop.add(entry)
+            elif match(job):
+                chosen = job
+                drop.add(entry)
+                break
+        if drop:
+            dq.jobs = [entry for entry in dq.jobs if entry not in drop]
+            heapq.heapify(dq.jobs)
+        return chosen
+
+    def _running_jobs(self, device_id: str) -> list[str]:
+        dev = self.devices.get(device_id, {})
+        running = [
+            jid for jid in dev.get("running_jobs", [])
+            if (job := self.jobs.get(jid)) and job.status == JOB_RUNNING and job.assigned_device == device_id
+        ]
+        if device_id in self.devices:
+            dev["running_jobs"] = running
+        return running
+
+    def _release_slot(self, job: Job) -> None:
+        dq = self.domains.get(job.domain)
+        if dq is not None:
+            dq.running = max(0, dq.running - 1)
+
+    async def enqueue_job(self, req):
+        job = new_job(req)
+        async with self._lock:
+            self.jobs[job.jobId] = job
+            self._push_queued(job)
+        self._notify_work()
+        return job.jobId
+
+    def _claim_from(self, names, match, device_id: str, now: float) -> Job | None:
+        candidates = sorted((self.domains[name].pass_, name) for name in names if self.domains[name].jobs)
+        for _, name in candidates:
+            dq = self.domains[name]
+            policy = domain_policy(name)
+            tokens = policy.refill(dq.tokens, now - dq.tokens_at)
+            if not policy.allows(dq.running, tokens):
+                continue
+            job = self._pop_queued(dq, match)
+            if job is None:
+                continue
+
+            dq.tokens = policy.consume(tokens)
+            dq.tokens_at = now
+            dq.running += 1
+            dq.pass_ += 1 / policy.weight
+
+            job.status = JOB_RUNNING
+            job.assigned_device = device_id
+            self._extend_lease(job, now)
+            dev = self.devices.setdefault(device_id, {})
+            dev.setdefault("running_jobs", []).append(job.jobId)
+            dev["state"] = "BUSY"
+            return job
+        return None
+
+    async def assign_job_if_any(
+        self,
+        device_id: str,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ):
+        async with self._lock:
+            now = time.time()
+            running = self._running_jobs(device_id)
+            if running_job_ids is not None:
+                # 할당됐는데 디바이스가 모르는 작업 (RUN 응답 유실 등) → 다시 보냄
+                reported = set(running_job_ids)
+                lost = [jid for jid in running if jid not in reported]
+                if lost:
+                    job = self.jobs[lost[0]]
+                    self._extend_lease(job, now)
+                    return job
+            elif len(running) >= capabilities.slots:
+                return self.jobs[running[0]]
+            if len(running) >= capabilities.slots:
+                return None
+
+            # 1) 디바이스가 세션을 가진 도메인에서 그 세션의 작업
+            if capabilities.sessions:
+                names = capabilities.session_domains() & self.domains.keys()
+                job = self._claim_from(
+                    names,
+                    lambda j: j.session in capabilities.sessions and capabilities.supports(j.site_type),
+                    device_id,
+                    now,
+                )
+                if job:
+                    return job
+            # 2) pass 순서대로 처리할 수 있는 작업
+            return self._claim_from(
+                list(self.domains),
+                lambda j: capabilities.supports(j.site_type),
+                device_id,
+                now,
+            )
+
+    async def update_device(
+        self,
+        device_id: str,
+        state: str | None,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ):
+        now = time.time()
+        reported = set(running_job_ids) if running_job_ids is not None else None
+        async with self._lock:
+            d = self.devices.setdefault(device_id, {})
+            d["state"] = state
+            d["last_seen"] = now
+            d["capabilities"] = capabilities.to_dict()
+            heapq.heappush(self._device_heap, (now + DEVICE_OFFLINE_SECONDS, device_id))
+
+            # 이 디바이스가 실행 중이라고 보고한 작업들 lease 연장
+            for jid in self._running_jobs(device_id):
+                if reported is None or jid in reported:
+                    self._extend_lease(self.jobs[jid], now)
+
+    async def complete_job(self, report):
+        async with self._lock:
+            job = self.jobs.get(report.jobId)
+            if not job:
+                return False
+            if job.status in JOB_FINISHED_STATUSES:
+                return True
+
+            if job.status == JOB_RUNNING:
+                self._release_slot(job)
+            job.status = report.status
+            job.results = [r.model_dump(mode="json") for r in report.results]
+            job.error = report.error
+            job.lease_deadline = None
+
+            if job.assigned_device:
+                dev = self.devices.get(job.assigned_device, {})
+                running = [jid for jid in dev.get("running_jobs", []) if jid != job.jobId]
+                dev["running_jobs"] = running
+                dev["state"] = "BUSY" if running else "IDLE"
+        # 도메인 동시 실행 슬롯이 비었으므로 기다리는 디바이스 깨움
+        self._notify_work()
+        return True
+
+    async def reap_expired(self, batch_size: int = JOB_REAP_BATCH_SIZE):
+        now = time.time()
+        summary = ReapSummary()
+        async with self._lock:
+            reaped = 0
+            while self._lease_heap and self._lease_heap[0][0] <= now and reaped < batch_size:
+                deadline, jid = heapq.heappop(self._lease_heap)
+                job = self.jobs.get(jid)
+                # 연장됐거나 이미 끝난 작업의 이전 항목
+                if not job or job.status != JOB_RUNNING or job.lease_deadline != deadline:
+                    continue
+                reaped += 1
+
+                dev = self.devices.get(job.assigned_device or "", {})
+                if jid in dev.get("running_jobs", []):
+                    dev["running_jobs"].remove(jid)
+
+                self._release_slot(job)
+                job.attempts += 1
+                job.lease_deadline = None
+                job.assigned_device = None
+                if job.attempts >= JOB_MAX_LEASE_EXPIRIES:
+                    job.status = JOB_FAILED
+                    job.error = JOB_LEASE_EXPIRED_ERROR
+                    summary.failed.append(jid)
+                else:
+                    # 원래 순번 그대로 넣으므로 도메인 큐 앞쪽으로 들어감
+                    job.status = JOB_QUEUED
+                    self._push_queued(job)
+                    summary.requeued.append(jid)
+
+            reaped = 0
+            while self._device_heap and self._device_heap[0][0] <= now and reaped < batch_size:
+                deadline, device_id = heapq.heappop(self._device_heap)
+                dev = self.devices.get(device_id)
+                if not dev or dev.get("state") == DEVICE_OFFLINE:
+                    continue
+                if dev.get("last_seen", 0) + DEVICE_OFFLINE_SECONDS != deadline:
+                    continue
+                reaped += 1
+                dev["state"] = DEVICE_OFFLINE
+                summary.offline_devices.append(device_id)
+        if summary.requeued:
+            self._notify_work()
+        return summary
+
+    async def queue_status(self, limit: int = QUEUE_STATUS_JOB_LIMIT):
+        now = time.time()
+        async with self._lock:
+            queue = []
+            domains = {}
+            for name, dq in sorted(self.domains.items(), key=lambda item: item[1].pass_):
+                queued = [jid for _, _, jid in sorted(dq.jobs) if self.jobs[jid].status == JOB_QUEUED]
+                queue.extend(queued)
+                domains[name] = {
+                    "queued": len(queued),
+                    "running": dq.running,
+                    "pass": dq.pass_,
+                    "tokens": domain_policy(name).refill(dq.tokens, now - dq.tokens_at),
+                }
+            recent = list(self.jobs.values())[-limit:]
+            return {
+                "queue": queue,
+                "domains": domains,
+                "jobs": {job.jobId: job_to_dict(job) for job in recent},
+                "devices": {
+                    k: {**v, "running_jobs": list(v.get("running_jobs", []))}
+                    for k, v in self.devices.items()
+                },
+            }
@@ -0,0 +1,450 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import select, update, or_, case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.models.backlink import BacklinkJob, BacklinkDevice, BacklinkDomain
+from .base import (
+    DEFAULT_CAPABILITIES,
+    DeviceCapabilities,
+    Job,
+    ReapSummary,
+    Store,
+    DEVICE_OFFLINE,
+    DEVICE_OFFLINE_SECONDS,
+    JOB_FAILED,
+    JOB_LEASE_EXPIRED_ERROR,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_LEASE_EXPIRIES,
+    JOB_QUEUED,
+    JOB_REAP_BATCH_SIZE,
+    JOB_RUNNING,
+    JOB_FINISHED_STATUSES,
+    QUEUE_STATUS_JOB_LIMIT,
+    domain_policy,
+    job_to_dict,
+    new_job,
+)
+
+
+def _row_to_job(row: BacklinkJob) -> Job:
+    return Job(
+        jobId=row.job_id,
+        jobType=row.job_type,
+        payload=row.payload,
+        status=row.status,
+        assigned_device=row.assigned_device,
+        results=row.results,
+        error=row.error,
+        lease_deadline=_epoch_seconds(row.lease_deadline),
+        attempts=row.attempts or 0,
+        domain=row.domain,
+        priority=row.priority or 0,
+        site_type=row.site_type,
+        session=row.session_key,
+    )
+
+
+def _epoch_seconds(value: datetime | None) -> float | None:
+    # last_seen 은 UTC naive datetime 으로 저장 → 다른 저장소와 같은 epoch 초로 변환
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _upsert_device(db: Session, device_id: str, **values) -> None:
+    stmt = pg_insert(BacklinkDevice).values(id=device_id, **values)
+    stmt = stmt.on_conflict_do_update(index_elements=[BacklinkDevice.id], set_=values)
+    db.execute(stmt)
+
+
+def _add_queued(db: Session, domain: str, count: int = 1) -> None:
+    """
+    도메인 대기 작업 수 +count.
+    대기 작업이 없던 도메인이면 pass 를 현재 대기 도메인들의 최솟값까지 올린다 (밀린 몫 몰아받기 방지).
+    """
+    active_min = (
+        select(func.min(BacklinkDomain.pass_))
+        .where(BacklinkDomain.queued > 0)
+        .scalar_subquery()
+    )
+    stmt = pg_insert(BacklinkDomain).values(
+        domain=domain,
+        queued=count,
+        running=0,
+        pass_=func.coalesce(active_min, 0),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BacklinkDomain.domain],
+        set_={
+            BacklinkDomain.queued: BacklinkDomain.queued + count,
+            BacklinkDomain.pass_: case(
+                (
+                    BacklinkDomain.queued == 0,
+                    func.greatest(BacklinkDomain.pass_, func.coalesce(active_min, BacklinkDomain.pass_)),
+                ),
+                else_=BacklinkDomain.pass_,
+            ),
+        },
+    )
+    db.execute(stmt)
+
+
+def _release_slot(db: Session, domain: str, count: int = 1) -> None:
+    db.execute(
+        update(BacklinkDomain)
+        .where(BacklinkDomain.domain == domain)
+        .values(running=func.greatest(BacklinkDomain.running - count, 0))
+    )
+
+
+class PostgresStore(Store):
+    """
+    Postgres 작업 큐 (backlink_jobs / backlink_devices 테이블).
+    QUEUED 작업은 SELECT ... FOR UPDATE SKIP LOCKED 로 claim 해서
+    여러 워커가 동시에 할당해도 서로 기다리거나 같은 작업을 가져가지 않는다.
+    도메인 스케줄링 상태는 backlink_domains 행에 두고, 할당할 때 후보 도메인 행을 잠가서 갱신한다.
+    할당은 도메인/작업 행을 SKIP LOCKED 로만 잠가서 (잠긴 도메인은 이번에 건너뜀) 기다리지 않고,
+    건너뛴 도메인의 잠금은 savepoint 를 되돌려 바로 푼다.
+    (잠금 순서: 디바이스 → 도메인/작업(SKIP LOCKED), 결과는 작업 → 디바이스 → 도메인,
+     reaper 는 작업(SKIP LOCKED) → 도메인 이름 순)
+    디바이스가 실행 중인 작업은 backlink_jobs.assigned_device 로 조회한다.
+    DB 호출은 동기 세션이라 threadpool 에서 실행한다.
+    long-poll 대기는 같은 워커의 작업 등록에만 바로 깨고,
+    다른 워커에서 들어온 작업은 JOB_WAIT_RECHECK_SECONDS 마다 다시 확인해서 가져간다.
+    """
+
+    def __init__(self, session_factory: sessionmaker):
+        super().__init__()
+        self.session_factory = session_factory
+
+    async def enqueue_job(self, req):
+        job = new_job(req)
+        await run_in_threadpool(self._enqueue_job_sync, job)
+        self._notify_work()
+        return job.jobId
+
+    def _enqueue_job_sync(self, job: Job) -> None:
+        with self.session_factory() as db:
+            db.add(BacklinkJob(
+                job_id=job.jobId,
+                job_type=job.jobType,
+                payload=job.payload,
+                status=job.status,
+                domain=job.domain,
+                priority=job.priority,
+                site_type=job.site_type,
+                session_key=job.session,
+            ))
+            _add_queued(db, job.domain)
+            db.commit()
+
+    async def assign_job_if_any(
+        self,
+        device_id: str,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ):
+        reported = set(running_job_ids) if running_job_ids is not None else None
+        return await run_in_threadpool(self._assign_job_if_any_sync, device_id, capabilities, reported)
+
+    def _assign_job_if_any_sync(
+        self,
+        device_id: str,
+        capabilities: DeviceCapabilities,
+        reported: set[str] | None,
+    ) -> Job | None:
+        with self.session_factory() as db:
+            # 같은 디바이스의 heartbeat 가 동시에 들어와도 슬롯보다 많이 가져가지 않도록 디바이스 행부터 잠금
+            db.get(BacklinkDevice, device_id, with_for_update=True)
+            running = db.scalars(
+                select(BacklinkJob)
+                .where(BacklinkJob.assigned_device == device_id, BacklinkJob.status == JOB_RUNNING)
+                .order_by(BacklinkJob.id)
+            ).all()
+            now = datetime.utcnow()
+            if reported is not None:
+                # 할당됐는데 디바이스가 모르는 작업 (RUN 응답 유실 등) → lease 를 새로 시작해서 다시 보냄
+                lost = [row for row in running if row.job_id not in reported]
+                if lost:
+                    lost[0].lease_deadline = now + timedelta(seconds=JOB_LEASE_SECONDS)
+                    job = _row_to_job(lost[0])
+                    db.commit()
+                    return job
+            elif len(running) >= capabilities.slots:
+                job = _row_to_job(running[0])
+                db.commit()
+                return job
+            if len(running) >= capabilities.slots:
+                db.commit()
+                return None
+
+            job_filters = []
+            if capabilities.site_types is not None:
+                job_filters.append(BacklinkJob.site_type.in_(capabilities.site_types))
+
+            job = None
+            # 1) 디바이스가 세션을 가진 도메인에서 그 세션의 작업
+            if capabilities.sessions:
+                job = self._claim_sync(
+                    db,
+                    device_id,
+                    now,
+                    [BacklinkDomain.domain.in_(sorted(capabilities.session_domains()))],
+                    job_filters + [BacklinkJob.session_key.in_(capabilities.sessions)],
+                )
+            # 2) pass 순서대로 처리할 수 있는 작업
+            if job is None:
+                job = self._claim_sync(db, device_id, now, [], job_filters)
+            db.commit()
+            return job
+
+    def _claim_sync(self, db: Session, device_id: str, now: datetime, domain_filters, job_filters) -> Job | None:
+        candidates = db.scalars(
+            select(BacklinkDomain.domain)
+            .where(BacklinkDomain.queued > 0, *domain_filters)
+            .order_by(BacklinkDomain.pass_, BacklinkDomain.domain)
+        ).all()
+        for name in candidates:
+            # 건너뛰면 이 savepoint 를 되돌려서 도메인 행 잠금을 바로 풂
+            savepoint = db.begin_nested()
+            # 도메인 행을 잠근 뒤 최신 값으로 한도 확인 (다른 트랜잭션이 잡고 있으면 기다리지 않고 건너뜀)
+            domain = db.scalar(
+                select(BacklinkDomain)
+                .where(BacklinkDomain.domain == name)
+                .with_for_update(skip_locked=True)
+            )
+            if domain is None or domain.queued <= 0:
+                savepoint.rollback()
+                continue
+            policy = domain_policy(name)
+            elapsed = (now - domain.tokens_at).total_seconds() if domain.tokens_at else 0
+            tokens = policy.refill(domain.tokens, elapsed)
+            if not policy.allows(domain.running, tokens):
+                savepoint.rollback()
+                continue
+
+            row = db.scalar(
+                select(BacklinkJob)
+                .where(BacklinkJob.domain == name, BacklinkJob.status == JOB_QUEUED, *job_filters)
+                .order_by(BacklinkJob.priority.desc(), BacklinkJob.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            if row is None:
+                savepoint.rollback()
+                continue
+
+            domain.queued -= 1
+            domain.running += 1
+            domain.tokens = policy.consume(tokens)
+            domain.tokens_at = now
+            domain.pass_ += 1 / policy.weight
+
+            row.status = JOB_RUNNING
+            row.assigned_device = device_id
+            row.lease_deadline = now + timedelta(seconds=JOB_LEASE_SECONDS)
+            _upsert_device(db, device_id, state="BUSY")
+            job = _row_to_job(row)
+            savepoint.commit()
+            return job
+        return None
+
+    async def update_device(
+        self,
+        device_id: str,
+        state: str | None,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ):
+        reported = list(running_job_ids) if running_job_ids is not None else None
+        await run_in_threadpool(self._update_device_sync, device_id, state, capabilities, reported)
+
+    def _update_device_sync(
+        self,
+        device_id: str,
+        state: str | None,
+        capabilities: DeviceCapabilities,
+        reported: list[str] | None,
+    ) -> None:
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            _upsert_device(db, device_id, state=state, last_seen=now, capabilities=capabilities.to_dict())
+
+            # 이 디바이스가 실행 중이라고 보고한 작업들 lease 연장 (보고가 없으면 할당된 작업 전부)
+            filters = [
+                BacklinkJob.assigned_device == device_id,
+                BacklinkJob.status == JOB_RUNNING,
+            ]
+            if reported is not None:
+                filters.append(BacklinkJob.job_id.in_(reported))
+            db.execute(
+                update(BacklinkJob)
+                .where(*filters)
+                .values(lease_deadline=now + timedelta(seconds=JOB_LEASE_SECONDS))
+            )
+            db.commit()
+
+    async def complete_job(self, report):
+        return await run_in_threadpool(self._complete_job_sync, report)
+
+    def _complete_job_sync(self, report) -> bool:
+        with self.session_factory() as db:
+            row = db.scalar(
+                select(BacklinkJob)
+                .where(BacklinkJob.job_id == report.jobId)
+                .with_for_update()
+            )
+            if row is None:
+                return False
+            if row.status in JOB_FINISHED_STATUSES:
+                db.commit()
+                return True
+
+            previous_status = row.status
+            row.status = report.status
+            row.results = [r.model_dump(mode="json") for r in report.results]
+            row.error = report.error
+            row.lease_deadline = None
+
+            if row.assigned_device:
+                device = db.get(BacklinkDevice, row.assigned_device, with_for_update=True)
+                if device:
+                    still_running = db.scalar(
+                        select(func.count())
+                        .select_from(BacklinkJob)
+                        .where(
+                            BacklinkJob.assigned_device == row.assigned_device,
+                            BacklinkJob.status == JOB_RUNNING,
+                            BacklinkJob.job_id != row.job_id,
+                        )
+                    )
+                    device.state = "BUSY" if still_running else "IDLE"
+
+            if previous_status == JOB_RUNNING:
+                _release_slot(db, row.domain)
+            elif previous_status == JOB_QUEUED:
+                # lease 만료로 되돌려진 뒤 원래 디바이스가 결과를 보낸 경우
+                db.execute(
+                    update(BacklinkDomain)
+                    .where(BacklinkDomain.domain == row.domain)
+                    .values(queued=func.greatest(BacklinkDomain.queued - 1, 0))
+                )
+            db.commit()
+        # 도메인 동시 실행 슬롯이 비었으므로 기다리는 디바이스 깨움
+        self._notify_work()
+        return True
+
+    async def reap_expired(self, batch_size: int = JOB_REAP_BATCH_SIZE):
+        summary = await run_in_threadpool(self._reap_expired_sync, batch_size)
+        if summary.requeued:
+            self._notify_work()
+        return summary
+
+    def _reap_expired_sync(self, batch_size: int) -> ReapSummary:
+        now = datetime.utcnow()
+        summary = ReapSummary()
+        with self.session_factory() as db:
+            # lease_deadline 인덱스 순으로 만료된 것만 (다른 워커의 reaper 가 잡은 행은 건너뜀)
+            expired = db.scalars(
+                select(BacklinkJob)
+                .where(BacklinkJob.status == JOB_RUNNING, BacklinkJob.lease_deadline <= now)
+                .order_by(BacklinkJob.lease_deadline)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            released = Counter()
+            requeued = Counter()
+            for row in expired:
+                released[row.domain] += 1
+
+                row.attempts = (row.attempts or 0) + 1
+                row.lease_deadline = None
+                row.assigned_device = None
+                if row.attempts >= JOB_MAX_LEASE_EXPIRIES:
+                    row.status = JOB_FAILED
+                    row.error = JOB_LEASE_EXPIRED_ERROR
+                    summary.failed.append(row.job_id)
+                else:
+                    # priority / id 는 그대로라서 도메인 안에서 다음 할당 때 먼저 나간다
+                    row.status = JOB_QUEUED
+                    requeued[row.domain] += 1
+                    summary.requeued.append(row.job_id)
+
+            # 도메인 행은 이름 순으로 한 번씩만 갱신 (다른 reaper 와 잠금 순서가 엇갈리지 않게)
+            for name in sorted(released):
+                _release_slot(db, name, released[name])
+                if requeued[name]:
+                    _add_queued(db, name, requeued[name])
+
+            offline = db.scalars(
+                select(BacklinkDevice)
+                .where(
+                    or_(BacklinkDevice.state.is_(None), BacklinkDevice.state != DEVICE_OFFLINE),
+                    BacklinkDevice.last_seen <= now - timedelta(seconds=DEVICE_OFFLINE_SECONDS),
+                )
+                .order_by(BacklinkDevice.last_seen)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            for device in offline:
+                device.state = DEVICE_OFFLINE
+                summary.offline_devices.append(device.id)
+
+            db.commit()
+        return summary
+
+    async def queue_status(self, limit: int = QUEUE_STATUS_JOB_LIMIT):
+        return await run_in_threadpool(self._queue_status_sync, limit)
+
+    def _queue_status_sync(self, limit: int) -> dict:
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            # 도메인 pass 순 → 도메인 안에서 할당 순
+            queue = db.scalars(
+                select(BacklinkJob.job_id)
+                .join(BacklinkDomain, BacklinkDomain.domain == BacklinkJob.domain)
+                .where(BacklinkJob.status == JOB_QUEUED)
+                .order_by(BacklinkDomain.pass_, BacklinkJob.domain, BacklinkJob.priority.desc(), BacklinkJob.id)
+            ).all()
+
+            domains = {
+                row.domain: {
+                    "queued": row.queued,
+                    "running": row.running,
+                    "pass": row.pass_,
+                    "tokens": domain_policy(row.domain).refill(
+                        row.tokens,
+                        (now - row.tokens_at).total_seconds() if row.tokens_at else 0,
+                    ),
+                }
+                for row in db.scalars(select(BacklinkDomain).order_by(BacklinkDomain.pass_))
+            }
+
+            recent = db.scalars(
+                select(BacklinkJob).order_by(BacklinkJob.id.desc()).limit(limit)
+            ).all()
+            jobs = {row.job_id: job_to_dict(_row_to_job(row)) for row in reversed(recent)}
+
+            running_jobs = {}
+            for device_id, job_id in db.execute(
+                select(BacklinkJob.assigned_device, BacklinkJob.job_id)
+                .where(BacklinkJob.status == JOB_RUNNING, BacklinkJob.assigned_device.is_not(None))
+                .order_by(BacklinkJob.id)
+            ):
+                running_jobs.setdefault(device_id, []).append(job_id)
+
+            devices = {
+                row.id: {
+                    "state": row.state,
+                    "running_jobs": running_jobs.get(row.id, []),
+                    "last_seen": _epoch_seconds(row.last_seen),
+                    "capabilities": row.capabilities,
+                }
+                for row in db.scalars(select(BacklinkDevice).order_by(BacklinkDevice.id))
+            }
+            return {"queue": list(queue), "domains": domains, "jobs": jobs, "devices": devices}
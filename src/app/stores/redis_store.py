@@ -0,0 +1,710 @@
+import asyncio
+import json
+import os
+import time
+from typing import Iterable
+
+from redis.asyncio import Redis
+from redis.asyncio.client import PubSub
+
+from .base import (
+    DEFAULT_CAPABILITIES,
+    DeviceCapabilities,
+    Job,
+    ReapSummary,
+    Store,
+    DEVICE_OFFLINE_SECONDS,
+    JOB_DOMAIN_BURST,
+    JOB_DOMAIN_MAX_CONCURRENCY,
+    JOB_DOMAIN_POLICIES,
+    JOB_DOMAIN_POSTS_PER_MINUTE,
+    JOB_LEASE_EXPIRED_ERROR,
+    JOB_LEASE_SECONDS,
+    JOB_MATCH_SCAN_LIMIT,
+    JOB_MAX_LEASE_EXPIRIES,
+    JOB_QUEUED,
+    JOB_REAP_BATCH_SIZE,
+    QUEUE_STATUS_JOB_LIMIT,
+    UNKNOWN_DOMAIN,
+    UNKNOWN_SITE_TYPE,
+    domain_policy,
+    job_to_dict,
+    new_job,
+)
+
+
+# 끝난 작업(SUCCESS/FAILED) 을 Redis 에 남겨두는 시간 (초)
+BACKLINK_JOB_RESULT_TTL_SECONDS = int(os.getenv("BACKLINK_JOB_RESULT_TTL_SECONDS", str(7 * 24 * 3600)))
+
+JOBS_KEY = "backlink:jobs"            # sorted set: jobId (score = 등록 시각 ms, queue/status 조회용)
+DEVICES_KEY = "backlink:devices"      # set: heartbeat 를 보낸 적 있는 deviceId
+LEASES_KEY = "backlink:leases"        # sorted set: RUNNING jobId (score = lease 만료 epoch ms)
+DEVICE_DEADLINES_KEY = "backlink:device_deadlines"  # sorted set: deviceId (score = OFFLINE 처리 시각 epoch ms)
+DOMAINS_KEY = "backlink:domains"      # sorted set: 대기 작업이 있는 도메인 (score = pass)
+DOMAIN_NAMES_KEY = "backlink:domain_names"  # set: 작업이 들어온 적 있는 도메인 (queue/status 조회용)
+JOB_KEY_PREFIX = "backlink:job:"      # hash: 작업 1개
+DEVICE_KEY_PREFIX = "backlink:device:"  # hash: 디바이스 1개
+DEVICE_JOBS_SUFFIX = ":jobs"            # sorted set: 디바이스가 실행 중인 jobId (score = 할당 시각 ms)
+DOMAIN_KEY_PREFIX = "backlink:domain:"  # hash: 도메인 상태 (pass / running / tokens / tokens_at)
+DOMAIN_QUEUE_SUFFIX = ":queue"          # sorted set: 도메인 대기 jobId (score = 큐 순서)
+
+# 작업이 큐에 들어오면(등록/되돌림) 또는 도메인 슬롯이 비면 publish → 모든 워커의 long-poll heartbeat 를 깨움
+JOB_EVENTS_CHANNEL = "backlink:queue:events"
+
+# 도메인 큐 순서 점수 = -priority * 1e13 + 등록 시각 ms (priority 높은 순 → 먼저 들어온 순)
+# Lua 에서도 같은 식으로 계산한다.
+_PRIORITY_SCORE_STEP = 10 ** 13
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{job_id}"
+
+
+def _device_key(device_id: str) -> str:
+    return f"{DEVICE_KEY_PREFIX}{device_id}"
+
+
+def _device_jobs_key(device_id: str) -> str:
+    return f"{DEVICE_KEY_PREFIX}{device_id}{DEVICE_JOBS_SUFFIX}"
+
+
+def _domain_key(domain: str) -> str:
+    return f"{DOMAIN_KEY_PREFIX}{domain}"
+
+
+def _domain_queue_key(domain: str) -> str:
+    return f"{DOMAIN_KEY_PREFIX}{domain}{DOMAIN_QUEUE_SUFFIX}"
+
+
+def _queue_score(priority: int, created_ms: int) -> int:
+    return -priority * _PRIORITY_SCORE_STEP + created_ms
+
+
+# 스크립트 공통 함수
+# - activate_domain: 도메인을 대기 도메인 목록에 넣음.
+#   쉬다가 다시 들어온 도메인은 pass 를 현재 대기 도메인의 최솟값까지 올림 (밀린 몫 몰아받기 방지)
+# - release_slot: 도메인 동시 실행 수 반환
+_DOMAIN_FUNCTIONS_LUA = """
+local function activate_domain(domains_key, domain_key, domain)
+    if redis.call('ZSCORE', domains_key, domain) then
+        return
+    end
+    local pass = tonumber(redis.call('HGET', domain_key, 'pass') or '0')
+    local head = redis.call('ZRANGE', domains_key, 0, 0, 'WITHSCORES')
+    if head[2] and tonumber(head[2]) > pass then
+        pass = tonumber(head[2])
+    end
+    redis.call('HSET', domain_key, 'pass', tostring(pass))
+    redis.call('ZADD', domains_key, pass, domain)
+end
+
+local function release_slot(domain_key)
+    if redis.call('HINCRBY', domain_key, 'running', -1) < 0 then
+        redis.call('HSET', domain_key, 'running', 0)
+    end
+end
+"""
+
+# 작업 등록.
+# KEYS: 작업 키, 작업 목록, 대기 도메인, 도메인 키, 도메인 큐, 도메인 목록
+# ARGV: jobId, jobType, payload, domain, priority, 등록 ms, 큐 순서 점수, 작업 알림 채널,
+#       siteType, 세션 키('' = 없음)
+_ENQUEUE_JOB_LUA = _DOMAIN_FUNCTIONS_LUA + """
+redis.call('HSET', KEYS[1],
+    'jobType', ARGV[2], 'payload', ARGV[3], 'status', 'QUEUED',
+    'domain', ARGV[4], 'priority', ARGV[5], 'created_at', ARGV[6],
+    'site_type', ARGV[9], 'session', ARGV[10])
+redis.call('ZADD', KEYS[2], ARGV[6], ARGV[1])
+redis.call('SADD', KEYS[6], ARGV[4])
+activate_domain(KEYS[3], KEYS[4], ARGV[4])
+redis.call('ZADD', KEYS[5], ARGV[7], ARGV[1])
+redis.call('PUBLISH', ARGV[8], ARGV[1])
+return 0
+"""
+
+# 디바이스에 작업 할당.
+# 디바이스에 할당됐는데 실행 중이라고 보고하지 않은 작업이 있으면 그 jobId (lease 새로 시작).
+# 보고 목록이 없으면('') 실행 중인 작업 수가 슬롯 수 이상일 때 그중 가장 먼저 할당된 jobId.
+# 아니면 대기 도메인을 pass 작은 순으로 보면서 동시 실행 수 / 토큰 버킷 한도 안인 도메인의
+# 큐 앞 scan 개 중 디바이스가 처리할 수 있는(siteType) 첫 작업을 claim 하고, 그 도메인의 pass 를 1 / weight 만큼 늘린다.
+# 그 전에 디바이스가 세션을 가진 도메인들에서 같은 세션의 작업을 먼저 찾는다.
+# 여러 워커가 동시에 호출해도 같은 작업이 두 번 나가지 않도록 서버에서 한 번에 실행한다.
+# (작업/도메인 키는 스크립트 안에서 만들기 때문에 KEYS 로 미리 넘기지 못함 → 단일 Redis 전용)
+# KEYS: 대기 도메인, 디바이스 키, 디바이스 목록, lease
+# ARGV: deviceId, 작업 키 prefix, lease 만료 ms, now ms, 도메인 키 prefix, 도메인별 설정(JSON),
+#       기본 동시 실행 수, 기본 분당 게시 수, 기본 버킷 크기,
+#       슬롯 수, siteType 목록(JSON, '' = 전부), 세션 키 목록(JSON), 세션 도메인 목록(JSON), scan 개수,
+#       디바이스가 보고한 실행 중 jobId 목록(JSON, '' = 보고 안 함)
+# 리턴: jobId 또는 nil
+_ASSIGN_JOB_LUA = """
+local device_jobs_key = KEYS[2] .. ':jobs'
+local reported = nil
+if ARGV[15] ~= '' then
+    reported = {}
+    for _, jid in ipairs(cjson.decode(ARGV[15])) do
+        reported[jid] = true
+    end
+end
+local live = 0
+local first = nil
+local lost = nil
+for _, jid in ipairs(redis.call('ZRANGE', device_jobs_key, 0, -1)) do
+    local job = redis.call('HMGET', ARGV[2] .. jid, 'status', 'assigned_device')
+    if job[1] == 'RUNNING' and job[2] == ARGV[1] then
+        live = live + 1
+        first = first or jid
+        if reported and not reported[jid] then
+            lost = lost or jid
+        end
+    else
+        redis.call('ZREM', device_jobs_key, jid)
+    end
+end
+if lost then
+    -- RUN 응답 유실 등으로 디바이스가 모르는 작업 → 다시 보냄
+    redis.call('HSET', ARGV[2] .. lost, 'lease_deadline', ARGV[3])
+    redis.call('ZADD', KEYS[4], ARGV[3], lost)
+    return lost
+end
+if live >= tonumber(ARGV[10]) then
+    if reported then
+        return nil
+    end
+    return first
+end
+
+local now = tonumber(ARGV[4])
+local policies = cjson.decode(ARGV[6])
+local scan = tonumber(ARGV[14])
+local site_types = nil
+if ARGV[11] ~= '' then
+    site_types = {}
+    for _, site_type in ipairs(cjson.decode(ARGV[11])) do
+        site_types[site_type] = true
+    end
+end
+local sessions = {}
+for _, session in ipairs(cjson.decode(ARGV[12])) do
+    sessions[session] = true
+end
+
+local function claim(domain, session_only)
+    local policy = policies[domain] or {}
+    local concurrency = tonumber(policy['concurrency'] or ARGV[7])
+    local ppm = tonumber(policy['postsPerMinute'] or ARGV[8])
+    local burst = math.max(0, tonumber(policy['burst'] or ARGV[9]))
+    if ppm > 0 then
+        burst = math.max(1, burst)
+    end
+    local weight = math.max(0.01, tonumber(policy['weight'] or 1))
+
+    local domain_key = ARGV[5] .. domain
+    local queue_key = domain_key .. ':queue'
+    local state = redis.call('HMGET', domain_key, 'running', 'tokens', 'tokens_at', 'pass')
+    local domain_running = tonumber(state[1] or '0')
+    local tokens = burst
+    if state[2] and ppm > 0 then
+        local elapsed = math.max(0, now - tonumber(state[3]))
+        tokens = math.min(burst, tonumber(state[2]) + elapsed * ppm / 60000)
+    end
+    if not ((concurrency == 0 or domain_running < concurrency) and (ppm == 0 or tokens >= 1)) then
+        return nil
+    end
+
+    local chosen = nil
+    for _, jid in ipairs(redis.call('ZRANGE', queue_key, 0, scan - 1)) do
+        local job = redis.call('HMGET', ARGV[2] .. jid, 'status', 'site_type', 'session')
+        if job[1] ~= 'QUEUED' then
+            -- 결과가 먼저 들어온 작업 등 버려진 항목
+            redis.call('ZREM', queue_key, jid)
+        elseif (site_types == nil or site_types[job[2] or 'Unknown'])
+            and (not session_only or (job[3] and sessions[job[3]])) then
+            chosen = jid
+            redis.call('ZREM', queue_key, jid)
+            break
+        end
+    end
+
+    if chosen then
+        local pass = tonumber(state[4] or '0') + 1 / weight
+        -- 속도 제한이 없으면 토큰을 차감하지 않음 (나중에 제한을 걸어도 바로 가득 찬 상태)
+        local left = burst
+        if ppm > 0 then
+            left = math.max(0, tokens - 1)
+        end
+        redis.call('HSET', domain_key,
+            'running', domain_running + 1,
+            'tokens', tostring(left),
+            'tokens_at', ARGV[4],
+            'pass', tostring(pass))
+        if redis.call('ZCARD', queue_key) > 0 then
+            redis.call('ZADD', KEYS[1], pass, domain)
+        end
+    end
+    if redis.call('ZCARD', queue_key) == 0 then
+        redis.call('ZREM', KEYS[1], domain)
+    end
+    return chosen
+end
+
+local function assign(jid)
+    redis.call('HSET', ARGV[2] .. jid, 'status', 'RUNNING', 'assigned_device', ARGV[1], 'lease_deadline', ARGV[3])
+    redis.call('ZADD', KEYS[4], ARGV[3], jid)
+    redis.call('ZADD', device_jobs_key, ARGV[4], jid)
+    redis.call('HSET', KEYS[2], 'state', 'BUSY')
+    redis.call('SADD', KEYS[3], ARGV[1])
+    return jid
+end
+
+-- 1) 디바이스가 세션을 가진 도메인 (pass 순) 에서 그 세션의 작업
+local session_domains = {}
+for _, domain in ipairs(cjson.decode(ARGV[13])) do
+    local pass = redis.call('ZSCORE', KEYS[1], domain)
+    if pass then
+        table.insert(session_domains, {tonumber(pass), domain})
+    end
+end
+table.sort(session_domains, function(a, b)
+    if a[1] ~= b[1] then
+        return a[1] < b[1]
+    end
+    return a[2] < b[2]
+end)
+for _, item in ipairs(session_domains) do
+    local jid = claim(item[2], true)
+    if jid then
+        return assign(jid)
+    end
+end
+
+-- 2) pass 순서대로 처리할 수 있는 작업
+for _, domain in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    local jid = claim(domain, false)
+    if jid then
+        return assign(jid)
+    end
+end
+return nil
+"""
+
+# heartbeat: 디바이스 상태/능력 갱신 + OFFLINE 처리 시각 연장 + 이 디바이스가 실행 중이라고 보고한 작업들 lease 연장
+# KEYS: 디바이스 키, 디바이스 목록, 디바이스 만료, lease
+# ARGV: deviceId, state, last_seen(epoch 초), OFFLINE 처리 ms, lease 만료 ms, 작업 키 prefix, 능력(JSON),
+#       보고한 실행 중 jobId 목록(JSON, '' = 보고 안 함 → 할당된 작업 전부)
+_TOUCH_DEVICE_LUA = """
+redis.call('HSET', KEYS[1], 'state', ARGV[2], 'last_seen', ARGV[3], 'capabilities', ARGV[7])
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[4], ARGV[1])
+local reported = nil
+if ARGV[8] ~= '' then
+    reported = {}
+    for _, jid in ipairs(cjson.decode(ARGV[8])) do
+        reported[jid] = true
+    end
+end
+local device_jobs_key = KEYS[1] .. ':jobs'
+for _, jid in ipairs(redis.call('ZRANGE', device_jobs_key, 0, -1)) do
+    local job_key = ARGV[6] .. jid
+    local job = redis.call('HMGET', job_key, 'status', 'assigned_device')
+    if job[1] == 'RUNNING' and job[2] == ARGV[1] then
+        if not reported or reported[jid] then
+            redis.call('HSET', job_key, 'lease_deadline', ARGV[5])
+            redis.call('ZADD', KEYS[4], ARGV[5], jid)
+        end
+    else
+        redis.call('ZREM', device_jobs_key, jid)
+    end
+end
+return 0
+"""
+
+# 작업 결과 기록.
+# KEYS: 작업 키, lease
+# ARGV: jobId, status, results(JSON), error('' = 없음), 디바이스 키 prefix, 보관 TTL(초),
+#       도메인 키 prefix, 작업 알림 채널
+# 리턴: 0 = 없는 작업, 1 = 이미 끝난 작업, 2 = 기록함
+_COMPLETE_JOB_LUA = _DOMAIN_FUNCTIONS_LUA + """
+local job = redis.call('HMGET', KEYS[1], 'status', 'domain', 'assigned_device')
+local status = job[1]
+if not status then
+    return 0
+end
+if status == 'SUCCESS' or status == 'FAILED' then
+    return 1
+end
+
+local domain_key = ARGV[7] .. (job[2] or 'unknown')
+if status == 'RUNNING' then
+    release_slot(domain_key)
+    redis.call('PUBLISH', ARGV[8], ARGV[1])
+elseif status == 'QUEUED' then
+    -- lease 만료로 되돌려진 뒤 원래 디바이스가 결과를 보낸 경우
+    redis.call('ZREM', domain_key .. ':queue', ARGV[1])
+end
+
+redis.call('HSET', KEYS[1], 'status', ARGV[2], 'results', ARGV[3])
+redis.call('HDEL', KEYS[1], 'lease_deadline')
+redis.call('ZREM', KEYS[2], ARGV[1])
+if ARGV[4] == '' then
+    redis.call('HDEL', KEYS[1], 'error')
+else
+    redis.call('HSET', KEYS[1], 'error', ARGV[4])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+local device = job[3]
+if device then
+    local device_key = ARGV[5] .. device
+    redis.call('ZREM', device_key .. ':jobs', ARGV[1])
+    if redis.call('ZCARD', device_key .. ':jobs') == 0 then
+        redis.call('HSET', device_key, 'state', 'IDLE')
+    else
+        redis.call('HSET', device_key, 'state', 'BUSY')
+    end
+end
+return 2
+"""
+
+# lease 가 끝난 작업 정리 (lease sorted set 에서 만료된 것만 꺼냄).
+# 재시도 횟수가 남았으면 원래 순서 그대로 도메인 큐에 되돌리고, 아니면 FAILED 처리.
+# KEYS: lease, 대기 도메인
+# ARGV: now ms, 최대 개수, 작업 키 prefix, 디바이스 키 prefix, 최대 만료 횟수, 보관 TTL(초), 에러 메시지,
+#       작업 알림 채널, 도메인 키 prefix
+# 리턴: {되돌린 jobId 목록, FAILED jobId 목록}
+_REAP_LEASES_LUA = _DOMAIN_FUNCTIONS_LUA + """
+local requeued = {}
+local failed = {}
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, jid in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], jid)
+    local job_key = ARGV[3] .. jid
+    local job = redis.call('HMGET', job_key, 'status', 'assigned_device', 'domain', 'priority', 'created_at')
+    if job[1] == 'RUNNING' then
+        if job[2] then
+            redis.call('ZREM', ARGV[4] .. job[2] .. ':jobs', jid)
+        end
+        local domain = job[3] or 'unknown'
+        local domain_key = ARGV[9] .. domain
+        release_slot(domain_key)
+
+        local attempts = redis.call('HINCRBY', job_key, 'attempts', 1)
+        redis.call('HDEL', job_key, 'lease_deadline', 'assigned_device')
+        if attempts >= tonumber(ARGV[5]) then
+            redis.call('HSET', job_key, 'status', 'FAILED', 'error', ARGV[7])
+            redis.call('EXPIRE', job_key, ARGV[6])
+            table.insert(failed, jid)
+        else
+            redis.call('HSET', job_key, 'status', 'QUEUED')
+            activate_domain(KEYS[2], domain_key, domain)
+            local score = -tonumber(job[4] or '0') * 1e13 + tonumber(job[5] or '0')
+            redis.call('ZADD', domain_key .. ':queue', score, jid)
+            table.insert(requeued, jid)
+        end
+    end
+end
+if #requeued > 0 then
+    redis.call('PUBLISH', ARGV[8], requeued[1])
+end
+return {requeued, failed}
+"""
+
+# heartbeat 가 끊긴 디바이스 OFFLINE 처리.
+# KEYS: 디바이스 만료 / ARGV: now ms, 최대 개수, 디바이스 키 prefix
+# 리턴: OFFLINE 처리한 deviceId 목록
+_REAP_DEVICES_LUA = """
+local offline = {}
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, device_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], device_id)
+    local device_key = ARGV[3] .. device_id
+    if redis.call('HGET', device_key, 'state') ~= 'OFFLINE' then
+        redis.call('HSET', device_key, 'state', 'OFFLINE')
+        table.insert(offline, device_id)
+    end
+end
+return offline
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _json_list(values: Iterable[str] | None) -> str:
+    # None 은 '' 로 넘겨서 스크립트에서 "보고 안 함" 으로 구분
+    return json.dumps(list(values)) if values is not None else ""
+
+
+def _hash_to_job(job_id: str, data: dict) -> Job:
+    results = data.get("results")
+    lease_deadline = data.get("lease_deadline")
+    return Job(
+        jobId=job_id,
+        jobType=data["jobType"],
+        payload=json.loads(data["payload"]),
+        status=data.get("status", JOB_QUEUED),
+        assigned_device=data.get("assigned_device"),
+        results=json.loads(results) if results else None,
+        error=data.get("error"),
+        lease_deadline=int(lease_deadline) / 1000 if lease_deadline else None,
+        attempts=int(data.get("attempts") or 0),
+        domain=data.get("domain") or UNKNOWN_DOMAIN,
+        priority=int(data.get("priority") or 0),
+        site_type=data.get("site_type") or UNKNOWN_SITE_TYPE,
+        session=data.get("session") or None,
+    )
+
+
+def _hash_to_device(data: dict, running_jobs: list[str]) -> dict:
+    last_seen = data.get("last_seen")
+    capabilities = data.get("capabilities")
+    return {
+        "state": data.get("state") or None,
+        "running_jobs": running_jobs,
+        "last_seen": float(last_seen) if last_seen else None,
+        "capabilities": json.loads(capabilities) if capabilities else None,
+    }
+
+
+class RedisStore(Store):
+    """
+    Redis 작업 큐 (decode_responses=True 클라이언트 사용).
+    큐/작업/디바이스/도메인 상태가 모두 Redis 에 있어서 워커를 여러 개 띄우거나 재시작해도 그대로 이어진다.
+    도메인 스케줄링(pass / 동시 실행 수 / 토큰 버킷)도 할당 스크립트 안에서 한 번에 처리한다.
+    long-poll 대기는 프로세스마다 pub/sub 연결 하나로 작업 알림을 받아 로컬 대기자를 깨운다.
+    (대기하는 디바이스마다 BLPOP 연결을 잡지 않음)
+    """
+
+    def __init__(self, redis: Redis):
+        super().__init__()
+        self.redis = redis
+        self._pubsub: PubSub | None = None
+        self._listener: asyncio.Task | None = None
+        self._listener_lock = asyncio.Lock()
+        self._domain_policies = json.dumps(JOB_DOMAIN_POLICIES)
+        self._enqueue_script = redis.register_script(_ENQUEUE_JOB_LUA)
+        self._assign_script = redis.register_script(_ASSIGN_JOB_LUA)
+        self._touch_script = redis.register_script(_TOUCH_DEVICE_LUA)
+        self._complete_script = redis.register_script(_COMPLETE_JOB_LUA)
+        self._reap_leases_script = redis.register_script(_REAP_LEASES_LUA)
+        self._reap_devices_script = redis.register_script(_REAP_DEVICES_LUA)
+
+    async def enqueue_job(self, req):
+        job = new_job(req)
+        created_ms = _now_ms()
+        await self._enqueue_script(
+            keys=[
+                _job_key(job.jobId),
+                JOBS_KEY,
+                DOMAINS_KEY,
+                _domain_key(job.domain),
+                _domain_queue_key(job.domain),
+                DOMAIN_NAMES_KEY,
+            ],
+            args=[
+                job.jobId,
+                job.jobType,
+                json.dumps(job.payload, ensure_ascii=False),
+                job.domain,
+                job.priority,
+                created_ms,
+                _queue_score(job.priority, created_ms),
+                JOB_EVENTS_CHANNEL,
+                job.site_type,
+                job.session or "",
+            ],
+        )
+        return job.jobId
+
+    async def assign_job_if_any(
+        self,
+        device_id: str,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ):
+        now_ms = _now_ms()
+        site_types = capabilities.site_types
+        job_id = await self._assign_script(
+            keys=[DOMAINS_KEY, _device_key(device_id), DEVICES_KEY, LEASES_KEY],
+            args=[
+                device_id,
+                JOB_KEY_PREFIX,
+                now_ms + int(JOB_LEASE_SECONDS * 1000),
+                now_ms,
+                DOMAIN_KEY_PREFIX,
+                self._domain_policies,
+                JOB_DOMAIN_MAX_CONCURRENCY,
+                JOB_DOMAIN_POSTS_PER_MINUTE,
+                JOB_DOMAIN_BURST,
+                capabilities.slots,
+                json.dumps(list(site_types)) if site_types is not None else "",
+                json.dumps(list(capabilities.sessions)),
+                json.dumps(sorted(capabilities.session_domains())),
+                JOB_MATCH_SCAN_LIMIT,
+                _json_list(running_job_ids),
+            ],
+        )
+        if not job_id:
+            return None
+
+        data = await self.redis.hgetall(_job_key(job_id))
+        if not data:
+            return None
+        return _hash_to_job(job_id, data)
+
+    async def update_device(
+        self,
+        device_id: str,
+        state: str | None,
+        capabilities: DeviceCapabilities = DEFAULT_CAPABILITIES,
+        running_job_ids: Iterable[str] | None = None,
+    ):
+        now = time.time()
+        now_ms = int(now * 1000)
+        await self._touch_script(
+            keys=[_device_key(device_id), DEVICES_KEY, DEVICE_DEADLINES_KEY, LEASES_KEY],
+            args=[
+                device_id,
+                state or "",
+                now,
+                now_ms + int(DEVICE_OFFLINE_SECONDS * 1000),
+                now_ms + int(JOB_LEASE_SECONDS * 1000),
+                JOB_KEY_PREFIX,
+                json.dumps(capabilities.to_dict(), ensure_ascii=False),
+                _json_list(running_job_ids),
+            ],
+        )
+
+    async def complete_job(self, report):
+        results = [r.model_dump(mode="json") for r in report.results]
+        result = await self._complete_script(
+            keys=[_job_key(report.jobId), LEASES_KEY],
+            args=[
+                report.jobId,
+                report.status,
+                json.dumps(results, ensure_ascii=False),
+                report.error or "",
+                DEVICE_KEY_PREFIX,
+                BACKLINK_JOB_RESULT_TTL_SECONDS,
+                DOMAIN_KEY_PREFIX,
+                JOB_EVENTS_CHANNEL,
+            ],
+        )
+        return int(result) != 0
+
+    async def reap_expired(self, batch_size: int = JOB_REAP_BATCH_SIZE):
+        now_ms = _now_ms()
+        requeued, failed = await self._reap_leases_script(
+            keys=[LEASES_KEY, DOMAINS_KEY],
+            args=[
+                now_ms,
+                batch_size,
+                JOB_KEY_PREFIX,
+                DEVICE_KEY_PREFIX,
+                JOB_MAX_LEASE_EXPIRIES,
+                BACKLINK_JOB_RESULT_TTL_SECONDS,
+                JOB_LEASE_EXPIRED_ERROR,
+                JOB_EVENTS_CHANNEL,
+                DOMAIN_KEY_PREFIX,
+            ],
+        )
+        offline = await self._reap_devices_script(
+            keys=[DEVICE_DEADLINES_KEY],
+            args=[now_ms, batch_size, DEVICE_KEY_PREFIX],
+        )
+        return ReapSummary(requeued=list(requeued), failed=list(failed), offline_devices=list(offline))
+
+    async def _start_work_listener(self):
+        if self._listener is not None and not self._listener.done():
+            return
+        async with self._listener_lock:
+            if self._listener is not None and not self._listener.done():
+                return
+            if self._pubsub is None:
+                self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(JOB_EVENTS_CHANNEL)
+            self._listener = asyncio.create_task(self._listen_loop())
+
+    async def _listen_loop(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=1.0,
+                )
+                if message is not None and message["type"] == "message":
+                    self._notify_work()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 놓친 알림은 대기자가 JOB_WAIT_RECHECK_SECONDS 마다 큐를 다시 확인해서 보완
+                print(f"[job_store] listen error: {e}")
+                await asyncio.sleep(1.0)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    async def queue_status(self, limit: int = QUEUE_STATUS_JOB_LIMIT):
+        now_ms = _now_ms()
+        job_ids = await self.redis.zrevrange(JOBS_KEY, 0, limit - 1)
+        device_ids = sorted(await self.redis.smembers(DEVICES_KEY))
+        domain_passes = dict(await self.redis.zrange(DOMAINS_KEY, 0, -1, withscores=True))
+        # 대기 중인 도메인(pass 순) → 나머지 도메인
+        domain_names = list(domain_passes) + sorted(
+            set(await self.redis.smembers(DOMAIN_NAMES_KEY)) - set(domain_passes)
+        )
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hgetall(_job_key(job_id))
+            for device_id in device_ids:
+                pipe.hgetall(_device_key(device_id))
+                pipe.zrange(_device_jobs_key(device_id), 0, -1)
+            for domain in domain_names:
+                pipe.hgetall(_domain_key(domain))
+                pipe.zrange(_domain_queue_key(domain), 0, -1)
+            rows = await pipe.execute()
+
+        job_rows = rows[:len(job_ids)]
+        device_rows = rows[len(job_ids):len(job_ids) + 2 * len(device_ids)]
+        domain_rows = rows[len(job_ids) + 2 * len(device_ids):]
+
+        jobs = {}
+        expired = []
+        # 오래된 작업부터 (메모리 저장소와 같은 순서)
+        for job_id, data in reversed(list(zip(job_ids, job_rows))):
+            if not data:
+                # 보관 TTL 이 지나 사라진 작업은 목록에서도 정리
+                expired.append(job_id)
+                continue
+            jobs[job_id] = job_to_dict(_hash_to_job(job_id, data))
+        if expired:
+            await self.redis.zrem(JOBS_KEY, *expired)
+
+        devices = {
+            device_id: _hash_to_device(device_rows[2 * i], device_rows[2 * i + 1])
+            for i, device_id in enumerate(device_ids)
+        }
+
+        queue = []
+        domains = {}
+        for i, domain in enumerate(domain_names):
+            state, queued = domain_rows[2 * i], domain_rows[2 * i + 1]
+            queue.extend(queued)
+            tokens = float(state["tokens"]) if "tokens" in state else None
+            elapsed = (now_ms - int(state.get("tokens_at") or now_ms)) / 1000
+            domains[domain] = {
+                "queued": len(queued),
+                "running": int(state.get("running") or 0),
+                "pass": float(state.get("pass") or 0),
+                "tokens": domain_policy(domain).refill(tokens, elapsed),
+            }
+        return {"queue": queue, "domains": domains, "jobs": jobs, "devices": devices}
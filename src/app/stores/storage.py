@@ -1,82 +1,39 @@
-import asyncio
-import uuid
-from typing import Any, Dict
-from collections import deque
-from dataclasses import dataclass, asdict
+import os
 
-@dataclass
-class Job:
-    jobId: str
-    jobType: str
-    payload: Dict[str, Any]
-    status: str = "QUEUED"
-    assigned_device: str | None = None
-    results: list[dict] | None = None
-    error: str | None = None
+# 저장소 구현들은 .base 만 import 한다 (이 모듈은 싱글톤을 만들면서 구현 모듈을 import 하므로)
+from .base import (
+    DeviceCapabilities,
+    Job,
+    JOB_WAIT_MAX_SECONDS,
+    Store,
+    job_to_dict,
+    session_key,
+)
 
-class Store:
-    def __init__(self):
-        self.jobs: Dict[str, Job] = {}
-        self.job_queue: deque[str] = deque()
-        self.devices: Dict[str, dict] = {}
-        self._lock = asyncio.Lock()
 
-    async def enqueue_job(self, req):
-        job_id = f"job-{uuid.uuid4().hex[:8]}"
-        job = Job(
-            jobId=job_id,
-            jobType=req.jobType,
-            payload=req.model_dump()
-        )
-        async with self._lock:
-            self.jobs[job_id] = job
-            self.job_queue.append(job_id)
-        return job_id
+# 작업 큐 저장소 (memory / redis / postgres)
+# - memory  : 프로세스 메모리 (재시작 시 유실, 워커 1개 전용 / 개발·테스트용)
+# - redis   : Lua 스크립트로 원자적 claim (여러 워커/호스트가 같은 큐 공유)
+# - postgres: SELECT ... FOR UPDATE SKIP LOCKED 로 claim
+JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "redis")
 
-    async def assign_job_if_any(self, device_id: str):
-        async with self._lock:
-            running = self.devices.get(device_id, {}).get("running_job")
-            if running:
-                job = self.jobs.get(running)
-                if job and job.status == "RUNNING":
-                    return job
+def create_store(backend: str = JOB_STORE_BACKEND) -> Store:
+    if backend == "memory":
+        from .memory_store import MemoryStore
+        return MemoryStore()
 
-            while self.job_queue:
-                jid = self.job_queue.popleft()
-                job = self.jobs.get(jid)
-                if not job or job.status != "QUEUED":
-                    continue
-                job.status = "RUNNING"
-                job.assigned_device = device_id
-                self.devices.setdefault(device_id, {})
-                self.devices[device_id]["running_job"] = jid
-                self.devices[device_id]["state"] = "BUSY"
-                return job
-            return None
+    if backend == "redis":
+        from app.core.redis_client import redis_client
+        from .redis_store import RedisStore
+        return RedisStore(redis_client)
 
-    async def update_device(self, device_id: str, state: str | None):
-        async with self._lock:
-            d = self.devices.setdefault(device_id, {})
-            d["state"] = state
-            d["last_seen"] = asyncio.get_event_loop().time()
+    if backend == "postgres":
+        from app.core.database import SessionLocal
+        from .postgres_store import PostgresStore
+        return PostgresStore(SessionLocal)
 
-    async def complete_job(self, report):
-        async with self._lock:
-            job = self.jobs.get(report.jobId)
-            if not job:
-                return False
-            if job.status in ("SUCCESS", "FAILED"):
-                return True
+    raise ValueError(f"unknown job store backend: {backend}")
 
-            job.status = report.status
-            job.results = [r.model_dump() for r in report.results]
-            job.error = report.error
 
-            if job.assigned_device:
-                dev = self.devices.get(job.assigned_device, {})
-                if dev.get("running_job") == job.jobId:
-                    dev["running_job"] = None
-                dev["state"] = "IDLE"
-            return True
-
-store = Store()
+# 간단하게 전역 싱글톤처럼 사용
+store = create_store()